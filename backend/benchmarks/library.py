@@ -0,0 +1,109 @@
+"""
+Recipe Library Benchmark
+
+Search and listing latency over a library of synthetic recipes (one million
+by default), for common terms that match a large share of the library as
+well as rare ones. The library is built once in a temporary SQLite file.
+
+Run with: uv run python -m benchmarks.library [recipes]
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from src.library import RecipeLibrary
+from src.models import Ingredient, Recipe
+
+DEFAULT_RECIPES = 1_000_000
+BATCH_SIZE = 10_000
+ITERATIONS = 20
+
+COMMON = ["salt", "garlic", "onion", "olive oil", "pepper", "butter", "flour"]
+OTHER = [f"ingredient{i}" for i in range(5_000)]
+CUISINES = ["Italian", "Indian", "Mexican", "French", "Thai", "Japanese", None]
+DISHES = ["stew", "curry", "salad", "pasta", "soup", "pie", "roast", "tacos"]
+TAGS = ["vegan", "vegetarian", "gluten-free", "dairy-free"]
+
+QUERIES = [
+    "salt",
+    "garlic",
+    "recipes with garlic and onion",
+    "vegan curry",
+    "italian pasta",
+    "ingredient4242",
+]
+
+
+def synthetic_recipe(rng: random.Random, i: int) -> Recipe:
+    names = rng.sample(COMMON, rng.randint(1, 4)) + rng.sample(OTHER, 6)
+    return Recipe(
+        title=f"{rng.choice(OTHER)} {rng.choice(DISHES)} {i}",
+        servings=rng.randint(1, 8),
+        cuisine=rng.choice(CUISINES),
+        dietary_tags=rng.sample(TAGS, rng.randint(0, 2)),
+        ingredients=[Ingredient(name=name, quantity=1) for name in names],
+        steps=[],
+    )
+
+
+def build(path: str, count: int) -> RecipeLibrary:
+    """Fill a library with count synthetic recipes."""
+    rng = random.Random(7)
+    library = RecipeLibrary(path)
+    started = time.perf_counter()
+    for start in range(0, count, BATCH_SIZE):
+        library.upsert_many(
+            {
+                f"thread-{i}": synthetic_recipe(rng, i)
+                for i in range(start, min(start + BATCH_SIZE, count))
+            }
+        )
+    print(f"Indexed {count} recipes in {time.perf_counter() - started:.0f}s\n")
+    return library
+
+
+def measure(call: Callable[[], object]) -> float:
+    """Return the median milliseconds per call."""
+    call()
+    timings = []
+    for _ in range(ITERATIONS):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RECIPES
+    with tempfile.TemporaryDirectory() as tmp:
+        library = build(str(Path(tmp) / "library.db"), count)
+
+        first = library.list()
+        deep = first
+        for _ in range(50):
+            deep = library.list(cursor=deep.next_cursor)
+
+        cases: list[tuple[str, Callable[[], object]]] = [
+            ("list, first page", lambda: library.list()),
+            ("list, page 51", lambda: library.list(cursor=deep.next_cursor)),
+        ]
+        for query in QUERIES:
+            cases.append((f"search '{query}'", lambda q=query: library.search(q)))
+            cases.append(
+                (f"search '{query}' p3", lambda q=query: library.search(q, offset=40))
+            )
+
+        print(f"{'operation':<44}{'ms (median)':>12}")
+        for label, call in cases:
+            print(f"{label:<44}{measure(call):>12.2f}")
+        library.close()
+
+
+if __name__ == "__main__":
+    main()
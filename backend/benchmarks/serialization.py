@@ -0,0 +1,92 @@
+"""
+Serialization Benchmark
+
+Encode time and size of a large RecipeContext on the two hot paths, before
+(ag_ui EventEncoder / FastAPI jsonable_encoder + json.dumps) and after
+(encode_sse / FastJSONResponse).
+
+Run with: uv run python -m benchmarks.serialization
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import uuid
+from collections.abc import Callable
+
+from ag_ui.core import EventType, StateSnapshotEvent
+from ag_ui.encoder import EventEncoder
+from fastapi.encoders import jsonable_encoder
+
+from src.models import Ingredient, Recipe, RecipeContext, RecipeStep
+from src.serialization import FastJSONResponse, encode_sse
+
+ITERATIONS = 500
+
+
+def large_state(ingredients: int = 150, steps: int = 60) -> RecipeContext:
+    """A compiled multi-recipe sized state, with source text."""
+    recipe = Recipe(
+        title="Holiday Feast",
+        servings=12,
+        ingredients=[
+            Ingredient(
+                name=f"ingredient {i}",
+                quantity=i + 0.5,
+                unit="g",
+                preparation="finely chopped",
+                category="produce",
+            )
+            for i in range(ingredients)
+        ],
+        steps=[
+            RecipeStep(
+                step_number=i + 1,
+                instruction="Combine the prepared ingredients and cook gently. " * 3,
+                duration_minutes=5,
+                tips=["Stir often"],
+            )
+            for i in range(steps)
+        ],
+        source_text="Lorem ipsum dolor sit amet. " * 500,
+    )
+    return RecipeContext(document_text=recipe.source_text, recipe=recipe)
+
+
+def measure(encode: Callable[[], str | bytes]) -> tuple[float, int]:
+    """Return (microseconds per call, output bytes)."""
+    output = encode()
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        encode()
+    elapsed = (time.perf_counter() - started) / ITERATIONS * 1e6
+    size = len(output.encode() if isinstance(output, str) else output)
+    return elapsed, size
+
+
+def main() -> None:
+    state = large_state()
+    event = StateSnapshotEvent(type=EventType.STATE_SNAPSHOT, snapshot=state)
+    encoder = EventEncoder()
+    upload = {"threadId": str(uuid.uuid4()), "state": state, "messages": []}
+
+    cases = [
+        ("STATE_SNAPSHOT", "before", lambda: encoder.encode(event)),
+        ("STATE_SNAPSHOT", "after", lambda: encode_sse(event)),
+        (
+            "/upload body",
+            "before",
+            lambda: json.dumps(jsonable_encoder(upload), separators=(",", ":")),
+        ),
+        ("/upload body", "after", lambda: FastJSONResponse(upload).body),
+    ]
+
+    print(f"{'path':<16}{'encoder':<9}{'us/call':>10}{'bytes':>10}")
+    for path, label, encode in cases:
+        elapsed, size = measure(encode)
+        print(f"{path:<16}{label:<9}{elapsed:>10.0f}{size:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,65 @@ chat agent (with tool calling via decorators and state management).
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+from collections.abc import Callable
 from textwrap import dedent
+from typing import Literal, TypeVar, get_args
 
-from pydantic_ai import Agent, RunContext
+from pydantic import ValidationError
+from pydantic_ai import Agent, RunContext, ToolReturn
+from pydantic_ai.exceptions import UnexpectedModelBehavior
 from pydantic_ai.models.google import GoogleModel
 from pydantic_ai.ag_ui import StateDeps
 from ag_ui.core import EventType, StateSnapshotEvent
 
-from .models import Recipe, RecipeContext, RecipeStep, SubstitutionResult
+from .allergens import plan_allergen_swaps, resolve_allergens
+from .commands import (
+    CommandError,
+    NO_RECIPE_MESSAGE,
+    redo_state,
+    scale_state,
+    set_cooking_started,
+    set_current_step,
+    undo_state,
+)
+from .dietary import (
+    describe_broken_tags,
+    refresh_dietary_tags,
+    unrecognised_ingredients,
+)
+from .hedging import deadline_for, hedged
+from .history import compact_history
+from .metrics import metrics
+from .models import (
+    IngredientSwap,
+    Recipe,
+    RecipeContext,
+    RecipeStep,
+    SubstitutionResult,
+    normalize_name,
+)
+from .nutrition import format_nutrition, recipe_nutrition, refresh_nutrition
+from .prompt_cache import PROGRESS_HEADER, CachingGoogleModel, prompt_cache
+from .sessions import get_sessions
+from .shared_cache import cache_key, get_shared_cache
+from .shopping import build_shopping_list, format_shopping_list
+from .timers import (
+    cancel_timer_in_state,
+    pause_timer_in_state,
+    start_timer_in_state,
+)
+from .timing import (
+    format_meal_plan,
+    format_timing,
+    recipe_timing,
+    refresh_timing,
+    schedule_recipes,
+)
+from .trimming import trim_recipe_text
+from .versions import record_version
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -29,6 +78,115 @@ logger = logging.getLogger(__name__)
 MODEL_NAME = os.getenv("LLM_MODEL", "gpt-4o")
 
 
+# =============================================================================
+# Model Routing (per-task tiers)
+# =============================================================================
+
+Task = Literal["parse", "substitute", "rewrite", "chat"]
+Tier = Literal["fast", "strong"]
+OutputT = TypeVar("OutputT")
+
+
+# LLM_MODEL_<TASK> picks the fast tier for a task; LLM_MODEL_<TASK>_STRONG (or
+# LLM_MODEL_STRONG) the tier used when fast output fails validation. Both
+# default to LLM_MODEL, in which case nothing is ever escalated. The chat
+# agent streams its turns and has no structured output to validate, so it
+# only ever runs on its fast tier.
+def _task_models(task: str) -> dict[str, str]:
+    fast = os.getenv(f"LLM_MODEL_{task.upper()}", MODEL_NAME)
+    strong = os.getenv(f"LLM_MODEL_{task.upper()}_STRONG") or os.getenv(
+        "LLM_MODEL_STRONG", fast
+    )
+    return {"fast": fast, "strong": strong}
+
+
+TASK_MODELS = {task: _task_models(task) for task in get_args(Task)}
+
+# Substitution matches below this confidence are re-checked on the strong tier
+ESCALATE_BELOW_CONFIDENCE = float(os.getenv("ESCALATE_BELOW_CONFIDENCE", "0.5"))
+
+_models: dict[str, GoogleModel] = {}
+
+
+def get_model(task: Task, tier: Tier = "fast") -> GoogleModel:
+    """Get or create the Gemini model configured for a task and tier."""
+    model_name = TASK_MODELS[task][tier]
+    if model_name not in _models:
+        _models[model_name] = CachingGoogleModel(model_name)
+    return _models[model_name]
+
+
+async def run_with_escalation(
+    task: Task,
+    agent: Agent[None, OutputT],
+    prompt: str,
+    accept: Callable[[OutputT], bool] | None = None,
+) -> OutputT:
+    """
+    Run an agent on the task's fast tier, retrying on the strong tier if needed.
+
+    Escalates when the structured output fails validation, or when accept()
+    rejects it (e.g. a low-confidence match). Each attempt may be hedged, and
+    the whole call is bounded by the task's deadline. Other errors, including
+    TimeoutError, propagate so the caller's existing fallback applies.
+
+    Args:
+        task: Task name used for model selection and metrics
+        agent: Agent created with the task's fast-tier model
+        prompt: User prompt for the run
+        accept: Optional check on the fast-tier output
+
+    Returns:
+        The agent output from whichever tier served the request
+    """
+    deadline = deadline_for(task)
+    try:
+        async with asyncio.timeout(deadline):
+            return await _run_tiers(task, agent, prompt, accept)
+    except TimeoutError:
+        logger.warning(f"{task}: no model response within {deadline}s")
+        metrics.incr(f"llm.{task}.deadline_expired")
+        raise
+
+
+async def _run_tiers(
+    task: Task,
+    agent: Agent[None, OutputT],
+    prompt: str,
+    accept: Callable[[OutputT], bool] | None,
+) -> OutputT:
+    escalate = TASK_MODELS[task]["strong"] != TASK_MODELS[task]["fast"]
+    try:
+        result = await hedged(f"{task}.fast", lambda: agent.run(prompt))
+    except (UnexpectedModelBehavior, ValidationError) as e:
+        if not escalate:
+            raise
+        logger.info(f"{task}: fast tier output invalid ({e}), escalating")
+    else:
+        if not escalate or accept is None or accept(result.output):
+            metrics.incr(f"model_tier.{task}.fast")
+            return result.output
+        logger.info(f"{task}: fast tier output rejected, escalating")
+
+    metrics.incr(f"model_tier.{task}.escalations")
+    strong = get_model(task, "strong")
+    result = await hedged(f"{task}.strong", lambda: agent.run(prompt, model=strong))
+    metrics.incr(f"model_tier.{task}.strong")
+    return result.output
+
+
+def tier_fractions() -> dict[str, float]:
+    """Fraction of each task's requests served by the fast and strong tiers."""
+    fractions = {}
+    for task in TASK_MODELS:
+        fast = metrics.get(f"model_tier.{task}.fast")
+        strong = metrics.get(f"model_tier.{task}.strong")
+        if fast + strong:
+            fractions[f"model_tier.{task}.fast_fraction"] = fast / (fast + strong)
+            fractions[f"model_tier.{task}.strong_fraction"] = strong / (fast + strong)
+    return fractions
+
+
 # =============================================================================
 # Recipe Parsing (separate agent for structured output)
 # =============================================================================
@@ -56,7 +214,7 @@ def get_recipe_parser() -> Agent[None, Recipe]:
     global _recipe_parser
     if _recipe_parser is None:
         _recipe_parser = Agent(
-            model=GoogleModel(MODEL_NAME),
+            model=get_model("parse"),
             system_prompt=PARSE_RECIPE_PROMPT,
             output_type=Recipe,
         )
@@ -73,10 +231,26 @@ async def parse_recipe_from_text(document_text: str) -> Recipe | None:
     Returns:
         Parsed Recipe object, or None if parsing fails
     """
+    # Only the recipe-like parts of the document are sent to the model
+    recipe_text = trim_recipe_text(document_text)
+
+    # Identical documents (e.g. the same upload on another worker) parse once
+    cache = get_shared_cache()
+    key = cache_key(TASK_MODELS["parse"]["fast"], recipe_text)
     try:
+        if (cached := await cache.get("parse", key)) is not None:
+            recipe = Recipe.model_validate_json(cached)
+            recipe.source_text = document_text
+            return recipe
+
         parser = get_recipe_parser()
-        result = await parser.run(document_text)
-        recipe = result.output
+        recipe = await run_with_escalation(
+            "parse",
+            parser,
+            recipe_text,
+            accept=lambda recipe: bool(recipe.ingredients and recipe.steps),
+        )
+        await cache.set("parse", key, recipe.model_dump_json(exclude={"source_text"}))
         recipe.source_text = document_text
         return recipe
     except Exception as e:
@@ -117,7 +291,7 @@ def get_substitution_agent() -> Agent[None, SubstitutionResult]:
     global _substitution_agent
     if _substitution_agent is None:
         _substitution_agent = Agent(
-            model=GoogleModel(MODEL_NAME),
+            model=get_model("substitute"),
             system_prompt=SUBSTITUTION_PROMPT,
             output_type=SubstitutionResult,
         )
@@ -129,7 +303,7 @@ def get_step_rewrite_agent() -> Agent[None, list[RecipeStep]]:
     global _step_rewrite_agent
     if _step_rewrite_agent is None:
         _step_rewrite_agent = Agent(
-            model=GoogleModel(MODEL_NAME),
+            model=get_model("rewrite"),
             system_prompt=STEP_REWRITE_PROMPT,
             output_type=list[RecipeStep],
         )
@@ -168,22 +342,33 @@ With: "{substitute_name}"
 Find the best matching ingredient and provide substitution details.
 """
 
+    # Same ingredients and request -> same match, whichever worker asks
+    cache = get_shared_cache()
+    key = cache_key(TASK_MODELS["substitute"]["fast"], prompt)
     try:
+        if (cached := await cache.get("substitute", key)) is not None:
+            return SubstitutionResult.model_validate_json(cached)
+
         agent = get_substitution_agent()
-        result = await agent.run(prompt)
-        return result.output
+        result = await run_with_escalation(
+            "substitute",
+            agent,
+            prompt,
+            accept=lambda result: result.confidence >= ESCALATE_BELOW_CONFIDENCE,
+        )
+        await cache.set("substitute", key, result.model_dump_json())
+        return result
     except Exception as e:
         logger.warning(f"LLM substitution matching failed: {e}")
         # Fallback: try exact match
-        for ing in recipe.ingredients:
-            if ing.name.lower() == original_ingredient.lower():
-                return SubstitutionResult(
-                    matched_ingredient=ing.name,
-                    substitute_name=substitute_name,
-                    substitute_quantity=ing.quantity,
-                    substitute_unit=ing.unit,
-                    confidence=1.0,
-                )
+        if (ing := recipe.find_ingredient(original_ingredient)) is not None:
+            return SubstitutionResult(
+                matched_ingredient=ing.name,
+                substitute_name=substitute_name,
+                substitute_quantity=ing.quantity,
+                substitute_unit=ing.unit,
+                confidence=1.0,
+            )
         return SubstitutionResult(
             matched_ingredient=None,
             substitute_name=substitute_name,
@@ -217,39 +402,265 @@ async def rewrite_steps_for_substitution(
     original_ingredient: str,
     substitute_name: str,
 ) -> list[RecipeStep]:
+    return await rewrite_steps_for_substitutions(
+        recipe, [(original_ingredient, substitute_name)]
+    )
+
+
+async def rewrite_steps_for_substitutions(
+    recipe: Recipe,
+    substitutions: list[tuple[str, str]],
+) -> list[RecipeStep]:
+    """
+    Rewrite the recipe steps once for one or more (original, substitute) swaps.
+
+    Returns the original steps unchanged if the rewrite fails.
+    """
     steps_text = "\n".join(
         f"{step.step_number}. {step.instruction}" for step in recipe.steps
     )
+    swaps_text = "\n".join(
+        f'- Replace "{original}" with "{substitute}"'
+        for original, substitute in substitutions
+    )
 
+    # Recipe content first, request last, so repeat calls share a cacheable prefix
     prompt = f"""
 Recipe title: {recipe.title}
 
-Substitution:
-- Replace: "{original_ingredient}"
-- With: "{substitute_name}"
-
 Current steps:
 {steps_text}
+
+Substitutions:
+{swaps_text}
 """
 
     try:
         agent = get_step_rewrite_agent()
-        result = await agent.run(prompt)
-        return result.output
+        return await run_with_escalation(
+            "rewrite",
+            agent,
+            prompt,
+            accept=lambda steps: (
+                [step.step_number for step in steps]
+                == [step.step_number for step in recipe.steps]
+            ),
+        )
     except Exception as e:
         logger.warning(f"Step rewrite failed: {e}")
         return recipe.steps
 
 
+async def substitute_in_state(
+    state: RecipeContext, original_ingredient: str, substitute_name: str
+) -> str:
+    """
+    Match, substitute and rewrite steps for one ingredient, updating state in place.
+
+    Args:
+        state: The thread's current RecipeContext
+        original_ingredient: What the user wants to replace (may be fuzzy)
+        substitute_name: What they want to use instead
+
+    Returns:
+        Confirmation message, including a cooking tip when available
+
+    Raises:
+        CommandError: If no recipe is loaded or no ingredient matches
+    """
+    return await substitute_many_in_state(
+        state,
+        [
+            IngredientSwap(
+                original_ingredient=original_ingredient,
+                substitute_name=substitute_name,
+            )
+        ],
+    )
+
+
+async def substitute_many_in_state(
+    state: RecipeContext, swaps: list[IngredientSwap]
+) -> str:
+    """
+    Apply several substitutions at once, updating state in place.
+
+    The LLM matching for each swap runs concurrently against the same recipe.
+    Matches are then applied in request order by apply_substitutions.
+
+    Args:
+        state: The thread's current RecipeContext
+        swaps: The requested substitutions, in the order the user gave them
+
+    Returns:
+        Confirmation message covering every swap, with tips when available
+        and a note on any dietary tags the swaps broke
+
+    Raises:
+        CommandError: If no recipe is loaded or none of the swaps match
+    """
+    if state.recipe is None:
+        raise CommandError(NO_RECIPE_MESSAGE)
+
+    # Use LLM to find best match and get substitution details
+    recipe = state.recipe
+    results = await asyncio.gather(
+        *(
+            find_and_substitute(recipe, swap.original_ingredient, swap.substitute_name)
+            for swap in swaps
+        )
+    )
+    return await apply_substitutions(
+        state,
+        [
+            (swap.original_ingredient, result)
+            for swap, result in zip(swaps, results, strict=True)
+        ],
+    )
+
+
+async def apply_substitutions(
+    state: RecipeContext, matches: list[tuple[str, SubstitutionResult]]
+) -> str:
+    """
+    Apply matched substitutions in one pass, updating state in place.
+
+    Matches are applied in order (a later swap of an ingredient that was
+    already replaced is skipped), the steps are rewritten once for all of
+    them, and the derived dietary tags, timing and nutrition are refreshed.
+    The result is recorded as one version in the undo history.
+
+    Args:
+        state: The thread's current RecipeContext, with a recipe loaded
+        matches: What the user asked to replace, and the match for it
+
+    Returns:
+        Confirmation message covering every swap, with tips when available
+        and a note on any dietary tags the swaps broke
+
+    Raises:
+        CommandError: If none of the matches apply
+    """
+    recipe = state.recipe
+    applied: list[SubstitutionResult] = []
+    replaced: set[str] = set()
+    failures: list[str] = []
+    for requested, result in matches:
+        if result.matched_ingredient is None or (
+            recipe.find_ingredient(result.matched_ingredient) is None
+        ):
+            failures.append(
+                result.suggestion or f"Could not find '{requested}' in the recipe."
+            )
+            continue
+        if normalize_name(result.matched_ingredient) in replaced:
+            failures.append(f"{result.matched_ingredient} was already replaced.")
+            continue
+        replaced.add(normalize_name(result.matched_ingredient))
+
+        # Apply the substitution using the matched ingredient name
+        state.recipe = state.recipe.substitute_ingredient(
+            result.matched_ingredient,
+            result.substitute_name,
+            result.substitute_quantity,
+            result.substitute_unit,
+        )
+        applied.append(result)
+        logger.info(
+            f"Substituted '{result.matched_ingredient}' with "
+            f"'{result.substitute_name}' (user requested: "
+            f"'{requested}', confidence: {result.confidence})"
+        )
+
+    if not applied:
+        # No match found - return helpful suggestion
+        available = ", ".join(ing.name for ing in recipe.ingredients[:5])
+        raise CommandError(
+            f"{' '.join(failures)} Available ingredients include: {available}"
+        )
+
+    # Rewrite steps once to reflect every substitution. Word matching can miss
+    # how a step refers to an ingredient ("the pasta"), so every recipe with
+    # steps is rewritten
+    substitutions = [
+        (result.matched_ingredient, result.substitute_name) for result in applied
+    ]
+    if state.recipe.steps:
+        state.recipe.steps = await rewrite_steps_for_substitutions(
+            state.recipe, substitutions
+        )
+    broken = refresh_dietary_tags(state)
+    refresh_timing(state)
+    refresh_nutrition(state)
+    record_version(
+        state,
+        "; ".join(
+            f"Swapped {result.matched_ingredient} for {result.substitute_name}"
+            for result in applied
+        ),
+    )
+
+    messages = []
+    for result in applied:
+        message = f"Swapped {result.matched_ingredient} for {result.substitute_name}."
+        if result.cooking_tip:
+            message += f" Tip: {result.cooking_tip}"
+        messages.append(message)
+    if broken:
+        messages.append(describe_broken_tags(state.recipe, broken))
+    return " ".join(messages + failures)
+
+
+async def avoid_allergens_in_state(state: RecipeContext, allergens: list[str]) -> str:
+    """
+    Swap out every ingredient containing the given allergens, updating state.
+
+    Substitutes come from the local graph in allergens.py, so no model call
+    is made to match them; the steps are rewritten once for all the swaps.
+
+    Args:
+        state: The thread's current RecipeContext
+        allergens: Allergies or diets as the user names them ("nuts", "vegan")
+
+    Returns:
+        Confirmation message covering every swap, any ingredient that has
+        no safe substitute and any the dietary table couldn't check
+
+    Raises:
+        CommandError: If no recipe is loaded or an allergen is unknown
+    """
+    if state.recipe is None:
+        raise CommandError(NO_RECIPE_MESSAGE)
+
+    swaps, unresolved = plan_allergen_swaps(state.recipe, resolve_allergens(allergens))
+    # Substitutes are all known foods, so these are the same after the swaps
+    unchecked = unrecognised_ingredients(state.recipe)
+    metrics.incr("allergens.swaps", len(swaps))
+    if not swaps and not unresolved and not unchecked:
+        return f"Nothing in this recipe contains {', '.join(allergens)}."
+
+    messages = []
+    if swaps:
+        messages.append(
+            await apply_substitutions(
+                state, [(swap.matched_ingredient, swap) for swap in swaps]
+            )
+        )
+    if unresolved:
+        messages.append(
+            f"I have no safe swap for {', '.join(unresolved)}; leave it out or "
+            "tell me what to use instead."
+        )
+    if unchecked:
+        messages.append(
+            f"I couldn't check {', '.join(unchecked)}; read the label to be sure."
+        )
+    return " ".join(messages)
+
+
 # =============================================================================
 # Recipe Companion Agent (pydantic-ai with AG-UI)
 # =============================================================================
-recipe_agent = Agent(
-    model=GoogleModel(MODEL_NAME),
-    deps_type=StateDeps[RecipeContext],
-    name="recipe_agent",
-)
-
 CHAT_PROMPT = dedent("""
     You are a friendly, expert cooking companion. Your personality is warm,
     encouraging, and practical - like a patient friend who happens to be a great cook.
@@ -261,7 +672,14 @@ CHAT_PROMPT = dedent("""
     - Asks to change servings, scale, double, halve → call scale_recipe
     - Asks to substitute, replace, swap, or change an ingredient → call substitute_ingredient
     - Says "I don't have X" or "can I use Y instead" → call substitute_ingredient
+    - Asks for several swaps at once → call substitute_ingredients once with all of them
+    - Has an allergy or diet to fix the recipe for ("I'm allergic to nuts") → call avoid_allergens
+    - Wants to take back or reapply a change to the recipe → call undo_change or redo_change
     - Says "next step", "done", "what's next" → call update_cooking_progress
+    - Asks for a shopping list, including for other saved recipes → call make_shopping_list
+    - Wants to cook this with other saved recipes at the same time → call plan_cooking
+    - Asks about calories, protein or other nutrition → call get_nutrition
+    - Asks for a timer, or to pause or stop one → call start_timer, pause_timer or cancel_timer
 
     TOOL USAGE IS MANDATORY:
     - If user asks to substitute tomatoes with cherry tomatoes → CALL substitute_ingredient
@@ -272,32 +690,207 @@ CHAT_PROMPT = dedent("""
     - Confirm what was changed
     - Mention any cooking tips related to the change
 
+    Questions like "what do I do now?" or "what's next?" can be answered
+    directly from the current and next step shown below - no tool call is
+    needed just to read the recipe.
+
     CAPABILITIES:
     - Scale recipes up or down, recalculating all quantities
     - Substitute ingredients based on dietary needs or availability
     - Provide step-by-step cooking guidance with timing
+    - Build a combined shopping list for this and other saved recipes
     - Help recover from cooking mistakes
 
     Be encouraging! Cooking should be fun, not stressful.
 """).strip()
 
+# The static CHAT_PROMPT comes first, then the recipe (stable until the recipe
+# changes), then progress (changes every step). Keeping the most volatile text
+# last keeps the longest possible prefix cacheable - see prompt_cache.py.
+# The full ingredient and step list is only sent when it is served from a
+# context cache; otherwise the recipe is summarised and the progress block
+# carries the text of the steps in use.
+recipe_agent = Agent(
+    model=get_model("chat"),
+    deps_type=StateDeps[RecipeContext],
+    name="recipe_agent",
+    instructions=CHAT_PROMPT,
+    history_processors=[compact_history],
+)
+
+
+def _format_quantity(quantity: float | None, unit: str | None) -> str:
+    if quantity is None:
+        return unit or ""
+    return f"{quantity:g} {unit or ''}".strip()
+
+
+def render_recipe_context(recipe: Recipe, full: bool = True) -> str:
+    """
+    Render the recipe deterministically so it forms a stable prompt prefix.
+
+    With full=False only the title, servings and counts are rendered.
+    """
+    lines = [f"CURRENT RECIPE: {recipe.title}"]
+    servings = f"Servings: {recipe.servings}"
+    if recipe.original_servings:
+        servings += f" (originally {recipe.original_servings})"
+    lines.append(servings)
+    if not full:
+        lines.append(f"Ingredients: {len(recipe.ingredients)}")
+        lines.append(f"Steps: {len(recipe.steps)}")
+        return "\n".join(lines)
+
+    lines.append(f"\nIngredients ({len(recipe.ingredients)}):")
+    for ing in recipe.ingredients:
+        amount = _format_quantity(ing.quantity, ing.unit)
+        line = f"- {amount} {ing.name}" if amount else f"- {ing.name}"
+        if ing.preparation:
+            line += f", {ing.preparation}"
+        lines.append(line)
+
+    lines.append(f"\nSteps ({len(recipe.steps)}):")
+    for step in recipe.steps:
+        line = f"{step.step_number}. {step.instruction}"
+        if step.duration_minutes:
+            line += f" ({step.duration_minutes} min)"
+        lines.append(line)
+
+    return "\n".join(lines)
+
 
 @recipe_agent.instructions
 def recipe_instructions(ctx: RunContext[StateDeps[RecipeContext]]) -> str:
-    """Dynamic system prompt with current recipe context."""
-    base_prompt = CHAT_PROMPT
+    """Recipe context, stable for a thread until the recipe changes."""
     state = ctx.deps.state
+    if state.recipe is None:
+        return ""
+    return render_recipe_context(state.recipe, full=prompt_cache.enabled)
+
+
+def _format_step(
+    label: str, step: RecipeStep, recipe: Recipe, full_recipe: bool
+) -> list[str]:
+    # With the full recipe in the prompt, refer to the step instead of
+    # repeating its text and ingredients
+    if full_recipe:
+        line = f"{label}: step {step.step_number}"
+    else:
+        line = f"{label} (step {step.step_number}): {step.instruction}"
+    details = []
+    if step.duration_minutes and not full_recipe:
+        details.append(f"{step.duration_minutes} min")
+    if step.timer_label:
+        details.append(f"timer: {step.timer_label}")
+    if step.requires_attention:
+        details.append("needs constant attention")
+    if details:
+        line += f" [{', '.join(details)}]"
+
+    lines = [line]
+    if step.tips:
+        lines.append(f"  Tips: {'; '.join(step.tips)}")
+    if full_recipe:
+        return lines
+    ingredients = recipe.ingredients_for_step(step)
+    if ingredients:
+        used = []
+        for ing in ingredients:
+            amount = _format_quantity(ing.quantity, ing.unit)
+            used.append(f"{ing.name} ({amount})" if amount else ing.name)
+        lines.append(f"  Uses: {', '.join(used)}")
+    return lines
+
+
+def _render_progress(
+    recipe: Recipe, current_step: int, cooking_started: bool, full_recipe: bool
+) -> str:
+    total = len(recipe.steps)
+    lines = [PROGRESS_HEADER]
+    if not 0 <= current_step < total:
+        lines.append(f"Current step index: {current_step} (no such step)")
+        return "\n".join(lines)
+
+    lines.append(
+        f"Current step index: {current_step} (step {current_step + 1} of {total}, "
+        f"cooking {'started' if cooking_started else 'not started'})"
+    )
+    lines.extend(_format_step("Now", recipe.steps[current_step], recipe, full_recipe))
+    if current_step + 1 < total:
+        next_step = recipe.steps[current_step + 1]
+        lines.extend(_format_step("Next", next_step, recipe, full_recipe))
+    else:
+        lines.append("This is the final step.")
+    return "\n".join(lines)
+
+
+_PROGRESS_CACHE_SIZE = 256
+_progress_cache: dict[tuple, str] = {}
+
+
+def _progress_key(state: RecipeContext) -> tuple:
+    # Only what _render_progress reads: cheap to build and small to keep,
+    # unlike a dump of the whole recipe (source_text included)
+    recipe = state.recipe
+    start = max(state.current_step, 0)
+    steps = tuple(
+        (
+            step.step_number,
+            step.instruction,
+            step.duration_minutes,
+            step.timer_label,
+            step.requires_attention,
+            tuple(step.tips),
+        )
+        for step in recipe.steps[start : start + 2]
+    )
+    ingredients = tuple(
+        (ing.name, ing.quantity, ing.unit) for ing in recipe.ingredients
+    )
+    return (
+        prompt_cache.enabled,
+        state.current_step,
+        state.cooking_started,
+        len(recipe.steps),
+        steps,
+        ingredients,
+    )
 
-    if state.recipe:
-        base_prompt += f"\n\nCURRENT RECIPE: {state.recipe.title}"
-        base_prompt += f"\nServings: {state.recipe.servings}"
-        if state.recipe.original_servings:
-            base_prompt += f" (originally {state.recipe.original_servings})"
-        base_prompt += f"\nIngredients: {len(state.recipe.ingredients)}"
-        base_prompt += f"\nSteps: {len(state.recipe.steps)}"
-        base_prompt += f"\nCurrent step: {state.current_step}"
 
-    return base_prompt
+def render_progress_context(state: RecipeContext) -> str:
+    """
+    Render the current and next step with the ingredients they use.
+
+    When the full recipe is in the (context-cached) prompt, the steps are
+    referred to by number instead of repeating their text. Memoized per state
+    version (the steps and ingredients shown, the step index and the started
+    flag), so repeated turns at the same step reuse the rendered text. The
+    time left, which depends on every step after the current one, is added
+    after the memoized part.
+    """
+    if state.recipe is None:
+        return ""
+
+    key = _progress_key(state)
+    if key not in _progress_cache:
+        if len(_progress_cache) >= _PROGRESS_CACHE_SIZE:
+            _progress_cache.pop(next(iter(_progress_cache)))
+        _progress_cache[key] = _render_progress(
+            state.recipe,
+            state.current_step,
+            state.cooking_started,
+            full_recipe=prompt_cache.enabled,
+        )
+    if not 0 <= state.current_step < len(state.recipe.steps):
+        return _progress_cache[key]
+    timing = recipe_timing(state.recipe, state.current_step)
+    return f"{_progress_cache[key]}\n{format_timing(timing)}"
+
+
+@recipe_agent.instructions
+def progress_instructions(ctx: RunContext[StateDeps[RecipeContext]]) -> str:
+    """Cooking progress, which changes from turn to turn."""
+    return render_progress_context(ctx.deps.state)
 
 
 # =============================================================================
@@ -318,24 +911,22 @@ def scale_recipe(
         target_servings: The target number of servings to scale to
     """
     state = ctx.deps.state
-    if state.recipe is None:
-        return "No recipe is currently loaded. Please upload a recipe first."
-
-    original_servings = state.recipe.servings
-    state.recipe = state.recipe.scale(target_servings)
-    state.scaled_servings = target_servings
-
-    logger.info(f"Scaled recipe from {original_servings} to {target_servings} servings")
+    try:
+        scale_state(state, target_servings)
+    except CommandError as e:
+        return str(e)
 
     return StateSnapshotEvent(type=EventType.STATE_SNAPSHOT, snapshot=state)
 
 
-@recipe_agent.tool
+# Substitution tools run sequentially: each one replaces state.recipe, so
+# concurrent calls in the same turn would overwrite each other's changes.
+@recipe_agent.tool(sequential=True)
 async def substitute_ingredient(
     ctx: RunContext[StateDeps[RecipeContext]],
     original_ingredient: str,
     substitute_name: str,
-) -> StateSnapshotEvent | str:
+) -> ToolReturn | str:
     """
     Replace an ingredient with a substitute using intelligent matching.
 
@@ -348,44 +939,102 @@ async def substitute_ingredient(
         substitute_name: Name of the substitute ingredient
     """
     state = ctx.deps.state
-    if state.recipe is None:
-        return "No recipe is currently loaded. Please upload a recipe first."
+    try:
+        message = await substitute_in_state(state, original_ingredient, substitute_name)
+    except CommandError as e:
+        return str(e)
 
-    # Use LLM to find best match and get substitution details
-    result = await find_and_substitute(
-        state.recipe, original_ingredient, substitute_name
+    return ToolReturn(
+        return_value=message,
+        metadata=StateSnapshotEvent(type=EventType.STATE_SNAPSHOT, snapshot=state),
     )
 
-    if result.matched_ingredient is None:
-        # No match found - return helpful suggestion
-        suggestion = (
-            result.suggestion
-            or f"Could not find '{original_ingredient}' in the recipe."
-        )
-        available = ", ".join(ing.name for ing in state.recipe.ingredients[:5])
-        return f"{suggestion} Available ingredients include: {available}"
-
-    # Apply the substitution using the matched ingredient name
-    state.recipe = state.recipe.substitute_ingredient(
-        result.matched_ingredient,
-        result.substitute_name,
-        result.substitute_quantity,
-        result.substitute_unit,
+
+@recipe_agent.tool(sequential=True)
+async def substitute_ingredients(
+    ctx: RunContext[StateDeps[RecipeContext]],
+    substitutions: list[IngredientSwap],
+) -> ToolReturn | str:
+    """
+    Replace several ingredients in one go.
+
+    Use instead of repeated substitute_ingredient calls when the user asks
+    for more than one swap (e.g. "swap butter for oil and cream for milk").
+    Matching runs in parallel and the steps are updated once.
+
+    Args:
+        substitutions: Each ingredient to replace and its substitute
+    """
+    state = ctx.deps.state
+    try:
+        message = await substitute_many_in_state(state, substitutions)
+    except CommandError as e:
+        return str(e)
+
+    # The model sees the outcome of every swap, including any that failed;
+    # the snapshot travels to the frontend as an AG-UI event
+    return ToolReturn(
+        return_value=message,
+        metadata=StateSnapshotEvent(type=EventType.STATE_SNAPSHOT, snapshot=state),
     )
 
-    # Rewrite steps to reflect the substitution
-    state.recipe.steps = await rewrite_steps_for_substitution(
-        state.recipe,
-        result.matched_ingredient,
-        result.substitute_name,
+
+@recipe_agent.tool(sequential=True)
+async def avoid_allergens(
+    ctx: RunContext[StateDeps[RecipeContext]],
+    allergens: list[str],
+) -> ToolReturn | str:
+    """
+    Make the recipe safe for allergies or diets, swapping every ingredient
+    that contains them in one go.
+
+    Use instead of substitute_ingredient calls when the user names an allergy
+    or diet rather than an ingredient ("I'm allergic to nuts", "make it
+    dairy-free"). Substitutes are picked automatically.
+
+    Args:
+        allergens: What to avoid, e.g. ["nuts"], ["gluten", "dairy"], ["vegan"]
+    """
+    state = ctx.deps.state
+    try:
+        message = await avoid_allergens_in_state(state, allergens)
+    except CommandError as e:
+        return str(e)
+
+    return ToolReturn(
+        return_value=message,
+        metadata=StateSnapshotEvent(type=EventType.STATE_SNAPSHOT, snapshot=state),
     )
 
-    logger.info(
-        f"Substituted '{result.matched_ingredient}' with '{result.substitute_name}' "
-        f"(user requested: '{original_ingredient}', confidence: {result.confidence})"
+
+def _state_tool(state: RecipeContext, operation: Callable[[], str]) -> ToolReturn | str:
+    try:
+        message = operation()
+    except CommandError as e:
+        return str(e)
+    return ToolReturn(
+        return_value=message,
+        metadata=StateSnapshotEvent(type=EventType.STATE_SNAPSHOT, snapshot=state),
     )
 
-    return StateSnapshotEvent(type=EventType.STATE_SNAPSHOT, snapshot=state)
+
+@recipe_agent.tool
+def undo_change(ctx: RunContext[StateDeps[RecipeContext]]) -> ToolReturn | str:
+    """
+    Undo the last change to the recipe (a substitution or scaling).
+
+    Use instead of substituting back when the user wants to revert: the
+    previous version is restored exactly, step text included.
+    """
+    state = ctx.deps.state
+    return _state_tool(state, lambda: undo_state(state))
+
+
+@recipe_agent.tool
+def redo_change(ctx: RunContext[StateDeps[RecipeContext]]) -> ToolReturn | str:
+    """Reapply the last change that was undone."""
+    state = ctx.deps.state
+    return _state_tool(state, lambda: redo_state(state))
 
 
 @recipe_agent.tool
@@ -406,12 +1055,145 @@ def update_cooking_progress(
     state = ctx.deps.state
 
     if current_step is not None:
-        if state.recipe and 0 <= current_step < len(state.recipe.steps):
-            state.current_step = current_step
-            logger.info(f"Updated current step to {current_step}")
+        try:
+            set_current_step(state, current_step)
+        except CommandError as e:
+            logger.info(f"Ignored step update: {e}")
 
     if cooking_started is not None:
-        state.cooking_started = cooking_started
-        logger.info(f"Updated cooking_started to {cooking_started}")
+        set_cooking_started(state, cooking_started)
 
     return StateSnapshotEvent(type=EventType.STATE_SNAPSHOT, snapshot=state)
+
+
+@recipe_agent.tool
+def start_timer(
+    ctx: RunContext[StateDeps[RecipeContext]],
+    step_number: int | None = None,
+    minutes: float | None = None,
+    label: str | None = None,
+) -> ToolReturn | str:
+    """
+    Start a countdown timer, run by the server until it goes off.
+
+    Use when the user asks for a timer or starts a timed step ("the pasta's
+    in"). With no arguments it times the current step; a paused timer with
+    the same label is resumed.
+
+    Args:
+        step_number: Step to time (1-based), if not the current one
+        minutes: Duration, if the step has none or the user wants another
+        label: Short name for the timer, e.g. "pasta"
+    """
+    state = ctx.deps.state
+    seconds = round(minutes * 60) if minutes else None
+    return _state_tool(
+        state, lambda: start_timer_in_state(state, step_number, seconds, label)
+    )
+
+
+@recipe_agent.tool
+def pause_timer(
+    ctx: RunContext[StateDeps[RecipeContext]], label: str
+) -> ToolReturn | str:
+    """
+    Pause a running timer, keeping the time left.
+
+    Args:
+        label: The timer's name
+    """
+    state = ctx.deps.state
+    return _state_tool(state, lambda: pause_timer_in_state(state, label))
+
+
+@recipe_agent.tool
+def cancel_timer(
+    ctx: RunContext[StateDeps[RecipeContext]], label: str
+) -> ToolReturn | str:
+    """
+    Cancel a timer.
+
+    Args:
+        label: The timer's name
+    """
+    state = ctx.deps.state
+    return _state_tool(state, lambda: cancel_timer_in_state(state, label))
+
+
+@recipe_agent.tool
+def get_nutrition(ctx: RunContext[StateDeps[RecipeContext]]) -> str:
+    """
+    Estimate calories and macronutrients, per serving and in total.
+
+    Use when the user asks about calories, protein, fat, carbs or fiber.
+    Figures are for the recipe as currently scaled and substituted.
+    """
+    state = ctx.deps.state
+    if state.recipe is None:
+        return NO_RECIPE_MESSAGE
+    return format_nutrition(state.nutrition or recipe_nutrition(state.recipe))
+
+
+async def _with_saved_recipes(
+    recipe: Recipe, titles: list[str] | None
+) -> tuple[list[Recipe], list[str]]:
+    """The current recipe plus saved ones found by title, and titles not found."""
+    recipes = [recipe]
+    missing = []
+    for title in titles or []:
+        if (saved := await get_sessions().find_recipe(title)) is None:
+            missing.append(title)
+        else:
+            recipes.append(saved)
+    return recipes, missing
+
+
+@recipe_agent.tool
+async def make_shopping_list(
+    ctx: RunContext[StateDeps[RecipeContext]],
+    saved_recipes: list[str] | None = None,
+) -> str:
+    """
+    Build a shopping list for the current recipe, merged with saved recipes.
+
+    Use when the user asks what to buy, optionally for several recipes
+    (e.g. "make a shopping list for this and the lasagne I saved").
+
+    Args:
+        saved_recipes: Titles of other saved recipes to include
+    """
+    state = ctx.deps.state
+    if state.recipe is None:
+        return NO_RECIPE_MESSAGE
+
+    recipes, missing = await _with_saved_recipes(state.recipe, saved_recipes)
+    text = format_shopping_list(build_shopping_list(recipes))
+    if missing:
+        text += f"\n\nNo saved recipe found for: {', '.join(missing)}"
+    return text
+
+
+@recipe_agent.tool
+async def plan_cooking(
+    ctx: RunContext[StateDeps[RecipeContext]],
+    saved_recipes: list[str],
+) -> str:
+    """
+    Plan how to cook the current recipe together with saved recipes.
+
+    Use when the user wants to make several dishes at once (e.g. "I'm making
+    this with the roast potatoes I saved, what order should I do things?").
+    Hands-off steps such as simmering or baking overlap with other work.
+
+    Args:
+        saved_recipes: Titles of the saved recipes to cook alongside this one
+    """
+    state = ctx.deps.state
+    if state.recipe is None:
+        return NO_RECIPE_MESSAGE
+
+    recipes, missing = await _with_saved_recipes(state.recipe, saved_recipes)
+    text = format_meal_plan(schedule_recipes(recipes))
+    if missing:
+        text += f"\n\nNo saved recipe found for: {', '.join(missing)}"
+    return text
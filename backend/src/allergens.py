@@ -0,0 +1,353 @@
+"""
+Allergen-Free Swaps
+
+Plans every substitution needed to make a recipe safe for an allergy or
+diet ("nuts", "dairy", "vegan") locally, so the whole recipe can be fixed
+with at most one model call (the consolidated step rewrite) instead of two
+per offending ingredient.
+
+- Allergens: ALLERGENS maps what a user might say to the ingredient
+  properties from dietary.py it rules out ("tree nuts" -> nut, "coeliac" ->
+  gluten, "vegan" -> every animal product).
+- Graph: SUBSTITUTION_GRAPH links an ingredient to the substitutes cooks
+  usually reach for, each with its grocery category and a quantity ratio.
+  Ingredients are found in the graph like foods in nutrition.py: the longest
+  run of their words that names a node, nearest the end first.
+- Search: candidates up to MAX_SEARCH_DEPTH edges away are checked with
+  ingredient_properties, so a substitute that carries another avoided
+  allergen (almond milk when avoiding nuts), or that the dietary table
+  doesn't recognise, is passed over. Safe candidates
+  in the ingredient's own category rank first, then the nearest, then the
+  most usual.
+
+Planned swaps are SubstitutionResults, applied by agents.apply_substitutions
+exactly like swaps the model matched.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import NamedTuple
+
+from .commands import CommandError
+from .dietary import TAG_RULES, UNKNOWN, ingredient_properties
+from .models import (
+    Ingredient,
+    Recipe,
+    SubstitutionResult,
+    ingredient_key,
+    normalize_name,
+)
+
+# Edges followed from an ingredient when its direct substitutes all clash
+MAX_SEARCH_DEPTH = 2
+
+# What a user might call an allergy or diet -> properties it rules out
+ALLERGENS: dict[str, frozenset[str]] = {
+    "nut": frozenset({"nut"}),
+    "tree nut": frozenset({"nut"}),
+    "peanut": frozenset({"nut"}),
+    "dairy": frozenset({"dairy"}),
+    "milk": frozenset({"dairy"}),
+    "lactose": frozenset({"dairy"}),
+    "egg": frozenset({"egg"}),
+    "gluten": frozenset({"gluten"}),
+    "wheat": frozenset({"gluten"}),
+    "coeliac": frozenset({"gluten"}),
+    "celiac": frozenset({"gluten"}),
+    "fish": frozenset({"fish"}),
+    "shellfish": frozenset({"fish"}),
+    "seafood": frozenset({"fish"}),
+    "soy": frozenset({"soy"}),
+    "soya": frozenset({"soy"}),
+    "sesame": frozenset({"sesame"}),
+    "meat": frozenset({"meat"}),
+    "vegetarian": TAG_RULES["vegetarian"],
+    "vegan": TAG_RULES["vegan"],
+}
+
+
+class Candidate(NamedTuple):
+    """A substitute one edge away in the substitution graph."""
+
+    name: str
+    category: str
+    # Substitute quantity per unit of the original
+    ratio: float = 1.0
+
+
+def _each(words: str, candidates: tuple[Candidate, ...]) -> dict:
+    return {word: candidates for word in words.split()}
+
+
+_PASTA = (
+    "pasta spaghetti penne fusilli macaroni linguine tagliatelle fettuccine "
+    "rigatoni lasagne orzo"
+)
+_PLANT_MILKS = (
+    Candidate("oat milk", "dairy"),
+    Candidate("soy milk", "dairy"),
+    Candidate("rice milk", "dairy"),
+    Candidate("almond milk", "dairy"),
+)
+_PLANT_YOGURTS = (
+    Candidate("coconut yogurt", "dairy"),
+    Candidate("soy yogurt", "dairy"),
+)
+_SEEDS = (
+    Candidate("sunflower seeds", "pantry"),
+    Candidate("pumpkin seeds", "pantry"),
+)
+_SEED_BUTTERS = (
+    Candidate("sunflower seed butter", "pantry"),
+    Candidate("tahini", "pantry"),
+)
+_MEAT_FREE = (
+    Candidate("tofu", "protein"),
+    Candidate("tempeh", "protein"),
+    Candidate("chickpeas", "protein"),
+)
+
+SUBSTITUTION_GRAPH: dict[str, tuple[Candidate, ...]] = {
+    # Dairy
+    "butter": (
+        Candidate("vegan butter", "dairy"),
+        Candidate("olive oil", "pantry", 0.75),
+        Candidate("coconut oil", "pantry"),
+    ),
+    "ghee": (Candidate("coconut oil", "pantry"), Candidate("olive oil", "pantry")),
+    "milk": _PLANT_MILKS,
+    "buttermilk": _PLANT_MILKS,
+    "cream": (
+        Candidate("coconut cream", "dairy"),
+        Candidate("oat cream", "dairy"),
+        Candidate("cashew cream", "dairy"),
+    ),
+    "yogurt": _PLANT_YOGURTS,
+    "yoghurt": _PLANT_YOGURTS,
+    "sour cream": _PLANT_YOGURTS,
+    "creme fraiche": _PLANT_YOGURTS,
+    "cream cheese": (Candidate("dairy-free cream cheese", "dairy"),),
+    **_each(
+        "cheese cheddar mozzarella feta gouda gruyere",
+        (Candidate("dairy-free cheese", "dairy"),),
+    ),
+    **_each(
+        "parmesan parmigiano pecorino",
+        (
+            Candidate("dairy-free parmesan", "dairy"),
+            Candidate("nutritional yeast", "pantry", 0.5),
+        ),
+    ),
+    "ricotta": (
+        Candidate("dairy-free ricotta", "dairy"),
+        Candidate("silken tofu", "protein"),
+    ),
+    # Egg
+    "egg": (
+        Candidate("flax egg", "pantry"),
+        Candidate("chia egg", "pantry"),
+        Candidate("egg replacer", "pantry"),
+    ),
+    **_each("mayonnaise mayo", (Candidate("vegan mayonnaise", "pantry"),)),
+    "egg noodle": (Candidate("rice noodles", "pantry"),),
+    # Gluten
+    "flour": (
+        Candidate("gluten-free flour", "pantry"),
+        Candidate("rice flour", "pantry"),
+    ),
+    **{
+        word: (
+            Candidate(f"gluten-free {word}", "pantry"),
+            Candidate("rice noodles", "pantry"),
+        )
+        for word in _PASTA.split()
+    },
+    "noodle": (Candidate("rice noodles", "pantry"),),
+    **_each("couscous bulgur", (Candidate("quinoa", "pantry"),)),
+    "barley": (Candidate("brown rice", "pantry"),),
+    **_each(
+        "breadcrumb panko",
+        (
+            Candidate("gluten-free breadcrumbs", "pantry"),
+            Candidate("ground almonds", "pantry"),
+        ),
+    ),
+    "bread": (Candidate("gluten-free bread", "pantry"),),
+    "tortilla": (Candidate("corn tortillas", "pantry"),),
+    "oat": (Candidate("gluten-free oats", "pantry"),),
+    "soy sauce": (
+        Candidate("tamari", "pantry"),
+        Candidate("coconut aminos", "pantry"),
+    ),
+    # Nuts
+    **_each(
+        "nut almond walnut pecan cashew pistachio hazelnut macadamia peanut", _SEEDS
+    ),
+    "peanut butter": _SEED_BUTTERS,
+    "almond butter": _SEED_BUTTERS,
+    "cashew butter": _SEED_BUTTERS,
+    "nut butter": _SEED_BUTTERS,
+    "almond milk": (Candidate("oat milk", "dairy"), Candidate("soy milk", "dairy")),
+    "cashew milk": (Candidate("oat milk", "dairy"), Candidate("soy milk", "dairy")),
+    "almond flour": (
+        Candidate("sunflower seed meal", "pantry"),
+        Candidate("oat flour", "pantry"),
+    ),
+    "ground almond": (
+        Candidate("sunflower seed meal", "pantry"),
+        Candidate("oat flour", "pantry"),
+    ),
+    "pesto": (
+        Candidate("nut-free pesto", "pantry"),
+        Candidate("vegan pesto", "pantry"),
+    ),
+    # Fish and shellfish
+    "fish sauce": (
+        Candidate("soy sauce", "pantry"),
+        Candidate("coconut aminos", "pantry"),
+    ),
+    "worcestershire sauce": (
+        Candidate("vegan worcestershire sauce", "pantry"),
+        Candidate("soy sauce", "pantry"),
+    ),
+    "anchovy": (Candidate("capers", "pantry"), Candidate("miso", "pantry")),
+    **_each(
+        "fish salmon tuna cod haddock trout prawn shrimp crab lobster mussel "
+        "scallop squid",
+        (Candidate("chicken breast", "protein"), *_MEAT_FREE),
+    ),
+    # Meat
+    **_each("chicken turkey pork beef lamb steak", _MEAT_FREE),
+    "mince": (Candidate("lentils", "protein"), Candidate("mushrooms", "produce")),
+    **_each(
+        "bacon pancetta ham chorizo sausage",
+        (Candidate("smoked tofu", "protein"), Candidate("mushrooms", "produce")),
+    ),
+    "chicken stock": (Candidate("vegetable stock", "pantry"),),
+    "beef stock": (Candidate("vegetable stock", "pantry"),),
+    "chicken broth": (Candidate("vegetable broth", "pantry"),),
+    "beef broth": (Candidate("vegetable broth", "pantry"),),
+    **_each("gelatin gelatine", (Candidate("agar agar", "pantry", 0.5),)),
+    "honey": (Candidate("maple syrup", "pantry"), Candidate("agave syrup", "pantry")),
+    # Soy and sesame
+    "tofu": (Candidate("chickpeas", "protein"), Candidate("paneer", "dairy")),
+    "soy milk": (Candidate("oat milk", "dairy"), Candidate("rice milk", "dairy")),
+    "edamame": (Candidate("peas", "produce"),),
+    "tamari": (Candidate("coconut aminos", "pantry"),),
+    "miso": (Candidate("tahini", "pantry"), Candidate("nutritional yeast", "pantry")),
+    "tahini": (Candidate("sunflower seed butter", "pantry"),),
+    "sesame oil": (Candidate("olive oil", "pantry"),),
+    "sesame": _SEEDS,
+    "sesame seed": _SEEDS,
+}
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_GRAPH = {ingredient_key(name): edges for name, edges in SUBSTITUTION_GRAPH.items()}
+_ALLERGEN_INDEX = {ingredient_key(name): props for name, props in ALLERGENS.items()}
+
+
+def _key(name: str) -> str:
+    return ingredient_key(_PUNCTUATION_RE.sub(" ", name))
+
+
+def resolve_allergens(allergens: list[str]) -> frozenset[str]:
+    """
+    The ingredient properties to avoid for allergies or diets as a user
+    names them ("nuts", "gluten-free", "vegan").
+
+    Raises:
+        CommandError: If an allergen is not one we know
+    """
+    avoid: set[str] = set()
+    for allergen in allergens:
+        key = _key(allergen).removesuffix(" free").removesuffix(" allergy")
+        if key not in _ALLERGEN_INDEX:
+            known = ", ".join(name for name in ALLERGENS if " " not in name)
+            raise CommandError(
+                f"I don't know which ingredients contain '{allergen}'. "
+                f"I can avoid: {known}."
+            )
+        avoid |= _ALLERGEN_INDEX[key]
+    return frozenset(avoid)
+
+
+def graph_node(name: str) -> str | None:
+    """The substitution graph node for an ingredient name, if any."""
+    words = _key(name).split()
+    for length in range(len(words), 0, -1):
+        for start in range(len(words) - length, -1, -1):
+            node = " ".join(words[start : start + length])
+            if node in _GRAPH:
+                return node
+    return None
+
+
+def find_safe_substitute(
+    ingredient: Ingredient, avoid: frozenset[str]
+) -> tuple[Candidate, float] | None:
+    """
+    The best substitute for an ingredient that has none of the avoided
+    properties, with its quantity ratio along the path taken, or None.
+    """
+    start = graph_node(ingredient.name)
+    if start is None:
+        return None
+    best: tuple[tuple[bool, int, int], Candidate, float] | None = None
+    frontier = [(start, 1.0)]
+    seen = {start}
+    for depth in range(MAX_SEARCH_DEPTH):
+        next_frontier = []
+        for node, ratio in frontier:
+            for position, candidate in enumerate(_GRAPH[node]):
+                path_ratio = ratio * candidate.ratio
+                # A substitute the dietary table doesn't know isn't safe
+                if not ingredient_properties(candidate.name) & (avoid | {UNKNOWN}):
+                    rank = (candidate.category != ingredient.category, depth, position)
+                    if best is None or rank < best[0]:
+                        best = (rank, candidate, path_ratio)
+                key = _key(candidate.name)
+                if key in _GRAPH and key not in seen:
+                    seen.add(key)
+                    next_frontier.append((key, path_ratio))
+        frontier = next_frontier
+    return None if best is None else (best[1], best[2])
+
+
+def plan_allergen_swaps(
+    recipe: Recipe, avoid: frozenset[str]
+) -> tuple[list[SubstitutionResult], list[str]]:
+    """
+    Substitutions that remove every avoided property from a recipe.
+
+    Returns:
+        The swaps, in ingredient order, and the names of offending
+        ingredients with no safe substitute in the graph
+    """
+    swaps: list[SubstitutionResult] = []
+    unresolved: list[str] = []
+    seen: set[str] = set()
+    for ing in recipe.ingredients:
+        # Same-named ingredients are all replaced by one swap
+        if normalize_name(ing.name) in seen:
+            continue
+        seen.add(normalize_name(ing.name))
+        if not ingredient_properties(ing.name) & avoid:
+            continue
+        found = find_safe_substitute(ing, avoid)
+        if found is None:
+            unresolved.append(ing.name)
+            continue
+        candidate, ratio = found
+        quantity = ing.quantity
+        if quantity is not None and ratio != 1.0:
+            quantity = round(quantity * ratio, 2)
+        swaps.append(
+            SubstitutionResult(
+                matched_ingredient=ing.name,
+                substitute_name=candidate.name,
+                substitute_quantity=quantity,
+                confidence=1.0,
+            )
+        )
+    return swaps, unresolved
@@ -0,0 +1,139 @@
+"""
+AG-UI Chat Endpoint
+
+ASGI app mounted at /copilotkit. Each run first goes through the local intent
+router: clear single-tool requests are executed directly and streamed back as
+a STATE_SNAPSHOT plus a templated message, without a chat model turn.
+Everything else is handed to recipe_agent as before.
+"""
+
+from __future__ import annotations
+
+import logging
+import uuid
+from collections.abc import AsyncIterator
+from http import HTTPStatus
+
+from ag_ui.core import (
+    BaseEvent,
+    EventType,
+    RunAgentInput,
+    RunFinishedEvent,
+    RunStartedEvent,
+    StateSnapshotEvent,
+    TextMessageContentEvent,
+    TextMessageEndEvent,
+    TextMessageStartEvent,
+)
+from pydantic import ValidationError
+from pydantic_ai.ag_ui import StateDeps
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from .agents import recipe_agent
+from .commands import CommandError
+from .intents import Intent, execute_intent, route_intent
+from .metrics import metrics
+from .models import RecipeContext
+from .serialization import FastAGUIAdapter
+from .sessions import get_sessions
+from .sse_compression import SSECompressionMiddleware
+from .timers import get_timers
+
+logger = logging.getLogger(__name__)
+
+
+def latest_user_message(run_input: RunAgentInput) -> str | None:
+    """Return the text of the last message if it was sent by the user."""
+    if not run_input.messages:
+        return None
+    message = run_input.messages[-1]
+    if message.role != "user" or not isinstance(message.content, str):
+        return None
+    return message.content
+
+
+async def fast_path_events(
+    run_input: RunAgentInput, state: RecipeContext, intent: Intent
+) -> AsyncIterator[BaseEvent]:
+    """Run an intent locally and emit the same events an agent run would."""
+    yield RunStartedEvent(
+        type=EventType.RUN_STARTED,
+        thread_id=run_input.thread_id,
+        run_id=run_input.run_id,
+    )
+
+    try:
+        text = await execute_intent(state, intent)
+    except CommandError as e:
+        text = str(e)
+    else:
+        yield StateSnapshotEvent(type=EventType.STATE_SNAPSHOT, snapshot=state)
+
+    message_id = str(uuid.uuid4())
+    yield TextMessageStartEvent(
+        type=EventType.TEXT_MESSAGE_START, message_id=message_id, role="assistant"
+    )
+    yield TextMessageContentEvent(
+        type=EventType.TEXT_MESSAGE_CONTENT, message_id=message_id, delta=text
+    )
+    yield TextMessageEndEvent(type=EventType.TEXT_MESSAGE_END, message_id=message_id)
+
+    get_timers().sync(run_input.thread_id, state)
+    get_sessions().save(run_input.thread_id, state)
+    yield RunFinishedEvent(
+        type=EventType.RUN_FINISHED,
+        thread_id=run_input.thread_id,
+        run_id=run_input.run_id,
+    )
+
+
+async def persist_after(
+    events: AsyncIterator[BaseEvent], thread_id: str, deps: StateDeps[RecipeContext]
+) -> AsyncIterator[BaseEvent]:
+    """Pass an agent run's events through, saving its final state at the end."""
+    async for event in events:
+        if event.type == EventType.RUN_FINISHED:
+            # Arms timers the agent started and keeps ones started elsewhere
+            get_timers().sync(thread_id, deps.state)
+            get_sessions().save(thread_id, deps.state)
+        yield event
+
+
+async def run_chat(request: Request) -> Response:
+    """Handle an AG-UI run, short-circuiting clear single-tool requests."""
+    try:
+        adapter = await FastAGUIAdapter.from_request(request, agent=recipe_agent)
+        state = RecipeContext.model_validate(adapter.state or {})
+    except ValidationError as e:
+        return Response(
+            content=e.json(),
+            media_type="application/json",
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+        )
+
+    message = latest_user_message(adapter.run_input)
+    intent = route_intent(message, state) if message else None
+
+    if intent is not None:
+        logger.info(f"Routed '{message}' to {intent.tool} without the chat model")
+        metrics.incr("intent_router.fast_path")
+        metrics.incr(f"intent_router.{intent.tool}")
+        return adapter.streaming_response(
+            fast_path_events(adapter.run_input, state, intent)
+        )
+
+    metrics.incr("intent_router.agent")
+    deps = StateDeps(RecipeContext())
+    return adapter.streaming_response(
+        persist_after(adapter.run_stream(deps=deps), adapter.run_input.thread_id, deps)
+    )
+
+
+chat_app = Starlette(
+    routes=[Route("/", run_chat, methods=["POST"])],
+    middleware=[Middleware(SSECompressionMiddleware)],
+)
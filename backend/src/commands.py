@@ -0,0 +1,181 @@
+"""
+Deterministic Cooking Commands
+
+Step navigation, scaling and undo/redo applied directly to RecipeContext
+without a model turn. The agent tools and the /commands endpoint share these
+functions, so both apply the same validation.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from .models import CookingCommand, RecipeContext
+from .timing import refresh_timing
+from .versions import checkout_version, scale_version
+
+logger = logging.getLogger(__name__)
+
+NO_RECIPE_MESSAGE = "No recipe is currently loaded. Please upload a recipe first."
+
+
+class CommandError(ValueError):
+    """Raised when a command cannot be applied to the current state."""
+
+
+# =============================================================================
+# State Operations
+# =============================================================================
+
+
+def scale_state(state: RecipeContext, target_servings: int) -> str:
+    """Scale the loaded recipe in place. Returns a confirmation message."""
+    if state.recipe is None:
+        raise CommandError(NO_RECIPE_MESSAGE)
+    if target_servings < 1:
+        raise CommandError("Servings must be at least 1.")
+
+    original_servings = state.recipe.servings
+    # Scaled from the original recipe, so repeated scaling stays exact
+    scale_version(state, target_servings)
+    state.scaled_servings = target_servings
+
+    logger.info(f"Scaled recipe from {original_servings} to {target_servings} servings")
+    return f"Scaled from {original_servings} to {target_servings} servings."
+
+
+def set_current_step(state: RecipeContext, current_step: int) -> str:
+    """Move to a step (0-indexed) in place. Returns a confirmation message."""
+    if state.recipe is None:
+        raise CommandError(NO_RECIPE_MESSAGE)
+
+    total = len(state.recipe.steps)
+    if current_step < 0 and state.current_step == 0:
+        # "Go back" from the first step
+        raise CommandError("You're already on the first step.")
+    if not 0 <= current_step < total:
+        raise CommandError(f"Step {current_step + 1} does not exist ({total} steps).")
+
+    state.current_step = current_step
+    refresh_timing(state)
+    logger.info(f"Updated current step to {current_step}")
+    return f"Now on step {current_step + 1} of {total}."
+
+
+def set_cooking_started(state: RecipeContext, cooking_started: bool) -> str:
+    """Set whether cooking has started. Returns a confirmation message."""
+    state.cooking_started = cooking_started
+    logger.info(f"Updated cooking_started to {cooking_started}")
+    return "Cooking started." if cooking_started else "Cooking stopped."
+
+
+def undo_state(state: RecipeContext) -> str:
+    """Go back to the previous recipe version. Returns a confirmation message."""
+    if state.recipe is None:
+        raise CommandError(NO_RECIPE_MESSAGE)
+    history = state.history
+    if history is None or history.position == 0:
+        raise CommandError("There is nothing to undo.")
+
+    undone = history.versions[history.position]
+    checkout_version(state, history.position - 1)
+    logger.info(f"Undid '{undone.label}'")
+    return f"Undid: {undone.label}."
+
+
+def redo_state(state: RecipeContext) -> str:
+    """Reapply the last undone recipe version. Returns a confirmation message."""
+    if state.recipe is None:
+        raise CommandError(NO_RECIPE_MESSAGE)
+    history = state.history
+    if history is None or history.position == len(history.versions) - 1:
+        raise CommandError("There is nothing to redo.")
+
+    redone = checkout_version(state, history.position + 1)
+    logger.info(f"Redid '{redone.label}'")
+    return f"Redid: {redone.label}."
+
+
+def apply_command(state: RecipeContext, command: CookingCommand) -> str:
+    """
+    Apply a cooking command to the state in place.
+
+    Args:
+        state: The thread's current RecipeContext
+        command: The command to apply
+
+    Returns:
+        Confirmation message for the user
+
+    Raises:
+        CommandError: If the command is invalid for the current state
+    """
+    match command.action:
+        case "next_step":
+            return set_current_step(state, state.current_step + 1)
+        case "previous_step":
+            return set_current_step(state, state.current_step - 1)
+        case "restart":
+            return set_current_step(state, 0)
+        case "go_to_step":
+            if command.step is None:
+                raise CommandError("go_to_step requires a step.")
+            return set_current_step(state, command.step)
+        case "scale":
+            if command.servings is None:
+                raise CommandError("scale requires servings.")
+            return scale_state(state, command.servings)
+        case "start_cooking":
+            return set_cooking_started(state, True)
+        case "stop_cooking":
+            return set_cooking_started(state, False)
+        case "undo":
+            return undo_state(state)
+        case "redo":
+            return redo_state(state)
+
+
+# =============================================================================
+# State Delta (JSON Patch, as used by AG-UI STATE_DELTA events)
+# =============================================================================
+
+
+def _escape(key: str) -> str:
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+def state_delta(before: Any, after: Any, path: str = "") -> list[dict[str, Any]]:
+    """
+    Compute RFC 6902 JSON Patch operations that turn before into after.
+
+    Dicts and equal-length lists are diffed recursively; anything else that
+    differs is replaced wholesale.
+    """
+    if before == after:
+        return []
+
+    if isinstance(before, dict) and isinstance(after, dict):
+        ops: list[dict[str, Any]] = []
+        for key in before:
+            if key not in after:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in after.items():
+            child = f"{path}/{_escape(key)}"
+            if key in before:
+                ops.extend(state_delta(before[key], value, child))
+            else:
+                ops.append({"op": "add", "path": child, "value": value})
+        return ops
+
+    if (
+        isinstance(before, list)
+        and isinstance(after, list)
+        and len(before) == len(after)
+    ):
+        ops = []
+        for index, (old, new) in enumerate(zip(before, after, strict=True)):
+            ops.extend(state_delta(old, new, f"{path}/{index}"))
+        return ops
+
+    return [{"op": "replace", "path": path, "value": after}]
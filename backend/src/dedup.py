@@ -0,0 +1,229 @@
+"""
+Near-duplicate Upload Detection
+
+The same recipe exported to PDF twice rarely extracts to identical text:
+whitespace, page headers and footers, and page numbers move around. Before
+parsing an upload, the normalized text is compared against previously parsed
+documents with MinHash + LSH; a match above NEAR_DUP_THRESHOLD reuses the
+stored Recipe instead of calling the model.
+
+- Text is lowercased, page furniture (page numbers, URLs) dropped, and split
+  into overlapping word shingles.
+- Each document keeps a NUM_PERM-value MinHash signature (4 bytes per value),
+  so the in-memory index is about 0.5 KB per document plus the LSH buckets.
+  Computing a signature is the expensive part (pure Python, roughly 30 ms
+  per thousand words), so find() returns it for add() to reuse.
+- The signature is split into LSH_BANDS bands; documents sharing any band are
+  candidates, then the estimated Jaccard similarity is checked against the
+  threshold. Lookup cost depends on the number of candidates, not documents.
+
+Signatures and recipes are persisted to SQLite next to the sessions, loaded
+back into memory at startup, and topped up before each lookup with documents
+added by other workers.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import re
+import sqlite3
+import time
+import zlib
+from array import array
+from threading import Lock
+
+from .metrics import metrics
+from .models import Recipe
+from .sessions import SESSION_DB_PATH, SESSION_STORE
+
+logger = logging.getLogger(__name__)
+
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))
+
+SHINGLE_WORDS = 4
+NUM_PERM = 128
+# 16 bands of 8 rows: pairs above ~0.7 similarity almost always share a band
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Fixed seed so signatures stay comparable across restarts and workers
+_rng = random.Random(1729)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)
+]
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_FURNITURE_RE = re.compile(
+    r"^(?:page \d+(?: of \d+)?|\d+(?: ?/ ?\d+)?|https?://\S+|www\.\S+)$"
+)
+
+
+# =============================================================================
+# MinHash
+# =============================================================================
+
+
+def normalize_text(text: str) -> list[str]:
+    """Lowercase, drop page furniture lines and return the remaining words."""
+    words: list[str] = []
+    for line in text.lower().splitlines():
+        line = line.strip()
+        if not line or _FURNITURE_RE.match(line):
+            continue
+        words.extend(_WORD_RE.findall(line))
+    return words
+
+
+def shingles(words: list[str], size: int = SHINGLE_WORDS) -> set[int]:
+    """Hash every run of size consecutive words."""
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode())} if words else set()
+    return {
+        zlib.crc32(" ".join(words[i : i + size]).encode())
+        for i in range(len(words) - size + 1)
+    }
+
+
+def minhash(text: str) -> array | None:
+    """Return the MinHash signature of a document, or None if it has no words."""
+    hashes = shingles(normalize_text(text))
+    if not hashes:
+        return None
+    return array(
+        "I",
+        (
+            min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH
+            for a, b in _PERMUTATIONS
+        ),
+    )
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimate the Jaccard similarity of two documents from their signatures."""
+    return sum(x == y for x, y in zip(a, b, strict=True)) / len(a)
+
+
+def _bands(signature: array) -> list[tuple[int, int]]:
+    return [
+        (band, hash(tuple(signature[band * LSH_ROWS : (band + 1) * LSH_ROWS])))
+        for band in range(LSH_BANDS)
+    ]
+
+
+# =============================================================================
+# Index
+# =============================================================================
+
+
+class NearDuplicateIndex:
+    """MinHash LSH index from parsed documents to their recipes."""
+
+    def __init__(self, path: str, threshold: float = NEAR_DUP_THRESHOLD) -> None:
+        self.threshold = threshold
+        self._signatures: dict[int, array] = {}
+        self._buckets: dict[tuple[int, int], list[int]] = {}
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS parsed_documents ("
+                " id INTEGER PRIMARY KEY,"
+                " signature BLOB NOT NULL,"
+                " recipe TEXT NOT NULL)"
+            )
+        self._last_id = 0
+        self._refresh()
+        logger.info(f"Loaded {len(self)} documents into the near-duplicate index")
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _insert(self, doc_id: int, signature: array) -> None:
+        if doc_id in self._signatures:
+            return
+        self._signatures[doc_id] = signature
+        for key in _bands(signature):
+            self._buckets.setdefault(key, []).append(doc_id)
+
+    def _refresh(self) -> None:
+        # Pick up documents indexed by other workers sharing the database
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, signature FROM parsed_documents WHERE id > ? ORDER BY id",
+                (self._last_id,),
+            ).fetchall()
+            for doc_id, blob in rows:
+                self._insert(doc_id, array("I", blob))
+                self._last_id = doc_id
+
+    def find(self, text: str) -> tuple[Recipe | None, array | None]:
+        """
+        Return the recipe of the most similar indexed document, if any.
+
+        Only documents at or above the similarity threshold are considered.
+
+        Returns:
+            The matching recipe (or None) and the text's signature, which can
+            be passed to add() after a miss
+        """
+        started = time.perf_counter()
+        signature = minhash(text)
+        hashed = time.perf_counter()
+        self._refresh()
+        best_id, best_score = None, self.threshold
+        if signature is not None:
+            with self._lock:
+                candidates = {
+                    doc_id
+                    for key in _bands(signature)
+                    for doc_id in self._buckets.get(key, ())
+                }
+                for doc_id in candidates:
+                    score = similarity(signature, self._signatures[doc_id])
+                    if score >= best_score:
+                        best_id, best_score = doc_id, score
+
+        metrics.incr("dedup.lookups")
+        metrics.incr("dedup.minhash_ms", (hashed - started) * 1000)
+        metrics.incr("dedup.lookup_ms", (time.perf_counter() - hashed) * 1000)
+        if best_id is None:
+            return None, signature
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT recipe FROM parsed_documents WHERE id = ?", (best_id,)
+            ).fetchone()
+        metrics.incr("dedup.hits")
+        logger.info(f"Upload matches parsed document {best_id} ({best_score:.2f})")
+        return Recipe.model_validate_json(row[0]), signature
+
+    def add(self, signature: array | None, recipe: Recipe) -> None:
+        """Index a parsed document, by the signature find() returned, and its recipe."""
+        if signature is None:
+            return
+        stored = recipe.model_dump_json(exclude={"source_text"})
+        with self._lock, self._conn:
+            doc_id = self._conn.execute(
+                "INSERT INTO parsed_documents (signature, recipe) VALUES (?, ?)",
+                (signature.tobytes(), stored),
+            ).lastrowid
+            self._insert(doc_id, signature)
+
+
+_index: NearDuplicateIndex | None = None
+
+
+def get_dedup_index() -> NearDuplicateIndex | None:
+    """Get or create the near-duplicate index, or None when disabled."""
+    global _index
+    if not NEAR_DUP_ENABLED or SESSION_STORE == "none":
+        return None
+    if _index is None:
+        path = ":memory:" if SESSION_STORE == "memory" else SESSION_DB_PATH
+        _index = NearDuplicateIndex(path)
+    return _index
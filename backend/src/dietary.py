@@ -0,0 +1,289 @@
+"""
+Dietary Tags
+
+Rule-based vegan, vegetarian, gluten-free, dairy-free and nut-free tags,
+recomputed locally whenever the ingredients change, instead of trusting the
+parser's guess once.
+
+- Properties: INGREDIENT_PROPERTIES maps foods and food words to what they
+  contain (meat, fish, dairy, egg, gluten, nut, soy, sesame, or "animal" for
+  other animal products such as honey), and plain foods (PLAIN_FOODS) to
+  nothing. Longer phrases take precedence over the words in them, so "peanut
+  butter" is a nut but not dairy, and "rice noodles" have no gluten.
+- Unknown: an ingredient is only recognised when the table names its head
+  noun, the last word once forms such as "leaves" or "fillets" are set
+  aside. Anything else ("caesar dressing", "dark chocolate") gets the
+  UNKNOWN property: it may contain anything, so it never counts as free of
+  an allergen.
+- Modifiers: "vegan", "dairy-free", "gluten-free" and the like in a name
+  clear the properties they rule out ("vegan butter", "gluten-free pasta").
+- Tags: a tag is removed as soon as an ingredient has a property it excludes,
+  but only added when every ingredient is recognised; with unknown
+  ingredients the parser's claim for that tag stands. Tags that are not
+  managed here ("keto", "spicy") are kept as is.
+
+Each ingredient name is classified once (lru_cache), so retagging a recipe
+is a few set unions and cheap enough to run after every tool call.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+
+from .models import Recipe, RecipeContext, ingredient_key
+
+DIETARY_CACHE_SIZE = 4096
+# Longest phrase in INGREDIENT_PROPERTIES, in words
+MAX_PHRASE_WORDS = 3
+
+ANIMAL = frozenset({"meat", "fish", "dairy", "egg", "animal"})
+# Property of an ingredient the table doesn't recognise
+UNKNOWN = "unknown"
+
+# Tag -> properties that rule it out, in the order tags are listed
+TAG_RULES: dict[str, frozenset[str]] = {
+    "vegan": ANIMAL,
+    "vegetarian": frozenset({"meat", "fish"}),
+    "gluten-free": frozenset({"gluten"}),
+    "dairy-free": frozenset({"dairy"}),
+    "nut-free": frozenset({"nut"}),
+}
+
+_MEAT = (
+    "chicken beef pork lamb mutton veal turkey duck goose venison rabbit bacon "
+    "ham prosciutto pancetta chorizo salami pepperoni sausage steak mince "
+    "meatball lard suet gelatin gelatine"
+)
+_FISH = (
+    "fish salmon tuna cod haddock anchovy anchovies sardine mackerel trout prawn shrimp "
+    "crab lobster mussel clam oyster scallop squid calamari worcestershire"
+)
+_DAIRY = (
+    "milk butter buttermilk cream cheese yogurt yoghurt ghee whey casein custard "
+    "parmesan parmigiano reggiano pecorino cheddar mozzarella feta ricotta mascarpone "
+    "brie gouda gruyere halloumi paneer burrata fraiche fraîche"
+)
+_EGG = "egg yolk mayonnaise mayo aioli meringue"
+_GLUTEN = (
+    "flour wheat bread breadcrumb panko pasta spaghetti penne fusilli macaroni "
+    "linguine tagliatelle fettuccine rigatoni lasagne lasagna orzo ravioli "
+    "tortellini gnocchi noodle couscous bulgur barley rye spelt semolina seitan "
+    "farro malt beer ale cracker biscuit cake pastry crouton tortilla pita "
+    "bagel oat hoisin teriyaki"
+)
+_NUT = (
+    "nut almond walnut pecan cashew pistachio hazelnut macadamia peanut "
+    "marzipan praline nutella"
+)
+_SOY = "soy soya tofu tempeh edamame miso tamari"
+_SESAME = "sesame tahini"
+# Foods with none of the properties above; irregular plurals are listed too
+# because ingredient_key only strips a final "s"
+PLAIN_FOODS = (
+    "onion garlic shallot leek scallion tomato potato carrot celery pepper chili "
+    "chilli chillies jalapeno cucumber zucchini courgette eggplant aubergine "
+    "squash pumpkin spinach kale lettuce arugula rocket cabbage broccoli "
+    "cauliflower mushroom pea bean lentil chickpea corn sweetcorn avocado "
+    "asparagus artichoke beet beetroot radish radishes turnip parsnip fennel "
+    "ginger lemon lime orange apple banana berry berries strawberry "
+    "strawberries raspberry raspberries blueberry blueberries grape mango "
+    "pineapple peach peaches pear cherry cherries plum date raisin coconut "
+    "olive caper basil parsley cilantro coriander mint dill thyme rosemary "
+    "oregano sage chive bay tarragon salt cumin paprika turmeric cinnamon "
+    "nutmeg clove cardamom cayenne saffron vanilla allspice oil sugar water "
+    "vinegar rice quinoa polenta cornmeal cornstarch cornflour starch yeast "
+    "syrup maple agave molasses cocoa chia flax hemp sunflower agar aminos"
+)
+# Forms and cuts named after the food ("basil leaves", "lemon juice")
+_FORMS = (
+    "leaf leaves clove sprig stalk stem fillet breast thigh wing leg wedge slice "
+    "piece juice zest powder flake seed meal"
+)
+FORM_WORDS = frozenset(ingredient_key(word) for word in _FORMS.split())
+
+INGREDIENT_PROPERTIES: dict[str, frozenset[str]] = {
+    **{word: frozenset() for word in PLAIN_FOODS.split()},
+    **{word: frozenset({"meat"}) for word in _MEAT.split()},
+    **{word: frozenset({"fish"}) for word in _FISH.split()},
+    **{word: frozenset({"dairy"}) for word in _DAIRY.split()},
+    **{word: frozenset({"egg"}) for word in _EGG.split()},
+    **{word: frozenset({"gluten"}) for word in _GLUTEN.split()},
+    **{word: frozenset({"nut"}) for word in _NUT.split()},
+    **{word: frozenset({"soy"}) for word in _SOY.split()},
+    **{word: frozenset({"sesame"}) for word in _SESAME.split()},
+    "honey": frozenset({"animal"}),
+    # Phrases that differ from their words
+    "fish sauce": frozenset({"fish"}),
+    "worcestershire sauce": frozenset({"fish"}),
+    "soy sauce": frozenset({"gluten", "soy"}),
+    "egg noodle": frozenset({"egg", "gluten"}),
+    "naan": frozenset({"gluten", "dairy"}),
+    "brioche": frozenset({"gluten", "dairy", "egg"}),
+    # Assume butter unless it's a pastry that is usually made without
+    "pastry": frozenset({"gluten", "dairy"}),
+    "filo pastry": frozenset({"gluten"}),
+    "phyllo pastry": frozenset({"gluten"}),
+    "chicken stock": frozenset({"meat"}),
+    "beef stock": frozenset({"meat"}),
+    "chicken broth": frozenset({"meat"}),
+    "beef broth": frozenset({"meat"}),
+    "fish stock": frozenset({"fish"}),
+    "vegetable stock": frozenset(),
+    "vegetable broth": frozenset(),
+    "baking powder": frozenset(),
+    "baking soda": frozenset(),
+    "nutritional yeast": frozenset(),
+    "sunflower seed butter": frozenset(),
+    "pesto": frozenset({"nut", "dairy"}),
+    "peanut butter": frozenset({"nut"}),
+    "almond butter": frozenset({"nut"}),
+    "cashew butter": frozenset({"nut"}),
+    "nut butter": frozenset({"nut"}),
+    "almond milk": frozenset({"nut"}),
+    "cashew milk": frozenset({"nut"}),
+    "almond flour": frozenset({"nut"}),
+    "oat milk": frozenset({"gluten"}),
+    "oat cream": frozenset({"gluten"}),
+    "cashew cream": frozenset({"nut"}),
+    "soy yogurt": frozenset({"soy"}),
+    "cocoa butter": frozenset(),
+    "coconut milk": frozenset(),
+    "coconut cream": frozenset(),
+    "soy milk": frozenset({"soy"}),
+    "soya milk": frozenset({"soy"}),
+    "coconut yogurt": frozenset(),
+    "flax egg": frozenset(),
+    "chia egg": frozenset(),
+    "egg replacer": frozenset(),
+    "rice milk": frozenset(),
+    "cream of tartar": frozenset(),
+    "rice flour": frozenset(),
+    "corn flour": frozenset(),
+    "coconut flour": frozenset(),
+    "chickpea flour": frozenset(),
+    "buckwheat flour": frozenset(),
+    "rice noodle": frozenset(),
+    "glass noodle": frozenset(),
+    "corn tortilla": frozenset(),
+    "butter bean": frozenset(),
+    "oyster mushroom": frozenset(),
+}
+
+# Words in a name that rule properties out ("vegan butter")
+MODIFIERS: dict[str, frozenset[str]] = {
+    "vegan": ANIMAL,
+    "plant based": ANIMAL,
+    "dairy free": frozenset({"dairy"}),
+    "non dairy": frozenset({"dairy"}),
+    "gluten free": frozenset({"gluten"}),
+    "nut free": frozenset({"nut"}),
+    "egg free": frozenset({"egg"}),
+}
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_INDEX = {ingredient_key(name): props for name, props in INGREDIENT_PROPERTIES.items()}
+_MODIFIER_INDEX = {ingredient_key(name): props for name, props in MODIFIERS.items()}
+
+
+def _tag_key(tag: str) -> str:
+    return "-".join(tag.lower().replace("_", " ").replace("-", " ").split())
+
+
+@lru_cache(maxsize=DIETARY_CACHE_SIZE)
+def ingredient_properties(name: str) -> frozenset[str]:
+    """
+    What an ingredient contains, from its name (e.g. {'dairy'} for butter).
+
+    An empty set means the ingredient is known to contain none of the
+    properties; an unrecognised one has UNKNOWN among its properties.
+    """
+    words = ingredient_key(_PUNCTUATION_RE.sub(" ", name)).split()
+    head = len(words) - 1
+    while head > 0 and words[head] in FORM_WORDS:
+        head -= 1
+    found: set[str] = set()
+    ruled_out: set[str] = set()
+    recognised = False
+    i = 0
+    while i < len(words):
+        for length in range(min(MAX_PHRASE_WORDS, len(words) - i), 0, -1):
+            phrase = " ".join(words[i : i + length])
+            if phrase in _MODIFIER_INDEX:
+                ruled_out |= _MODIFIER_INDEX[phrase]
+                break
+            if phrase in _INDEX:
+                found |= _INDEX[phrase]
+                recognised = recognised or i <= head < i + length
+                break
+        else:
+            length = 1
+        i += length
+    if not recognised:
+        found.add(UNKNOWN)
+    return frozenset(found - ruled_out)
+
+
+def infer_tags(recipe: Recipe) -> list[str]:
+    """
+    The managed tags (see TAG_RULES) that a recipe's ingredients allow.
+
+    A tag no ingredient rules out is only added when every ingredient is
+    recognised; otherwise it is kept only if the recipe already had it.
+    """
+    properties = set().union(
+        *(ingredient_properties(ing.name) for ing in recipe.ingredients)
+    )
+    claimed = {_tag_key(tag) for tag in recipe.dietary_tags}
+    return [
+        tag
+        for tag, rule in TAG_RULES.items()
+        if not rule & properties and (UNKNOWN not in properties or tag in claimed)
+    ]
+
+
+def unrecognised_ingredients(recipe: Recipe) -> list[str]:
+    """Names of the ingredients the table doesn't recognise."""
+    return [
+        ing.name
+        for ing in recipe.ingredients
+        if UNKNOWN in ingredient_properties(ing.name)
+    ]
+
+
+def tag_violations(recipe: Recipe, tag: str) -> list[str]:
+    """Names of the ingredients that stop a recipe having a managed tag."""
+    rule = TAG_RULES[_tag_key(tag)]
+    return [
+        ing.name for ing in recipe.ingredients if rule & ingredient_properties(ing.name)
+    ]
+
+
+def retag(recipe: Recipe) -> Recipe:
+    """Return the recipe with its managed tags recomputed, others kept."""
+    kept = [tag for tag in recipe.dietary_tags if _tag_key(tag) not in TAG_RULES]
+    tags = kept + infer_tags(recipe)
+    if tags == recipe.dietary_tags:
+        return recipe
+    return recipe.model_copy(update={"dietary_tags": tags})
+
+
+def refresh_dietary_tags(state: RecipeContext) -> list[str]:
+    """
+    Retag the loaded recipe in place after its ingredients changed.
+
+    Returns the managed tags the change broke, e.g. ["vegan"] after a swap
+    to butter.
+    """
+    if state.recipe is None:
+        return []
+    before = {_tag_key(tag) for tag in state.recipe.dietary_tags}
+    state.recipe = retag(state.recipe)
+    after = set(state.recipe.dietary_tags)
+    return [tag for tag in TAG_RULES if tag in before and tag not in after]
+
+
+def describe_broken_tags(recipe: Recipe, broken: list[str]) -> str:
+    """A warning naming the tags a change broke and the ingredients to blame."""
+    notes = [f"{tag} ({', '.join(tag_violations(recipe, tag))})" for tag in broken]
+    return f"Note: the recipe is no longer {', '.join(notes)}."
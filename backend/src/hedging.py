@@ -0,0 +1,138 @@
+"""
+Deadlines and Hedged Requests for LLM Calls
+
+Bounds the one-shot model calls (parse, substitute, rewrite) so a slow Gemini
+response can't hold a tool call, and the chat turn around it, indefinitely.
+
+- Deadline: each task has a total time budget (LLM_DEADLINE_<TASK>). When it
+  expires the call raises TimeoutError and the caller's existing fallback runs.
+- Hedging (LLM_HEDGE_ENABLED=true): if an attempt hasn't returned by the p90
+  latency seen for that task, a second identical request is fired and the first
+  successful response wins; the other attempt is cancelled.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from threading import Lock
+from typing import TypeVar
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Total seconds per task, including any escalation to the strong tier
+DEFAULT_DEADLINES = {"parse": 60.0, "substitute": 15.0, "rewrite": 20.0}
+
+HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+# Latency samples needed before p90 is trusted as a hedge delay
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LATENCY_WINDOW = 200
+
+
+def deadline_for(task: str) -> float | None:
+    """Return the deadline in seconds for a task, or None if unbounded."""
+    value = os.getenv(f"LLM_DEADLINE_{task.upper()}")
+    if value is not None:
+        return float(value) if float(value) > 0 else None
+    return DEFAULT_DEADLINES.get(task)
+
+
+# =============================================================================
+# Latency Tracking
+# =============================================================================
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per key."""
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self.window = window
+        self._samples: dict[str, deque[float]] = {}
+        self._lock = Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        """Add a latency sample for key."""
+        with self._lock:
+            samples = self._samples.setdefault(key, deque(maxlen=self.window))
+            samples.append(seconds)
+
+    def p90(self, key: str, min_samples: int = HEDGE_MIN_SAMPLES) -> float | None:
+        """Return the 90th percentile latency, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+
+    def reset(self) -> None:
+        """Forget all samples."""
+        with self._lock:
+            self._samples.clear()
+
+
+latency = LatencyTracker()
+
+
+# =============================================================================
+# Hedged Calls
+# =============================================================================
+
+
+async def _timed(key: str, call: Callable[[], Awaitable[T]]) -> T:
+    started = time.monotonic()
+    result = await call()
+    latency.record(key, time.monotonic() - started)
+    return result
+
+
+async def hedged(
+    key: str, call: Callable[[], Awaitable[T]], hedge: bool | None = None
+) -> T:
+    """
+    Await call(), firing a second attempt if the first is slower than p90.
+
+    Args:
+        key: Latency key (task and tier) for p90 tracking and metrics
+        call: Factory for one attempt; called again for the hedge
+        hedge: Override HEDGE_ENABLED
+
+    Returns:
+        The first successful result
+
+    Raises:
+        The last attempt's exception if every attempt fails
+    """
+    delay = latency.p90(key) if (HEDGE_ENABLED if hedge is None else hedge) else None
+    attempts = [asyncio.create_task(_timed(key, call))]
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done:
+                logger.info(f"{key}: no response after p90 {delay:.2f}s, hedging")
+                metrics.incr(f"llm.{key}.hedges")
+                attempts.append(asyncio.create_task(_timed(key, call)))
+
+        pending = set(attempts)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for attempt in done:
+                if attempt.exception() is None:
+                    if attempt is not attempts[0]:
+                        metrics.incr(f"llm.{key}.hedge_wins")
+                    return attempt.result()
+                error = attempt.exception()
+        raise error
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
@@ -0,0 +1,166 @@
+"""
+Chat History Compaction
+
+History processor for the recipe agent. The AG-UI endpoint forwards the full
+message history on every turn, including tool results that carry complete
+state snapshots. This keeps the most recent turns verbatim, collapses tool
+calls/results in older turns into a one-line summary, and drops the oldest
+turns when the history still exceeds the token budget.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import replace
+
+from pydantic_ai.messages import (
+    BaseToolReturnPart,
+    ModelMessage,
+    ModelRequest,
+    RetryPromptPart,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    UserPromptPart,
+)
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+HISTORY_KEEP_RECENT_TURNS = int(os.getenv("HISTORY_KEEP_RECENT_TURNS", "4"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+
+# Rough chars-per-token ratio; good enough for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+MAX_SUMMARY_ACTIONS = 10
+
+
+# =============================================================================
+# Token Estimation
+# =============================================================================
+
+
+def _part_text(part: object) -> str:
+    if isinstance(part, ToolCallPart):
+        return part.tool_name + part.args_as_json_str()
+    if isinstance(part, BaseToolReturnPart):
+        return part.model_response_str()
+    if isinstance(part, RetryPromptPart):
+        return part.model_response()
+    content = getattr(part, "content", "")
+    return content if isinstance(content, str) else str(content)
+
+
+def estimate_tokens(messages: list[ModelMessage]) -> int:
+    """Estimate the token count of a message history."""
+    chars = sum(len(_part_text(part)) for message in messages for part in message.parts)
+    return chars // CHARS_PER_TOKEN
+
+
+# =============================================================================
+# Compaction
+# =============================================================================
+
+
+def _split_turns(messages: list[ModelMessage]) -> list[list[ModelMessage]]:
+    """Group messages into turns, each starting at a user prompt."""
+    turns: list[list[ModelMessage]] = []
+    for message in messages:
+        starts_turn = isinstance(message, ModelRequest) and any(
+            isinstance(part, UserPromptPart) for part in message.parts
+        )
+        if starts_turn or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _strip_tool_parts(
+    turn: list[ModelMessage], actions: list[str]
+) -> list[ModelMessage]:
+    """Drop tool calls/results from a turn, recording each call in actions."""
+    stripped: list[ModelMessage] = []
+    for message in turn:
+        if isinstance(message, ModelRequest):
+            parts = [
+                part
+                for part in message.parts
+                if isinstance(part, (UserPromptPart, SystemPromptPart))
+            ]
+        else:
+            parts = []
+            for part in message.parts:
+                if isinstance(part, ToolCallPart):
+                    actions.append(f"{part.tool_name}({part.args_as_json_str()})")
+                elif isinstance(part, TextPart):
+                    parts.append(part)
+        if parts:
+            stripped.append(replace(message, parts=parts))
+    return stripped
+
+
+def compact_history(
+    messages: list[ModelMessage],
+    keep_recent_turns: int | None = None,
+    token_budget: int | None = None,
+) -> list[ModelMessage]:
+    """
+    Compact the message history before it is sent to the model.
+
+    Args:
+        messages: Full message history for the run
+        keep_recent_turns: Number of trailing turns kept verbatim
+        token_budget: Maximum estimated tokens for the compacted history
+
+    Returns:
+        Compacted message history (the input list is not modified)
+    """
+    keep_recent_turns = (
+        HISTORY_KEEP_RECENT_TURNS if keep_recent_turns is None else keep_recent_turns
+    )
+    token_budget = HISTORY_TOKEN_BUDGET if token_budget is None else token_budget
+
+    turns = _split_turns(messages)
+    if len(turns) <= keep_recent_turns and estimate_tokens(messages) <= token_budget:
+        return messages
+
+    tokens_before = estimate_tokens(messages)
+    split = max(len(turns) - keep_recent_turns, 0)
+    actions: list[str] = []
+    older = [_strip_tool_parts(turn, actions) for turn in turns[:split]]
+    turns = [turn for turn in older if turn] + turns[split:]
+
+    # Drop whole turns, oldest first, but always keep the current turn
+    dropped = 0
+    while (
+        len(turns) > 1
+        and estimate_tokens([message for turn in turns for message in turn])
+        > token_budget
+    ):
+        turns.pop(0)
+        dropped += 1
+
+    compacted = [message for turn in turns for message in turn]
+
+    if actions or dropped:
+        summary = "Earlier in this session (history compacted"
+        summary += f", {dropped} older turns omitted)" if dropped else ")"
+        if actions:
+            summary += ": actions taken - " + "; ".join(actions[-MAX_SUMMARY_ACTIONS:])
+        summary += ". The current recipe state is authoritative."
+        # Standalone request so the kept turns stay byte-for-byte identical
+        compacted.insert(0, ModelRequest(parts=[SystemPromptPart(content=summary)]))
+
+    tokens_after = estimate_tokens(compacted)
+    metrics.incr("history.compactions")
+    metrics.incr("history.tokens_before", tokens_before)
+    metrics.incr("history.tokens_after", tokens_after)
+    metrics.incr("history.tokens_saved", max(tokens_before - tokens_after, 0))
+    logger.info(
+        f"Compacted history from ~{tokens_before} to ~{tokens_after} tokens "
+        f"({len(actions)} tool calls collapsed, {dropped} turns dropped)"
+    )
+
+    return compacted
@@ -0,0 +1,248 @@
+"""
+Local Intent Router
+
+Pattern-based classifier that runs before recipe_agent. Chat messages that
+map cleanly onto a single tool ("next", "double it", "swap butter for oil")
+are executed directly with a templated confirmation, skipping the chat model
+round trips. Anything ambiguous returns None and goes to the full agent.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+from .agents import substitute_in_state
+from .commands import redo_state, scale_state, set_current_step, undo_state
+from .models import RecipeContext
+
+logger = logging.getLogger(__name__)
+
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.8"))
+
+
+class Intent(BaseModel):
+    """A tool call recognised locally from a chat message."""
+
+    tool: Literal[
+        "scale_recipe",
+        "update_cooking_progress",
+        "substitute_ingredient",
+        "undo_change",
+        "redo_change",
+    ]
+    args: dict[str, Any]
+    confidence: float
+
+
+# =============================================================================
+# Patterns
+# =============================================================================
+
+NUMBER_WORDS = {
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+    "eleven": 11,
+    "twelve": 12,
+}
+_N = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+_IT = r"(?: it| the recipe| this(?: recipe)?)?"
+
+NEXT_RE = re.compile(
+    r"^(?:next|next step|go to the next step|(?:i'm |i am )?done|finished|continue)$"
+)
+PREVIOUS_RE = re.compile(
+    r"^(?:back|go back|previous|previous step|go to the previous step|step back)$"
+)
+RESTART_RE = re.compile(
+    r"^(?:restart|start over|start again|back to the start|from the (?:top|beginning))$"
+)
+GO_TO_STEP_RE = re.compile(rf"^(?:(?:go|skip|jump) to )?step {_N}$")
+
+SCALE_FACTOR_RE = re.compile(rf"^(double|triple|quadruple|halve|half){_IT}$")
+SCALE_FACTORS = {"double": 2, "triple": 3, "quadruple": 4, "halve": 0.5, "half": 0.5}
+SCALE_TO_RE = re.compile(
+    rf"^(?:make|scale|change|adjust){_IT} (?:for|to) {_N}"
+    r"(?: people| persons| servings| portions)?$"
+)
+SERVINGS_RE = re.compile(rf"^(?:for |serves? )?{_N} (?:people|servings|portions)$")
+
+UNDO_RE = re.compile(
+    r"^(?:undo|undo (?:that|it|the last change)|revert (?:that|it)|put it back)$"
+)
+REDO_RE = re.compile(r"^(?:redo|redo (?:that|it))$")
+
+SUBSTITUTE_RES = [
+    re.compile(
+        r"^(?:swap|switch|replace|change) (?:the )?(?P<original>.+?)"
+        r" (?:for|with|to) (?P<substitute>.+)$"
+    ),
+    re.compile(r"^substitute (?:the )?(?P<original>.+?) with (?P<substitute>.+)$"),
+    re.compile(r"^use (?P<substitute>.+?) instead of (?:the )?(?P<original>.+)$"),
+]
+
+# Ingredient names are short noun phrases. Anything longer, or containing a
+# conjunction or another command verb, is a compound request for the agent
+# ("swap butter for oil and cream for milk").
+MAX_INGREDIENT_WORDS = 4
+_COMPOUND_RE = re.compile(
+    r"[,;&]|\b(?:and|then|also|plus|but|please)\b|\b(?:go|skip|jump|double|"
+    r"triple|halve|scale|make|swap|switch|replace|change|use|substitute|add|"
+    r"remove)\b"
+)
+
+_PREFIX_RE = re.compile(r"^(?:please|can you|could you|ok|okay)[, ]+")
+_SUFFIX_RE = re.compile(r"[ ,]+(?:please|thanks|thank you)$")
+
+
+def _normalize(message: str) -> str:
+    text = message.strip().lower().replace("’", "'")
+    text = text.rstrip(".!?").strip()
+    text = _PREFIX_RE.sub("", text)
+    return _SUFFIX_RE.sub("", text)
+
+
+def _number(token: str) -> int:
+    return NUMBER_WORDS.get(token) or int(token)
+
+
+def _is_ingredient_phrase(text: str) -> bool:
+    return (
+        len(text.split()) <= MAX_INGREDIENT_WORDS and _COMPOUND_RE.search(text) is None
+    )
+
+
+# =============================================================================
+# Classification
+# =============================================================================
+
+
+def classify_intent(message: str, state: RecipeContext) -> Intent | None:
+    """
+    Recognise a single-tool request in a chat message.
+
+    Args:
+        message: The user's latest chat message
+        state: Current RecipeContext (needed for relative steps and scaling)
+
+    Returns:
+        The recognised Intent, or None if the message needs the full agent
+    """
+    if state.recipe is None:
+        return None
+    text = _normalize(message)
+
+    if NEXT_RE.match(text):
+        return Intent(
+            tool="update_cooking_progress",
+            args={"current_step": state.current_step + 1},
+            confidence=1.0,
+        )
+    if PREVIOUS_RE.match(text):
+        return Intent(
+            tool="update_cooking_progress",
+            args={"current_step": state.current_step - 1},
+            confidence=1.0,
+        )
+    if RESTART_RE.match(text):
+        return Intent(
+            tool="update_cooking_progress", args={"current_step": 0}, confidence=1.0
+        )
+    if match := GO_TO_STEP_RE.match(text):
+        return Intent(
+            tool="update_cooking_progress",
+            args={"current_step": _number(match.group(1)) - 1},
+            confidence=1.0,
+        )
+
+    if UNDO_RE.match(text):
+        return Intent(tool="undo_change", args={}, confidence=1.0)
+    if REDO_RE.match(text):
+        return Intent(tool="redo_change", args={}, confidence=1.0)
+
+    if match := SCALE_FACTOR_RE.match(text):
+        factor = SCALE_FACTORS[match.group(1)]
+        target = max(1, round(state.recipe.servings * factor))
+        return Intent(
+            tool="scale_recipe", args={"target_servings": target}, confidence=1.0
+        )
+    if match := SCALE_TO_RE.match(text) or SERVINGS_RE.match(text):
+        return Intent(
+            tool="scale_recipe",
+            args={"target_servings": _number(match.group(1))},
+            confidence=1.0,
+        )
+
+    for pattern in SUBSTITUTE_RES:
+        if match := pattern.match(text):
+            original, substitute = match.group("original", "substitute")
+            if not (
+                _is_ingredient_phrase(original) and _is_ingredient_phrase(substitute)
+            ):
+                return None
+            # Only confident when the name clearly points at one ingredient;
+            # otherwise let the agent ask or reason about it.
+            matches = state.recipe.match_ingredients(original)
+            return Intent(
+                tool="substitute_ingredient",
+                args={
+                    "original_ingredient": original,
+                    "substitute_name": substitute,
+                },
+                confidence=0.9 if len(matches) == 1 else 0.4,
+            )
+
+    return None
+
+
+def route_intent(message: str, state: RecipeContext) -> Intent | None:
+    """Return a high-confidence intent to run directly, or None for the agent."""
+    if not INTENT_ROUTER_ENABLED:
+        return None
+    intent = classify_intent(message, state)
+    if intent is None or intent.confidence < INTENT_CONFIDENCE_THRESHOLD:
+        return None
+    return intent
+
+
+# =============================================================================
+# Execution
+# =============================================================================
+
+
+async def execute_intent(state: RecipeContext, intent: Intent) -> str:
+    """
+    Run an intent's tool logic against the state in place.
+
+    Returns:
+        Templated confirmation text for the user
+
+    Raises:
+        CommandError: If the action is invalid for the current state
+    """
+    match intent.tool:
+        case "scale_recipe":
+            return scale_state(state, **intent.args)
+        case "update_cooking_progress":
+            message = set_current_step(state, **intent.args)
+            step = state.recipe.steps[state.current_step]
+            return f"{message}\n\n{step.instruction}"
+        case "substitute_ingredient":
+            return await substitute_in_state(state, **intent.args)
+        case "undo_change":
+            return undo_state(state)
+        case "redo_change":
+            return redo_state(state)
@@ -0,0 +1,292 @@
+"""
+Recipe Library
+
+Index of every recipe saved with a session, so users can revisit past recipes
+by thread. Backed by SQLite: a plain table for listing (keyset-paginated by
+last update, so deep pages stay as fast as the first) and an FTS5 index over
+title, ingredient names, cuisine and dietary tags for search. The FTS index
+uses the porter stemmer, so "chickpea" also finds "chickpeas".
+
+A common term ("salt") matches a large share of the library, and FTS5's bm25
+reads every match to count document frequencies, so it can't be bounded.
+Search instead takes the most recently updated SEARCH_RANK_WINDOW matches
+(walking the index newest first, without scoring) and ranks them by which
+columns each query word appears in, weighted by COLUMN_WEIGHTS; the page
+says when matches beyond the window were left out. Updating a recipe gives
+it a new, highest id, so rowid order in the index is update order and the
+walk needs no join. See benchmarks/library.py for timings at a million
+recipes.
+
+Recipes are indexed from the session write-behind flush (see sessions.py),
+so indexing never adds latency to a request.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+import time
+from threading import Lock
+
+from .models import Recipe, RecipeContext, RecipePage, RecipeSummary
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Matches considered for relevance ranking (most recently updated first);
+# bounds search cost
+SEARCH_RANK_WINDOW = 500
+# Score for a query word found in each column; title matches rank highest
+COLUMN_WEIGHTS = {"title": 4.0, "ingredients": 2.0, "cuisine": 1.0, "dietary_tags": 1.0}
+
+# Filler words dropped from natural-language queries ("recipes with chickpeas")
+QUERY_STOPWORDS = {
+    "a",
+    "an",
+    "and",
+    "any",
+    "containing",
+    "for",
+    "i",
+    "me",
+    "my",
+    "of",
+    "recipe",
+    "recipes",
+    "show",
+    "the",
+    "that",
+    "use",
+    "uses",
+    "using",
+    "with",
+}
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recipes (
+    id INTEGER PRIMARY KEY,
+    thread_id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    cuisine TEXT,
+    servings INTEGER NOT NULL,
+    ingredient_count INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS recipes_updated ON recipes (updated_at DESC, id DESC);
+CREATE VIRTUAL TABLE IF NOT EXISTS recipe_search USING fts5(
+    title, ingredients, cuisine, dietary_tags,
+    tokenize = 'porter unicode61'
+);
+"""
+
+
+def query_words(text: str) -> list[str]:
+    """Return the meaningful words of a free-text query."""
+    return [
+        word for word in _TOKEN_RE.findall(text.lower()) if word not in QUERY_STOPWORDS
+    ]
+
+
+def fts_query(text: str) -> str | None:
+    """
+    Turn free text into an FTS5 query matching every meaningful word.
+
+    Words are quoted so user input can't inject FTS syntax. They are matched
+    as whole (stemmed) terms rather than prefixes: a prefix expands to every
+    term sharing it, which makes search cost grow with the index size.
+    Returns None if nothing searchable is left.
+    """
+    words = query_words(text)
+    if not words:
+        return None
+    return " AND ".join(f'"{word}"' for word in words)
+
+
+def _cursor(updated_at: float, row_id: int) -> str:
+    return f"{updated_at!r}:{row_id}"
+
+
+def _parse_cursor(cursor: str) -> tuple[float, int]:
+    updated_at, _, row_id = cursor.partition(":")
+    return float(updated_at), int(row_id)
+
+
+class RecipeLibrary:
+    """SQLite-backed listing and full-text search over saved recipes."""
+
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = Lock()
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def upsert_many(self, recipes: dict[str, Recipe]) -> None:
+        """Add or refresh the library entries for several threads."""
+        now = time.time()
+        with self._lock, self._conn:
+            for thread_id, recipe in recipes.items():
+                self._conn.execute(
+                    "DELETE FROM recipe_search WHERE rowid ="
+                    " (SELECT id FROM recipes WHERE thread_id = ?)",
+                    (thread_id,),
+                )
+                # An update moves the recipe to a new id, keeping id order
+                # the same as update order for search's newest-first walk
+                row_id = self._conn.execute(
+                    "INSERT INTO recipes"
+                    " (thread_id, title, cuisine, servings, ingredient_count,"
+                    "  updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(thread_id) DO UPDATE SET"
+                    " id = (SELECT max(id) + 1 FROM recipes),"
+                    " title = excluded.title, cuisine = excluded.cuisine,"
+                    " servings = excluded.servings,"
+                    " ingredient_count = excluded.ingredient_count,"
+                    " updated_at = excluded.updated_at"
+                    " RETURNING id",
+                    (
+                        thread_id,
+                        recipe.title,
+                        recipe.cuisine,
+                        recipe.servings,
+                        len(recipe.ingredients),
+                        now,
+                    ),
+                ).fetchone()[0]
+                self._conn.execute(
+                    "INSERT INTO recipe_search"
+                    " (rowid, title, ingredients, cuisine, dietary_tags)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (
+                        row_id,
+                        recipe.title,
+                        " ".join(ing.name for ing in recipe.ingredients),
+                        recipe.cuisine or "",
+                        " ".join(recipe.dietary_tags),
+                    ),
+                )
+
+    def index_snapshots(self, snapshots: dict[str, str]) -> None:
+        """Index the recipes in a batch of RecipeContext JSON snapshots."""
+        recipes = {}
+        for thread_id, snapshot in snapshots.items():
+            recipe = RecipeContext.model_validate_json(snapshot).recipe
+            if recipe is not None:
+                recipes[thread_id] = recipe
+        if recipes:
+            self.upsert_many(recipes)
+
+    def list(
+        self, limit: int = DEFAULT_PAGE_SIZE, cursor: str | None = None
+    ) -> RecipePage:
+        """
+        List recipes, most recently updated first.
+
+        Args:
+            limit: Page size (capped at MAX_PAGE_SIZE)
+            cursor: next_cursor from the previous page
+
+        Returns:
+            The page of summaries and the cursor for the next page, if any
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        sql = (
+            "SELECT id, thread_id, title, cuisine, servings, ingredient_count,"
+            " updated_at FROM recipes"
+        )
+        params: list[object] = []
+        if cursor:
+            sql += " WHERE (updated_at, id) < (?, ?)"
+            params.extend(_parse_cursor(cursor))
+        sql += " ORDER BY updated_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _cursor(rows[-1][6], rows[-1][0])
+        return RecipePage(
+            items=[self._summary(row) for row in rows], next_cursor=next_cursor
+        )
+
+    def search(
+        self, query: str, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0
+    ) -> RecipePage:
+        """
+        Full-text search over title, ingredients, cuisine and dietary tags.
+
+        Results are ranked by relevance (title matches highest) among the
+        SEARCH_RANK_WINDOW most recently updated matches; ties go to the most
+        recently updated recipe. The page's truncated flag is set when older
+        matches were left out of the ranking.
+        """
+        match = fts_query(query)
+        if match is None:
+            return RecipePage(items=[])
+
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        with self._lock:
+            window = [
+                row_id
+                for (row_id,) in self._conn.execute(
+                    "SELECT rowid FROM recipe_search WHERE recipe_search MATCH ?"
+                    " ORDER BY rowid DESC LIMIT ?",
+                    (match, SEARCH_RANK_WINDOW + 1),
+                )
+            ]
+            if not window:
+                return RecipePage(items=[])
+            truncated = len(window) > SEARCH_RANK_WINDOW
+            del window[SEARCH_RANK_WINDOW:]
+
+            scores = dict.fromkeys(window, 0.0)
+            for column, weight in COLUMN_WEIGHTS.items():
+                for word in query_words(query):
+                    for (row_id,) in self._conn.execute(
+                        "SELECT rowid FROM recipe_search"
+                        " WHERE recipe_search MATCH ? AND rowid >= ?",
+                        (f'{{{column}}} : "{word}"', window[-1]),
+                    ):
+                        if row_id in scores:
+                            scores[row_id] += weight
+
+            # Stable sort: equal scores keep the window's newest-first order
+            ranked = sorted(window, key=lambda row_id: -scores[row_id])
+            page = ranked[offset : offset + limit]
+            rows = self._conn.execute(
+                "SELECT id, thread_id, title, cuisine, servings, ingredient_count,"
+                f" updated_at FROM recipes WHERE id IN ({','.join('?' * len(page))})",
+                page,
+            ).fetchall()
+
+        by_id = {row[0]: row for row in rows}
+        next_cursor = str(offset + limit) if len(ranked) > offset + limit else None
+        return RecipePage(
+            items=[self._summary(by_id[row_id]) for row_id in page if row_id in by_id],
+            next_cursor=next_cursor,
+            truncated=truncated,
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _summary(row: tuple) -> RecipeSummary:
+        _, thread_id, title, cuisine, servings, ingredient_count, updated_at = row
+        return RecipeSummary(
+            thread_id=thread_id,
+            title=title,
+            cuisine=cuisine,
+            servings=servings,
+            ingredient_count=ingredient_count,
+            updated_at=updated_at,
+        )
@@ -6,18 +6,53 @@ Main entry point with routes and CopilotKit integration.
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
 import uuid
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
 from io import BytesIO
 from typing import Any
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pypdf import PdfReader
-from pydantic_ai.ag_ui import StateDeps
 
-from .models import RecipeContext
-from .agents import recipe_agent, parse_recipe_from_text
+from .models import (
+    CommandRequest,
+    CommandResponse,
+    MealPlan,
+    Recipe,
+    RecipeContext,
+    RecipePage,
+    RecipeSelection,
+    ShoppingList,
+    Timer,
+    TimerRequest,
+)
+from .agents import parse_recipe_from_text, tier_fractions
+from .chat_app import chat_app
+from .commands import CommandError, apply_command, state_delta
+from .dedup import get_dedup_index
+from .dietary import refresh_dietary_tags
+from .metrics import metrics
+from .library import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .nutrition import refresh_nutrition
+from .segmentation import split_recipes
+from .serialization import FastJSONResponse
+from .sessions import get_sessions
+from .shopping import build_shopping_list
+from .timers import (
+    cancel_timer_in_state,
+    get_timers,
+    pause_timer_in_state,
+    resume_timer_in_state,
+    start_timer_in_state,
+)
+from .timing import refresh_timing, schedule_recipes
+from .versions import start_history
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -27,11 +62,31 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Recipe segments of one upload parsed at the same time
+PARSE_CONCURRENCY = int(os.getenv("PARSE_CONCURRENCY", "4"))
+
 # =============================================================================
 # FastAPI Application
 # =============================================================================
 
-app = FastAPI(title="Recipe Companion API")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Run the session flusher and the timer wheel for the lifetime of the app."""
+    sessions = get_sessions()
+    timers = get_timers()
+    sessions.start()
+    timers.start()
+    yield
+    await timers.stop()
+    await sessions.stop()
+
+
+app = FastAPI(
+    title="Recipe Companion API",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -46,11 +101,13 @@ app.add_middleware(
 # File Upload Endpoint
 # =============================================================================
 @app.post("/upload")
-async def upload_document(file: UploadFile = File(...)) -> dict[str, Any]:
+async def upload_document(file: UploadFile = File(...)) -> FastJSONResponse:
     """
     Upload a recipe document (PDF or text), parse it, and return the parsed recipe.
 
-    The frontend stores the recipe in CopilotKit state via useCoAgent.
+    The frontend stores the recipe in CopilotKit state via useCoAgent. When the
+    document holds several recipes, the response also lists every recipe with
+    the thread it was saved under.
     """
     content = await file.read()
     filename = file.filename or ""
@@ -62,39 +119,301 @@ async def upload_document(file: UploadFile = File(...)) -> dict[str, Any]:
     else:
         text = content.decode("utf-8", errors="ignore")
 
-    # Parse recipe using pydantic-ai
-    recipe = await parse_recipe_from_text(text)
-    if not recipe:
+    # Cookbooks are split into recipes, parsed concurrently; the first one
+    # opens in this thread and each of the others gets a thread of its own
+    segments = split_recipes(text)
+    recipes = await _parse_segments(segments)
+    parsed = [
+        (segment, recipe)
+        for segment, recipe in zip(segments, recipes, strict=True)
+        if recipe is not None
+    ]
+    if not parsed:
         raise HTTPException(
             status_code=400,
             detail="We could not upload that document. Please try again.",
         )
+    if len(segments) > 1:
+        logger.info(f"Parsed {len(parsed)} of {len(segments)} recipes in {filename}")
 
     # Build response - frontend stores this in state
+    sessions = get_sessions()
+    threads = []
+    for segment, recipe in parsed:
+        thread_id = str(uuid.uuid4())
+        state = RecipeContext(document_text=segment, recipe=recipe)
+        refresh_dietary_tags(state)
+        refresh_timing(state)
+        refresh_nutrition(state)
+        start_history(state)
+        sessions.save(thread_id, state)
+        threads.append((thread_id, state))
+
+    thread_id, state = threads[0]
     response: dict[str, Any] = {
-        "threadId": str(uuid.uuid4()),
+        "threadId": thread_id,
         "runId": str(uuid.uuid4()),
-        "state": RecipeContext(document_text=text, recipe=recipe),
+        "state": state,
         "tools": [],
         "context": [],
         "forwardedProps": {},
         "messages": [],
     }
+    if len(segments) > 1:
+        # Every recipe in the document, each reopenable via /sessions/{threadId}
+        response["recipes"] = [
+            {"threadId": thread_id, "title": state.recipe.title}
+            for thread_id, state in threads
+        ]
+
+    # Returned as a response so the state is serialized once, by pydantic-core
+    return FastJSONResponse(response)
+
+
+async def _parse_document(text: str) -> Recipe | None:
+    """Parse one recipe, reusing the recipe of a near-identical earlier upload."""
+    dedup = get_dedup_index()
+    recipe = signature = None
+    if dedup is not None:
+        recipe, signature = await asyncio.to_thread(dedup.find, text)
+    if recipe is not None:
+        recipe.source_text = text
+        return recipe
+
+    # Parse recipe using pydantic-ai
+    recipe = await parse_recipe_from_text(text)
+    if recipe is not None and dedup is not None:
+        await asyncio.to_thread(dedup.add, signature, recipe)
+    return recipe
+
+
+async def _parse_segments(segments: list[str]) -> list[Recipe | None]:
+    """Parse each recipe segment, at most PARSE_CONCURRENCY at a time."""
+    semaphore = asyncio.Semaphore(PARSE_CONCURRENCY)
+
+    async def parse(segment: str) -> Recipe | None:
+        async with semaphore:
+            return await _parse_document(segment)
+
+    return await asyncio.gather(*(parse(segment) for segment in segments))
+
+
+# =============================================================================
+# Cooking Commands (no model turn)
+# =============================================================================
+
+
+@app.post("/commands")
+async def run_command(request: CommandRequest) -> CommandResponse:
+    """
+    Apply a deterministic command (next/previous step, restart, scale) to state.
+
+    Uses the same validation as the agent tools but never calls the model.
+    Returns only the changes, as JSON Patch operations.
+    """
+    state = request.state
+    before = state.model_dump(mode="json")
+    try:
+        message = apply_command(state, request.command)
+    except CommandError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    metrics.incr(f"commands.{request.command.action}")
+    if request.thread_id:
+        get_timers().sync(request.thread_id, state)
+        get_sessions().save(request.thread_id, state)
+    return CommandResponse(
+        message=message, delta=state_delta(before, state.model_dump(mode="json"))
+    )
+
+
+# =============================================================================
+# Shopping List & Meal Plan (several recipes, no model call)
+# =============================================================================
+
+
+async def _selected_recipes(selection: RecipeSelection) -> list[Recipe]:
+    """The recipes sent in full, then those of the saved threads given."""
+    states = await asyncio.gather(
+        *(get_sessions().load(thread_id) for thread_id in selection.thread_ids)
+    )
+    recipes = list(selection.recipes)
+    for thread_id, state in zip(selection.thread_ids, states, strict=True):
+        if state is None or state.recipe is None:
+            raise HTTPException(
+                status_code=404, detail=f"No recipe saved for thread {thread_id}."
+            )
+        recipes.append(state.recipe)
+    if not recipes:
+        raise HTTPException(status_code=400, detail="No recipes given.")
+    return recipes
+
+
+@app.post("/shopping-list")
+async def shopping_list(request: RecipeSelection) -> ShoppingList:
+    """
+    Merge the ingredients of several recipes into one categorised list.
+
+    Recipes can be sent in full or by saved thread, and are used at the
+    servings they are scaled to.
+    """
+    return build_shopping_list(await _selected_recipes(request))
+
+
+@app.post("/meal-plan")
+async def meal_plan(request: RecipeSelection) -> MealPlan:
+    """
+    Interleave the steps of several recipes into one timeline for one cook.
 
-    return response
+    Hands-off steps (simmering, baking) overlap with other recipes' work.
+    """
+    return schedule_recipes(await _selected_recipes(request))
+
+
+# =============================================================================
+# Sessions
+# =============================================================================
+
+
+@app.get("/sessions/{thread_id}")
+async def load_session(thread_id: str) -> RecipeContext:
+    """
+    Return the saved state for a thread so the frontend can rehydrate it.
+
+    State is saved after uploads, commands and every chat run.
+    """
+    state = await get_sessions().load(thread_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    # Re-arms the thread's timers if this worker hasn't seen them yet
+    get_timers().sync(thread_id, state)
+    return state
+
+
+# =============================================================================
+# Timers
+# =============================================================================
+
+
+async def _update_timers(
+    thread_id: str, operation: Callable[[RecipeContext], str]
+) -> list[Timer]:
+    """Apply a timer operation to a saved thread and return its timers."""
+    state = await load_session(thread_id)
+    try:
+        operation(state)
+    except CommandError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    get_timers().sync(thread_id, state)
+    get_sessions().save(thread_id, state)
+    return state.timers
+
+
+@app.get("/timers/{thread_id}")
+async def list_timers(thread_id: str) -> list[Timer]:
+    """Return a thread's timers, including fired and cancelled ones."""
+    return (await load_session(thread_id)).timers
+
+
+@app.post("/timers/{thread_id}")
+async def start_timer(thread_id: str, request: TimerRequest) -> list[Timer]:
+    """
+    Start a timer for a step (the current one by default) or a set duration.
+
+    Starting a paused timer's label again resumes it.
+    """
+    return await _update_timers(
+        thread_id,
+        lambda state: start_timer_in_state(
+            state, request.step_number, request.duration_seconds, request.label
+        ),
+    )
+
+
+@app.post("/timers/{thread_id}/{timer_id}/pause")
+async def pause_timer(thread_id: str, timer_id: str) -> list[Timer]:
+    """Pause a running timer, keeping the time left."""
+    return await _update_timers(
+        thread_id, lambda state: pause_timer_in_state(state, timer_id)
+    )
+
+
+@app.post("/timers/{thread_id}/{timer_id}/resume")
+async def resume_timer(thread_id: str, timer_id: str) -> list[Timer]:
+    """Restart a paused timer."""
+    return await _update_timers(
+        thread_id, lambda state: resume_timer_in_state(state, timer_id)
+    )
+
+
+@app.delete("/timers/{thread_id}/{timer_id}")
+async def cancel_timer(thread_id: str, timer_id: str) -> list[Timer]:
+    """Cancel a timer."""
+    return await _update_timers(
+        thread_id, lambda state: cancel_timer_in_state(state, timer_id)
+    )
+
+
+@app.get("/timers/{thread_id}/events")
+async def timer_events(thread_id: str) -> StreamingResponse:
+    """
+    Server-sent events for a thread's timers.
+
+    Each fired timer arrives as an AG-UI CUSTOM event named "timer_fired"
+    with the Timer as its value.
+    """
+    await load_session(thread_id)
+    return StreamingResponse(
+        get_timers().events(thread_id), media_type="text/event-stream"
+    )
+
+
+# =============================================================================
+# Recipe Library
+# =============================================================================
+
+
+@app.get("/recipes")
+async def list_recipes(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+) -> RecipePage:
+    """List saved recipes, most recently updated first."""
+    library = get_sessions().library
+    if library is None:
+        return RecipePage(items=[])
+    try:
+        return await asyncio.to_thread(library.list, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor.") from e
+
+
+@app.get("/recipes/search")
+async def search_recipes(
+    q: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+) -> RecipePage:
+    """Search saved recipes by title, ingredient, cuisine or dietary tag."""
+    library = get_sessions().library
+    if library is None:
+        return RecipePage(items=[])
+    if cursor and not cursor.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    offset = int(cursor) if cursor else 0
+    return await asyncio.to_thread(library.search, q, limit, offset)
 
 
 # =============================================================================
 # AG-UI Integration (pydantic-ai)
 # =============================================================================
 
-# Create AG-UI app from the recipe agent and mount it
-ag_ui_app = recipe_agent.to_ag_ui(deps=StateDeps(RecipeContext()))
-app.mount("/copilotkit", ag_ui_app)
+# Mount the AG-UI chat app (recipe agent behind the local intent router)
+app.mount("/copilotkit", chat_app)
 
 
 # =============================================================================
-# Health Check
+# Health Check & Metrics
 # =============================================================================
 
 
@@ -103,7 +422,22 @@ async def health():
     return {"status": "healthy", "service": "recipe-companion"}
 
 
+@app.get("/metrics")
+async def get_metrics() -> dict[str, float]:
+    """Return in-process optimisation counters (tokens saved, cache hits, ...)."""
+    return {**metrics.snapshot(), **tier_fractions()}
+
+
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("src.main:app", host="0.0.0.0", port=8000, reload=True)
+    # WORKERS > 1 is the production mode: no reload, and caches/state should
+    # use shared backends (CACHE_BACKEND=sqlite, SESSION_STORE=sqlite)
+    workers = int(os.getenv("WORKERS", "1"))
+    uvicorn.run(
+        "src.main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=workers == 1,
+        workers=workers,
+    )
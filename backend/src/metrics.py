@@ -0,0 +1,42 @@
+"""
+In-process Metrics for Recipe Companion
+
+Simple named counters used to observe cost and latency optimisations
+(tokens saved, cache hits, model tiers, ...). Exposed via GET /metrics.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from threading import Lock
+
+
+class Metrics:
+    """Thread-safe registry of named numeric counters."""
+
+    def __init__(self) -> None:
+        self._counters: Counter[str] = Counter()
+        self._lock = Lock()
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Add value to the named counter."""
+        with self._lock:
+            self._counters[name] += value
+
+    def get(self, name: str) -> float:
+        """Return the current value of a counter (0 if never incremented)."""
+        with self._lock:
+            return self._counters[name]
+
+    def snapshot(self) -> dict[str, float]:
+        """Return a copy of all counters, sorted by name."""
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    def reset(self) -> None:
+        """Clear all counters."""
+        with self._lock:
+            self._counters.clear()
+
+
+metrics = Metrics()
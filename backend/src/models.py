@@ -6,10 +6,55 @@ Pydantic models for structured recipe data and UI components.
 
 from __future__ import annotations
 
+import re
 from enum import Enum
 from typing import Any, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def _singular(word: str) -> str:
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+# Colours name a variety (green onions, white wine): a qualified ingredient
+# only wins a mention over an unqualified one when the text names its colour
+_COLOURS = frozenset(
+    {"red", "green", "yellow", "white", "black", "brown", "golden", "purple"}
+)
+# Words that never identify an ingredient by themselves
+_STOPWORDS = _COLOURS | frozenset(
+    {"and", "for", "the", "with", "large", "small", "medium", "big", "extra"}
+)
+
+
+def _name_words(text: str) -> set[str]:
+    """Lowercase, singularized words of 3+ letters, without _STOPWORDS."""
+    return {
+        _singular(word)
+        for word in _WORD_RE.findall(text.lower())
+        if len(word) > 2 and word not in _STOPWORDS
+    }
+
+
+def _colours(text: str) -> frozenset[str]:
+    return _COLOURS.intersection(_WORD_RE.findall(text.lower()))
+
+
+def normalize_name(name: str) -> str:
+    """Case- and whitespace-insensitive key for an ingredient name."""
+    return " ".join(name.lower().split())
+
+
+def ingredient_key(name: str) -> str:
+    """normalize_name, singularized: 'Cherry Tomatoes' -> 'cherry tomato'."""
+    return " ".join(_singular(word) for word in normalize_name(name).split())
 
 
 # =============================================================================
@@ -58,6 +103,87 @@ class RecipeStep(BaseModel):
     )
 
 
+class RecipeIndex:
+    """
+    Lookup tables over a recipe's ingredients and steps.
+
+    Holds ingredient and step positions, so it stays valid for as long as the
+    recipe keeps the same lists. Every edit in this codebase replaces a list
+    (substitute_ingredient, scale, assigning rewritten steps), which is what
+    Recipe.index checks before reusing it.
+    """
+
+    __slots__ = (
+        "by_name",
+        "by_step_number",
+        "by_word",
+        "colours",
+        "ingredient_steps",
+        "ingredients",
+        "step_ingredients",
+        "steps",
+    )
+
+    def __init__(self, ingredients: list[Ingredient], steps: list[RecipeStep]) -> None:
+        self.ingredients = ingredients
+        self.steps = steps
+        # normalized name -> positions in ingredients
+        self.by_name: dict[str, list[int]] = {}
+        # name word (see _name_words) -> positions in ingredients
+        self.by_word: dict[str, list[int]] = {}
+        # position -> colours in the ingredient's name
+        self.colours = [_colours(ing.name) for ing in ingredients]
+        for position, ing in enumerate(ingredients):
+            self.by_name.setdefault(normalize_name(ing.name), []).append(position)
+            for word in _name_words(ing.name):
+                self.by_word.setdefault(word, []).append(position)
+
+        # step_number -> position in steps (first one wins)
+        self.by_step_number: dict[int, int] = {}
+        # step position -> ingredient positions it mentions, and the reverse
+        self.step_ingredients: list[list[int]] = []
+        self.ingredient_steps: list[list[int]] = [[] for _ in ingredients]
+        for position, step in enumerate(steps):
+            self.by_step_number.setdefault(step.step_number, position)
+            mentioned = self.matching(step.instruction)
+            self.step_ingredients.append(mentioned)
+            for ingredient in mentioned:
+                self.ingredient_steps[ingredient].append(position)
+
+    def matching(self, text: str) -> list[int]:
+        """
+        Positions of ingredients sharing a name word with text, in recipe order.
+
+        Where several ingredients share a word, those whose colours text
+        names (all of them, the most first) are preferred: "fry the onions"
+        means the onions, not the green onions, unless they are the only ones.
+        """
+        colours = _colours(text)
+        matched: set[int] = set()
+        for word in _name_words(text):
+            positions = self.by_word.get(word, ())
+            named = [i for i in positions if self.colours[i] <= colours]
+            if named:
+                most = max(len(self.colours[i]) for i in named)
+                positions = [i for i in named if len(self.colours[i]) == most]
+            matched.update(positions)
+        return sorted(matched)
+
+    def is_current(
+        self, ingredients: list[Ingredient], steps: list[RecipeStep]
+    ) -> bool:
+        return (
+            self.ingredients is ingredients
+            and self.steps is steps
+            and len(self.step_ingredients) == len(steps)
+            and len(self.ingredient_steps) == len(ingredients)
+        )
+
+    def __eq__(self, other: object) -> bool:
+        # Derived data: never makes two otherwise equal recipes unequal
+        return other is None or isinstance(other, RecipeIndex)
+
+
 class Recipe(BaseModel):
     """Complete extracted recipe with all structured data."""
 
@@ -92,6 +218,17 @@ class Recipe(BaseModel):
         default=None, description="Original source text for reference"
     )
 
+    _index: RecipeIndex | None = PrivateAttr(default=None)
+
+    @property
+    def index(self) -> RecipeIndex:
+        """Lookup tables, built on first use and rebuilt once a list is replaced."""
+        if self._index is None or not self._index.is_current(
+            self.ingredients, self.steps
+        ):
+            self._index = RecipeIndex(self.ingredients, self.steps)
+        return self._index
+
     def scale(self, target_servings: int) -> "Recipe":
         """
         Return a new Recipe scaled to target_servings.
@@ -124,6 +261,40 @@ class Recipe(BaseModel):
             original_servings=original,
         )
 
+    def ingredients_for_step(self, step: RecipeStep) -> list[Ingredient]:
+        """Return the ingredients whose name is mentioned in a step's instruction."""
+        index = self.index
+        position = index.by_step_number.get(step.step_number)
+        if position is not None and self.steps[position] is step:
+            mentioned = index.step_ingredients[position]
+        else:
+            mentioned = index.matching(step.instruction)
+        return [self.ingredients[i] for i in mentioned]
+
+    def match_ingredients(self, name: str) -> list[Ingredient]:
+        """Return ingredients sharing a word with name (e.g. 'tomato' -> 'Roma tomatoes')."""
+        return [self.ingredients[i] for i in self.index.matching(name)]
+
+    def find_ingredient(self, name: str) -> Ingredient | None:
+        """Return the ingredient with exactly this name (case-insensitive)."""
+        positions = self.index.by_name.get(normalize_name(name))
+        return self.ingredients[positions[0]] if positions else None
+
+    def step(self, step_number: int) -> RecipeStep | None:
+        """Return the step with this step_number, if any."""
+        position = self.index.by_step_number.get(step_number)
+        return None if position is None else self.steps[position]
+
+    def steps_using(self, name: str) -> list[RecipeStep]:
+        """Return the steps that mention the ingredient(s) called name."""
+        index = self.index
+        positions = {
+            step
+            for ingredient in index.by_name.get(normalize_name(name), ())
+            for step in index.ingredient_steps[ingredient]
+        }
+        return [self.steps[i] for i in sorted(positions)]
+
     def substitute_ingredient(
         self,
         original_name: str,
@@ -135,30 +306,22 @@ class Recipe(BaseModel):
         Return a new Recipe with one ingredient substituted.
         Matches ingredient by name (case-insensitive).
         """
-        new_ingredients = []
-        for ing in self.ingredients:
-            if ing.name.lower() == original_name.lower():
-                new_ingredients.append(
-                    Ingredient(
-                        name=substitute_name,
-                        quantity=substitute_quantity
-                        if substitute_quantity is not None
-                        else ing.quantity,
-                        unit=substitute_unit
-                        if substitute_unit is not None
-                        else ing.unit,
-                        preparation=ing.preparation,
-                        category=ing.category,
-                        substitutes=[],
-                    )
-                )
-            else:
-                new_ingredients.append(ing)
+        new_ingredients = list(self.ingredients)
+        for position in self.index.by_name.get(normalize_name(original_name), ()):
+            ing = self.ingredients[position]
+            new_ingredients[position] = Ingredient(
+                name=substitute_name,
+                quantity=substitute_quantity
+                if substitute_quantity is not None
+                else ing.quantity,
+                unit=substitute_unit if substitute_unit is not None else ing.unit,
+                preparation=ing.preparation,
+                category=ing.category,
+                substitutes=[],
+            )
 
-        return Recipe(
-            **self.model_dump(exclude={"ingredients"}),
-            ingredients=new_ingredients,
-        )
+        # The steps are shared with this recipe rather than copied
+        return self.model_copy(update={"ingredients": new_ingredients})
 
 
 # =============================================================================
@@ -219,6 +382,96 @@ class AgentResponse(BaseModel):
 # =============================================================================
 
 
+class RecipeTiming(BaseModel):
+    """Step-based timing for a recipe, computed locally (see timing.py)."""
+
+    total_minutes: int = Field(
+        ..., description="Critical-path time for the whole recipe"
+    )
+    remaining_minutes: int = Field(
+        ..., description="Critical-path time from the current step on"
+    )
+    stated_minutes: int | None = Field(
+        default=None, description="Prep plus cook time as stated by the recipe"
+    )
+    next_timer: TimerSuggestion | None = Field(
+        default=None, description="Next timed step from the current step on"
+    )
+
+
+class Nutrients(BaseModel):
+    """Energy and macronutrients of an amount of food."""
+
+    calories: float = 0
+    protein_g: float = 0
+    fat_g: float = 0
+    carbs_g: float = 0
+    fiber_g: float = 0
+
+
+class NutritionFacts(BaseModel):
+    """Estimated nutrition of a recipe as scaled, computed locally (see nutrition.py)."""
+
+    servings: int
+    total: Nutrients
+    per_serving: Nutrients
+    unmatched: list[str] = Field(
+        default_factory=list,
+        description="Ingredients left out: unknown foods, or units with no weight",
+    )
+
+
+class Timer(BaseModel):
+    """A countdown timer run by the server for a thread (see timers.py)."""
+
+    id: str
+    label: str
+    step_number: int | None = None
+    duration_seconds: int
+    status: Literal["running", "paused", "fired", "cancelled"] = "running"
+    ends_at: float | None = Field(
+        default=None, description="Unix time the timer fires at, while running"
+    )
+    remaining_seconds: float = Field(
+        ..., description="Time left when the timer was last started or paused"
+    )
+    updated_at: float = Field(
+        ..., description="Unix time of the last change; the latest version wins"
+    )
+
+
+class RecipeVersion(BaseModel):
+    """
+    One version of a thread's recipe, stored as what differs from the
+    original (see versions.py).
+    """
+
+    label: str = Field(..., description="What changed, e.g. 'Swapped butter for oil'")
+    servings: int
+    ingredients: dict[int, Ingredient] = Field(
+        default_factory=dict,
+        description="Replaced ingredients by position, at the original servings",
+    )
+    steps: dict[int, RecipeStep] = Field(
+        default_factory=dict, description="Rewritten steps by position"
+    )
+    dietary_tags: list[str] | None = Field(
+        default=None, description="Tags, if they differ from the original's"
+    )
+
+    _recipe: Recipe | None = PrivateAttr(default=None)
+
+
+class RecipeHistory(BaseModel):
+    """Undo/redo history of a thread's recipe."""
+
+    original: Recipe = Field(
+        ..., description="The recipe as parsed, without its source text"
+    )
+    versions: list[RecipeVersion]
+    position: int = Field(default=0, description="Index of the current version")
+
+
 class RecipeContext(BaseModel):
     """Shared state between frontend and agent via CopilotKit."""
 
@@ -228,6 +481,69 @@ class RecipeContext(BaseModel):
     scaled_servings: int | None = None
     checked_ingredients: list[str] = Field(default_factory=list)
     cooking_started: bool = False
+    timing: RecipeTiming | None = None
+    nutrition: NutritionFacts | None = None
+    timers: list[Timer] = Field(default_factory=list)
+    history: RecipeHistory | None = None
+
+
+class CookingCommand(BaseModel):
+    """A deterministic cooking action applied without a model turn."""
+
+    action: Literal[
+        "next_step",
+        "previous_step",
+        "restart",
+        "go_to_step",
+        "scale",
+        "start_cooking",
+        "stop_cooking",
+        "undo",
+        "redo",
+    ]
+    step: int | None = Field(
+        default=None, description="Target step (0-indexed) for go_to_step"
+    )
+    servings: int | None = Field(default=None, description="Target servings for scale")
+
+
+class CommandRequest(BaseModel):
+    """Request body for POST /commands."""
+
+    state: RecipeContext
+    command: CookingCommand
+    thread_id: str | None = Field(
+        default=None, description="Thread to persist the updated state under"
+    )
+
+
+class CommandResponse(BaseModel):
+    """Result of a cooking command: a message and the state changes it made."""
+
+    message: str
+    delta: list[dict[str, Any]] = Field(
+        default_factory=list,
+        description="JSON Patch (RFC 6902) operations, as in AG-UI STATE_DELTA",
+    )
+
+
+class TimerRequest(BaseModel):
+    """Request body for starting a timer; unset fields come from the step."""
+
+    step_number: int | None = Field(
+        default=None, description="Step (1-based) to time; the current step if unset"
+    )
+    duration_seconds: int | None = Field(default=None, gt=0)
+    label: str | None = None
+
+
+class IngredientSwap(BaseModel):
+    """One requested ingredient substitution."""
+
+    original_ingredient: str = Field(
+        ..., description="Ingredient to replace (can be fuzzy)"
+    )
+    substitute_name: str = Field(..., description="Name of the substitute ingredient")
 
 
 class SubstitutionResult(BaseModel):
@@ -256,3 +572,105 @@ class SubstitutionResult(BaseModel):
     cooking_tip: str | None = Field(
         default=None, description="Cooking tip for using the substitute"
     )
+
+
+# =============================================================================
+# Recipe Library
+# =============================================================================
+
+
+class RecipeSummary(BaseModel):
+    """A saved recipe as shown in the library list."""
+
+    thread_id: str = Field(..., description="Thread to load to reopen the recipe")
+    title: str
+    cuisine: str | None = None
+    servings: int
+    ingredient_count: int
+    updated_at: float = Field(..., description="Last update (Unix timestamp)")
+
+
+class RecipePage(BaseModel):
+    """One page of library results."""
+
+    items: list[RecipeSummary]
+    next_cursor: str | None = Field(
+        default=None, description="Pass as cursor to fetch the next page"
+    )
+    truncated: bool = Field(
+        default=False,
+        description="Search only: older matches were left out of the ranking",
+    )
+
+
+# =============================================================================
+# Shopping List
+# =============================================================================
+
+
+class ShoppingItem(BaseModel):
+    """One line of a shopping list, merged across recipes."""
+
+    name: str
+    quantity: float | None = Field(
+        default=None, description="Total quantity, or None if unmeasured"
+    )
+    unit: str | None = None
+    category: Literal["produce", "protein", "dairy", "pantry", "spice", "other"] = (
+        "other"
+    )
+    recipes: list[str] = Field(
+        default_factory=list, description="Titles of the recipes that use it"
+    )
+
+
+class ShoppingSection(BaseModel):
+    """Shopping list items of one grocery category."""
+
+    category: str
+    items: list[ShoppingItem]
+
+
+class ShoppingList(BaseModel):
+    """Ingredients of several recipes, merged and grouped by category."""
+
+    recipes: list[str] = Field(..., description="Titles of the recipes included")
+    sections: list[ShoppingSection]
+
+
+class RecipeSelection(BaseModel):
+    """Request body for endpoints that work across several recipes."""
+
+    recipes: list[Recipe] = Field(
+        default_factory=list, description="Recipes to shop for, as scaled"
+    )
+    thread_ids: list[str] = Field(
+        default_factory=list, description="Saved threads whose recipes to include"
+    )
+
+
+# =============================================================================
+# Meal Plan
+# =============================================================================
+
+
+class ScheduledStep(BaseModel):
+    """A recipe step placed on a shared cooking timeline."""
+
+    recipe: str = Field(..., description="Title of the recipe the step belongs to")
+    step_number: int
+    instruction: str
+    start_minute: int = Field(..., description="Minutes after cooking starts")
+    end_minute: int
+    hands_on: bool = Field(..., description="Whether the cook is busy for the step")
+
+
+class MealPlan(BaseModel):
+    """Several recipes cooked together by one cook."""
+
+    recipes: list[str] = Field(..., description="Titles of the recipes included")
+    total_minutes: int = Field(..., description="Wall-clock time for everything")
+    sequential_minutes: int = Field(
+        ..., description="Time to cook the recipes one after another"
+    )
+    steps: list[ScheduledStep] = Field(..., description="Steps ordered by start")
@@ -0,0 +1,187 @@
+"""
+Nutrition Estimates
+
+Calories and macronutrients for a recipe, from a bundled food-composition
+table (data/foods.csv: approximate per-100 g figures for common foods), with
+no model call.
+
+- Names: ingredients are matched on ingredient_key, the normalization used
+  for substitution and shopping lists. A name with no exact entry falls back
+  to the longest run of its words that names a food and ends at its head
+  noun, the last word that isn't a form like "leaves" or "zest" (as in
+  dietary.py): "boneless chicken thighs" -> "chicken thigh", "basil leaves"
+  -> "basil". A name whose head isn't in the table has no food, even if a
+  modifier is ("peanut butter cookies"), and neither has a bare head after
+  another food ("rice noodles" isn't egg noodles).
+- Amounts: quantities are converted to grams with units.py. Volumes use the
+  food's density and counts ("2 eggs", "3 cloves") its weight per piece, or
+  a generic weight for units such as "pinch" or "can".
+- Incremental: the nutrients in one unit of each (ingredient, unit) pair are
+  cached, so after scaling or a substitution only the new ingredient is
+  looked up and the totals are a weighted sum.
+
+Ingredients without a quantity ("salt to taste") are left out.
+"""
+
+from __future__ import annotations
+
+import csv
+from functools import cache, lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+from .dietary import FORM_WORDS
+from .models import (
+    Nutrients,
+    NutritionFacts,
+    Recipe,
+    RecipeContext,
+    ingredient_key,
+)
+from .units import parse_unit
+
+FOODS_PATH = Path(__file__).parent / "data" / "foods.csv"
+NUTRIENT_CACHE_SIZE = 4096
+
+# Weight in grams of counted units that mean the same for any food
+GENERIC_PIECE_GRAMS = {
+    "pinch": 0.3,
+    "dash": 0.6,
+    "sprig": 1.0,
+    "handful": 30.0,
+    "bunch": 30.0,
+    "knob": 15.0,
+    "stick": 113.0,
+    "can": 400.0,
+    "tin": 400.0,
+}
+
+
+class Food(NamedTuple):
+    """A row of the food table."""
+
+    name: str
+    # calories, protein, fat, carbs, fiber per 100 g
+    per_100g: tuple[float, float, float, float, float]
+    density: float  # grams per millilitre
+    piece_grams: float | None
+
+
+@cache
+def food_table() -> dict[str, Food]:
+    """The bundled food table, by ingredient_key of each name and alias."""
+    table: dict[str, Food] = {}
+    with FOODS_PATH.open(encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            food = Food(
+                name=row["name"],
+                per_100g=(
+                    float(row["kcal"]),
+                    float(row["protein_g"]),
+                    float(row["fat_g"]),
+                    float(row["carbs_g"]),
+                    float(row["fiber_g"]),
+                ),
+                density=float(row["density_g_ml"] or 1),
+                piece_grams=float(row["piece_g"]) if row["piece_g"] else None,
+            )
+            names = [row["name"], *filter(None, row["aliases"].split(";"))]
+            for name in names:
+                table.setdefault(ingredient_key(name), food)
+    return table
+
+
+@lru_cache(maxsize=NUTRIENT_CACHE_SIZE)
+def find_food(name: str) -> Food | None:
+    """Resolve an ingredient name to a food, or None if nothing matches."""
+    table = food_table()
+    words = ingredient_key(name).split()
+    head = len(words) - 1
+    while head >= 0:
+        # Longest run ending at the head first
+        for start in range(head + 1):
+            food = table.get(" ".join(words[start : head + 1]))
+            if food is None:
+                continue
+            if start == head and start > 0 and words[start - 1] in table:
+                # Two foods ("almond milk") make a third the table lacks
+                return None
+            return food
+        if words[head] not in FORM_WORDS:
+            return None
+        head -= 1
+    return None
+
+
+@lru_cache(maxsize=NUTRIENT_CACHE_SIZE)
+def nutrients_per_unit(name: str, unit: str | None) -> tuple[float, ...] | None:
+    """Nutrients in one unit of an ingredient, or None if it can't be weighed."""
+    food = find_food(name)
+    if food is None:
+        return None
+    parsed = parse_unit(unit)
+    if parsed.dimension == "mass":
+        grams = parsed.factor
+    elif parsed.dimension == "volume":
+        grams = parsed.factor * food.density
+    elif parsed.name in GENERIC_PIECE_GRAMS:
+        grams = GENERIC_PIECE_GRAMS[parsed.name]
+    elif food.piece_grams is not None:
+        grams = food.piece_grams
+    else:
+        return None
+    return tuple(value * grams / 100 for value in food.per_100g)
+
+
+def _nutrients(values: list[float]) -> Nutrients:
+    calories, protein, fat, carbs, fiber = values
+    return Nutrients(
+        calories=round(calories),
+        protein_g=round(protein, 1),
+        fat_g=round(fat, 1),
+        carbs_g=round(carbs, 1),
+        fiber_g=round(fiber, 1),
+    )
+
+
+def recipe_nutrition(recipe: Recipe) -> NutritionFacts:
+    """Estimate a recipe's nutrition at its current servings."""
+    totals = [0.0] * 5
+    unmatched: list[str] = []
+    for ing in recipe.ingredients:
+        if ing.quantity is None:
+            continue
+        per_unit = nutrients_per_unit(ing.name, ing.unit)
+        if per_unit is None:
+            unmatched.append(ing.name)
+            continue
+        for i, value in enumerate(per_unit):
+            totals[i] += value * ing.quantity
+
+    servings = max(recipe.servings, 1)
+    return NutritionFacts(
+        servings=servings,
+        total=_nutrients(totals),
+        per_serving=_nutrients([total / servings for total in totals]),
+        unmatched=unmatched,
+    )
+
+
+def refresh_nutrition(state: RecipeContext) -> None:
+    """Update state.nutrition after the recipe changed."""
+    state.nutrition = recipe_nutrition(state.recipe) if state.recipe else None
+
+
+def format_nutrition(facts: NutritionFacts) -> str:
+    """Render nutrition facts as plain text for the chat."""
+    per, total = facts.per_serving, facts.total
+    serving = (
+        f"Per serving (of {facts.servings}): {per.calories:g} kcal, "
+        f"{per.protein_g:g} g protein, {per.fat_g:g} g fat, "
+        f"{per.carbs_g:g} g carbs, {per.fiber_g:g} g fiber"
+    )
+    lines = [serving, f"Whole recipe: {total.calories:g} kcal"]
+    if facts.unmatched:
+        lines.append(f"Not counted: {', '.join(facts.unmatched)}")
+    lines.append("Estimates from typical values; actual figures vary by brand.")
+    return "\n".join(lines)
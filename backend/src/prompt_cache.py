@@ -0,0 +1,228 @@
+"""
+Gemini Context Caching
+
+Moves the static prefix of each Gemini request (system instruction, tools and
+tool config) into a Gemini `CachedContent` so repeated calls don't re-bill and
+re-process the same tokens. For the chat agent the system instruction is the
+static CHAT_PROMPT plus the rendered recipe, so each thread's recipe version
+gets its own cached context.
+
+Anything after PROGRESS_HEADER in the instructions (current step, etc.) and
+any extra system parts (e.g. the compacted-history summary) change turn to
+turn, so they are sent as a leading user message instead of being cached.
+
+Gemini rejects `cached_content` alongside `system_instruction`/`tools`, which
+pydantic-ai always sends, so the swap happens in a GoogleModel subclass.
+Enabled with GEMINI_CONTEXT_CACHE=true; prefixes below the provider minimum
+cache size are sent as-is and still benefit from Gemini's implicit caching.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Any
+
+import httpx
+from google.genai.errors import APIError
+from pydantic_ai.messages import ModelMessage
+from pydantic_ai.models import ModelRequestParameters
+from pydantic_ai.models.google import GoogleModel, GoogleModelSettings
+
+from .history import CHARS_PER_TOKEN
+from .metrics import metrics
+from .shared_cache import SharedCache, get_shared_cache
+
+logger = logging.getLogger(__name__)
+
+PROMPT_CACHE_ENABLED = os.getenv("GEMINI_CONTEXT_CACHE", "false").lower() == "true"
+PROMPT_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+# Gemini refuses to cache prefixes smaller than this (model dependent)
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "1024"))
+
+# Instructions after this header are volatile and never cached
+PROGRESS_HEADER = "CURRENT PROGRESS"
+
+CACHED_CONFIG_KEYS = ("system_instruction", "tools", "tool_config")
+SUPPORTED_PROVIDERS = ("google-gla", "google-vertex")
+
+# Recreate caches a little before Gemini expires them
+EXPIRY_MARGIN_SECONDS = 60
+# Prefixes remembered as uncacheable; the oldest are forgotten past this
+MAX_FAILED_PREFIXES = 1024
+
+
+# =============================================================================
+# Cache Registry
+# =============================================================================
+
+
+class PromptCache:
+    """Maps static request prefixes to Gemini CachedContent names."""
+
+    def __init__(
+        self,
+        enabled: bool = PROMPT_CACHE_ENABLED,
+        ttl_seconds: int = PROMPT_CACHE_TTL_SECONDS,
+        min_tokens: int = PROMPT_CACHE_MIN_TOKENS,
+        store: SharedCache | None = None,
+    ) -> None:
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        # Cache names live in the shared cache so every worker reuses them
+        self._store = store
+        # Insertion-ordered, so the oldest failure is evicted first
+        self._failed: dict[str, None] = {}
+        # One lock per prefix being looked up, with the number of callers
+        # holding or waiting for it; removed when the last one is done
+        self._locks: dict[str, tuple[asyncio.Lock, int]] = {}
+
+    async def get_or_create(
+        self, model: GoogleModel, prefix: dict[str, Any]
+    ) -> str | None:
+        """
+        Return the CachedContent name for a request prefix, creating it if needed.
+
+        Args:
+            model: Model whose client and name the cache is created for
+            prefix: The cacheable config entries (system_instruction, tools, ...)
+
+        Returns:
+            The cached content name, or None if the prefix should be sent inline
+        """
+        serialized = json.dumps(prefix, sort_keys=True, default=str)
+        tokens = len(serialized) // CHARS_PER_TOKEN
+        if tokens < self.min_tokens:
+            metrics.incr("prompt_cache.skipped")
+            return None
+
+        key = hashlib.sha256(f"{model.model_name}:{serialized}".encode()).hexdigest()
+        if key in self._failed:
+            return None
+
+        lock, users = self._locks.get(key, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                return await self._get_or_create(model, prefix, key, tokens)
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+    async def _get_or_create(
+        self, model: GoogleModel, prefix: dict[str, Any], key: str, tokens: int
+    ) -> str | None:
+        store = self._store or get_shared_cache()
+        name = await store.get("gemini_cache", key)
+        if name is not None:
+            metrics.incr("prompt_cache.hits")
+            metrics.incr("prompt_cache.cached_tokens", tokens)
+            return name
+
+        try:
+            cached = await model.client.aio.caches.create(
+                model=model.model_name,
+                config={**prefix, "ttl": f"{self.ttl_seconds}s"},
+            )
+        except (APIError, httpx.HTTPError) as e:
+            logger.warning(f"Context cache creation failed, sending inline: {e}")
+            metrics.incr("prompt_cache.errors")
+            self._failed[key] = None
+            if len(self._failed) > MAX_FAILED_PREFIXES:
+                del self._failed[next(iter(self._failed))]
+            return None
+
+        await store.set(
+            "gemini_cache",
+            key,
+            cached.name,
+            ttl=self.ttl_seconds - EXPIRY_MARGIN_SECONDS,
+        )
+        metrics.incr("prompt_cache.creates")
+        logger.info(f"Created context cache {cached.name} (~{tokens} tokens)")
+        return cached.name
+
+
+prompt_cache = PromptCache()
+
+
+# =============================================================================
+# Caching Model
+# =============================================================================
+
+
+def _split_system_instruction(
+    system_instruction: dict[str, Any],
+) -> tuple[dict[str, Any] | None, str]:
+    """Split a system instruction into its cacheable part and volatile text."""
+    parts = system_instruction.get("parts") or []
+    if not parts:
+        return None, ""
+
+    # pydantic-ai appends the agent instructions as the last system part;
+    # earlier parts come from per-run system prompts and are volatile.
+    instructions = parts[-1].get("text", "")
+    static, header, progress = instructions.rpartition(PROGRESS_HEADER)
+    volatile = [part.get("text", "") for part in parts[:-1]]
+    if header:
+        volatile.append(header + progress)
+    else:
+        static = instructions
+
+    static = static.strip()
+    cacheable = {"role": "user", "parts": [{"text": static}]} if static else None
+    return cacheable, "\n\n".join(text for text in volatile if text)
+
+
+class CachingGoogleModel(GoogleModel):
+    """GoogleModel that serves the static request prefix from a context cache."""
+
+    def __init__(
+        self, model_name: str, *, cache: PromptCache | None = None, **kwargs: Any
+    ) -> None:
+        super().__init__(model_name, **kwargs)
+        self.prompt_cache = cache or prompt_cache
+
+    async def _build_content_and_config(
+        self,
+        messages: list[ModelMessage],
+        model_settings: GoogleModelSettings,
+        model_request_parameters: ModelRequestParameters,
+    ) -> tuple[list[Any], Any]:
+        contents, config = await super()._build_content_and_config(
+            messages, model_settings, model_request_parameters
+        )
+        if (
+            not self.prompt_cache.enabled
+            or self.system not in SUPPORTED_PROVIDERS
+            or config.get("cached_content")
+            or not config.get("system_instruction")
+        ):
+            return contents, config
+
+        cacheable, volatile = _split_system_instruction(config["system_instruction"])
+        if cacheable is None:
+            return contents, config
+
+        prefix: dict[str, Any] = {"system_instruction": cacheable}
+        for key in ("tools", "tool_config"):
+            if config.get(key):
+                prefix[key] = config[key]
+
+        cache_name = await self.prompt_cache.get_or_create(self, prefix)
+        if cache_name is None:
+            return contents, config
+
+        config = {k: v for k, v in config.items() if k not in CACHED_CONFIG_KEYS}
+        config["cached_content"] = cache_name
+        if volatile:
+            contents = [{"role": "user", "parts": [{"text": volatile}]}, *contents]
+        return contents, config
@@ -0,0 +1,90 @@
+"""
+Recipe Segmentation for Multi-Recipe Documents
+
+Splits an uploaded document (e.g. a cookbook PDF) into one text segment per
+recipe, so each recipe can be parsed on its own and concurrently instead of
+sending the whole book to the parser in a single prompt.
+
+A recipe is recognised by an ingredients heading that follows the previous
+recipe's method heading. Its segment starts at the short header lines just
+above that heading (title, "Serves 4", timings), and runs until the next
+recipe's header. Documents without at least two such recipes are returned
+as a single segment, unchanged.
+"""
+
+from __future__ import annotations
+
+import re
+
+_INGREDIENTS_RE = re.compile(
+    r"^\s*(?:ingredients?|you will need|what you(?:'ll)? need)\b[^.]{0,30}:?\s*$",
+    re.IGNORECASE,
+)
+_METHOD_RE = re.compile(
+    r"^\s*(?:method|directions|instructions|preparation|steps)\b[^.]{0,30}:?\s*$",
+    re.IGNORECASE,
+)
+
+# Header lines (title, servings, timings) above an ingredients heading
+MAX_HEADER_LINES = 4
+MAX_HEADER_CHARS = 80
+_SENTENCE_END_RE = re.compile(r"[.!?]\s*$")
+# Page numbers and URLs that PDF extraction leaves between recipes
+_FURNITURE_RE = re.compile(
+    r"^(?:page \d+(?: of \d+)?|\d+(?: ?/ ?\d+)?|https?://\S+|www\.\S+)$",
+    re.IGNORECASE,
+)
+
+
+def _header_start(lines: list[str], heading: int, floor: int) -> int:
+    """First line of the header block above the ingredients heading at heading."""
+    start = heading
+    taken = 0
+    for i in range(heading - 1, floor - 1, -1):
+        line = lines[i].strip()
+        if not line or _FURNITURE_RE.match(line):
+            continue
+        # The end of the previous recipe's method, not part of this header
+        if len(line) > MAX_HEADER_CHARS or _SENTENCE_END_RE.search(line):
+            break
+        start = i
+        taken += 1
+        if taken == MAX_HEADER_LINES:
+            break
+    return start
+
+
+def split_recipes(text: str) -> list[str]:
+    """
+    Split a document into one segment per recipe.
+
+    Returns:
+        The recipe segments in document order, or [text] when the document
+        holds fewer than two recognisable recipes
+    """
+    lines = text.splitlines()
+    headings: list[int] = []
+    seen_method = True
+    for i, line in enumerate(lines):
+        if _METHOD_RE.match(line):
+            seen_method = True
+        elif _INGREDIENTS_RE.match(line) and seen_method:
+            headings.append(i)
+            seen_method = False
+
+    if len(headings) < 2:
+        return [text]
+
+    starts = []
+    floor = 0
+    for heading in headings:
+        start = _header_start(lines, heading, floor)
+        starts.append(start)
+        floor = heading + 1
+
+    segments = []
+    for start, end in zip(starts, [*starts[1:], len(lines)], strict=True):
+        segment = "\n".join(lines[start:end]).strip()
+        if segment:
+            segments.append(segment)
+    return segments if len(segments) > 1 else [text]
@@ -0,0 +1,58 @@
+"""
+Fast JSON Serialization
+
+Hot encoding paths routed through pydantic-core's Rust serializer:
+
+- encode_sse(): AG-UI events for the /copilotkit stream. STATE_SNAPSHOT events
+  carry the whole RecipeContext; instead of re-inferring the snapshot's type
+  through the event's `Any` field, the snapshot is dumped with the model's own
+  compiled serializer and spliced into the event JSON.
+- FastJSONResponse: the app's default response class. Renders with
+  pydantic_core.to_json instead of json.dumps, and accepts models directly so
+  handlers can skip FastAPI's recursive jsonable_encoder pass.
+
+See benchmarks/serialization.py for timings.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from ag_ui.core import BaseEvent, EventType
+from pydantic import BaseModel
+from pydantic_ai.ui.ag_ui import AGUIAdapter, AGUIEventStream
+from pydantic_core import to_json
+from starlette.responses import JSONResponse
+
+
+def encode_sse(event: BaseEvent) -> str:
+    """Encode an AG-UI event as an SSE frame (same JSON as ag_ui's encoder)."""
+    snapshot = getattr(event, "snapshot", None)
+    if event.type == EventType.STATE_SNAPSHOT and isinstance(snapshot, BaseModel):
+        head = event.model_dump_json(
+            by_alias=True, exclude_none=True, exclude={"snapshot"}
+        )
+        body = snapshot.model_dump_json(by_alias=True, exclude_none=True)
+        return f'data: {head[:-1]},"snapshot":{body}}}\n\n'
+    return f"data: {event.model_dump_json(by_alias=True, exclude_none=True)}\n\n"
+
+
+class FastAGUIEventStream(AGUIEventStream):
+    """AG-UI event stream using encode_sse."""
+
+    def encode_event(self, event: BaseEvent) -> str:
+        return encode_sse(event)
+
+
+class FastAGUIAdapter(AGUIAdapter):
+    """AG-UI adapter whose responses are encoded with encode_sse."""
+
+    def build_event_stream(self) -> FastAGUIEventStream:
+        return FastAGUIEventStream(self.run_input, accept=self.accept)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by pydantic-core; accepts models, dicts and lists."""
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
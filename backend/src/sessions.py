@@ -0,0 +1,285 @@
+"""
+Session Persistence
+
+Stores each thread's RecipeContext so a refresh (or a new tab) can rehydrate
+the session by thread id instead of re-uploading and re-parsing the recipe.
+
+Writes are write-behind: save() only records a JSON snapshot in memory and
+returns. A background task compresses pending snapshots and writes them to the
+store in batches, off the request path, keeping only the latest snapshot per
+thread. Reads check the pending buffer and the batch being written first, so
+a load straight after a save sees the new state. At most one flush interval of writes is lost on a crash;
+SQLite's journal keeps the database itself consistent.
+
+Stores are pluggable (SESSION_STORE=sqlite|memory|none). Each flushed batch
+is also indexed into the recipe library (library.py).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from abc import ABC, abstractmethod
+from threading import Lock
+
+from pydantic import ValidationError
+
+from .library import RecipeLibrary
+from .metrics import metrics
+from .models import Recipe, RecipeContext
+
+logger = logging.getLogger(__name__)
+
+SESSION_STORE = os.getenv("SESSION_STORE", "sqlite").lower()
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "0.5"))
+SESSION_BATCH_SIZE = int(os.getenv("SESSION_BATCH_SIZE", "100"))
+
+
+# =============================================================================
+# Serialization
+# =============================================================================
+
+
+def encode_state(snapshot: str) -> bytes:
+    """Compress a RecipeContext JSON snapshot for storage."""
+    return zlib.compress(snapshot.encode(), level=6)
+
+
+def decode_state(data: bytes) -> RecipeContext:
+    """Rebuild a RecipeContext from its stored form."""
+    return RecipeContext.model_validate_json(zlib.decompress(data))
+
+
+# =============================================================================
+# Stores
+# =============================================================================
+
+
+class SessionStore(ABC):
+    """Backend that stores encoded sessions by thread id."""
+
+    @abstractmethod
+    def load(self, thread_id: str) -> bytes | None:
+        """Return the encoded session for a thread, or None."""
+
+    @abstractmethod
+    def save_many(self, sessions: dict[str, bytes]) -> None:
+        """Write several encoded sessions in one batch."""
+
+    def close(self) -> None:
+        """Release any resources held by the store."""
+
+
+class MemorySessionStore(SessionStore):
+    """In-process store; sessions are lost on restart. Useful for tests."""
+
+    def __init__(self) -> None:
+        self._sessions: dict[str, bytes] = {}
+
+    def load(self, thread_id: str) -> bytes | None:
+        return self._sessions.get(thread_id)
+
+    def save_many(self, sessions: dict[str, bytes]) -> None:
+        self._sessions.update(sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Durable single-file store; the default."""
+
+    def __init__(self, path: str = SESSION_DB_PATH) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " thread_id TEXT PRIMARY KEY,"
+                " state BLOB NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    def load(self, thread_id: str) -> bytes | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM sessions WHERE thread_id = ?", (thread_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save_many(self, sessions: dict[str, bytes]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO sessions (thread_id, state, updated_at)"
+                " VALUES (?, ?, ?)"
+                " ON CONFLICT(thread_id) DO UPDATE SET"
+                " state = excluded.state, updated_at = excluded.updated_at",
+                [(thread_id, data, now) for thread_id, data in sessions.items()],
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def make_store(kind: str = SESSION_STORE) -> SessionStore | None:
+    """Create the configured store, or None when persistence is disabled."""
+    match kind:
+        case "sqlite":
+            return SQLiteSessionStore()
+        case "memory":
+            return MemorySessionStore()
+        case "none" | "":
+            return None
+        case _:
+            raise ValueError(f"Unknown SESSION_STORE: {kind}")
+
+
+def make_library(kind: str = SESSION_STORE) -> RecipeLibrary | None:
+    """Create the recipe library matching the session store, if any."""
+    match kind:
+        case "sqlite":
+            return RecipeLibrary(SESSION_DB_PATH)
+        case "memory":
+            return RecipeLibrary(":memory:")
+        case _:
+            return None
+
+
+# =============================================================================
+# Write-behind Persistence
+# =============================================================================
+
+
+class SessionPersistence:
+    """Buffers session writes and flushes them to a store in batches."""
+
+    def __init__(
+        self,
+        store: SessionStore | None,
+        library: RecipeLibrary | None = None,
+        flush_interval: float = SESSION_FLUSH_INTERVAL,
+        batch_size: int = SESSION_BATCH_SIZE,
+    ) -> None:
+        self.store = store
+        self.library = library
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending: dict[str, str] = {}
+        # Batch currently being written; still served by load() until stored
+        self._inflight: dict[str, str] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    def save(self, thread_id: str, state: RecipeContext) -> None:
+        """Queue a snapshot of a thread's state. Never blocks on the store."""
+        if self.store is None or not thread_id:
+            return
+        self._pending[thread_id] = state.model_dump_json()
+        metrics.incr("sessions.saves")
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def load(self, thread_id: str) -> RecipeContext | None:
+        """Return the latest saved state for a thread, or None."""
+        if self.store is None:
+            return None
+        snapshot = self._pending.get(thread_id) or self._inflight.get(thread_id)
+        if snapshot is not None:
+            return RecipeContext.model_validate_json(snapshot)
+
+        data = await asyncio.to_thread(self.store.load, thread_id)
+        if data is None:
+            return None
+        try:
+            return decode_state(data)
+        except (zlib.error, ValidationError) as e:
+            logger.warning(f"Discarding unreadable session {thread_id}: {e}")
+            metrics.incr("sessions.corrupt")
+            return None
+
+    async def find_recipe(self, title: str) -> Recipe | None:
+        """Return the saved recipe that best matches a title search, if any."""
+        if self.library is None:
+            return None
+        page = await asyncio.to_thread(self.library.search, title, 1)
+        if not page.items:
+            return None
+        state = await self.load(page.items[0].thread_id)
+        return state.recipe if state is not None else None
+
+    async def flush(self) -> None:
+        """Write all pending snapshots to the store."""
+        if self.store is None or not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self._inflight = batch
+        encoded = {thread_id: encode_state(s) for thread_id, s in batch.items()}
+        try:
+            await asyncio.to_thread(self.store.save_many, encoded)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Session flush failed, will retry: {e}")
+            metrics.incr("sessions.flush_errors")
+            # Keep newer snapshots queued since the failed batch was taken
+            self._pending = {**batch, **self._pending}
+            return
+        finally:
+            self._inflight = {}
+        metrics.incr("sessions.flushes")
+        metrics.incr("sessions.bytes_written", sum(map(len, encoded.values())))
+
+        if self.library is not None:
+            try:
+                await asyncio.to_thread(self.library.index_snapshots, batch)
+            except (sqlite3.Error, ValidationError) as e:
+                logger.warning(f"Recipe library indexing failed: {e}")
+                metrics.incr("library.index_errors")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the background flush task."""
+        if self.store is not None and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task, write anything pending and close the store."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self.store is not None:
+            self.store.close()
+        if self.library is not None:
+            self.library.close()
+
+
+_sessions: SessionPersistence | None = None
+
+
+def get_sessions() -> SessionPersistence:
+    """Get or create the session persistence singleton."""
+    global _sessions
+    if _sessions is None:
+        _sessions = SessionPersistence(make_store(), make_library())
+    return _sessions
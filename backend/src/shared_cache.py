@@ -0,0 +1,180 @@
+"""
+Shared Cache Backends
+
+Key-value cache for results that are expensive to recompute and safe to share
+between requests: parsed recipes by document hash, substitution matches, and
+Gemini context cache names. Behind one interface so that with several server
+workers every worker sees the others' entries and hit rates don't drop by the
+number of workers.
+
+- local: in-process dict. Default; right for a single worker and tests.
+- sqlite: a SQLite file (WAL mode) shared by every worker on the host. Calls
+  run in a worker thread so lock waits never stall the event loop, and a
+  busy database only costs a cache miss.
+
+Other backends (e.g. Redis for multi-host) implement SharedCache.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from threading import Lock
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local").lower()
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "cache.db")
+# Entries older than this are ignored (and pruned by the sqlite backend)
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LOCAL_CACHE_MAX_ENTRIES = 10_000
+
+
+def cache_key(*parts: str) -> str:
+    """Build a fixed-length key from arbitrary text parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SharedCache(ABC):
+    """Namespaced key-value cache with per-entry expiry."""
+
+    # Backends doing I/O are called from a worker thread
+    blocking = False
+
+    async def get(self, namespace: str, key: str) -> str | None:
+        """Return a cached value, counting the hit or miss in /metrics."""
+        args = (f"{namespace}:{key}", time.time())
+        if self.blocking:
+            value = await asyncio.to_thread(self._get, *args)
+        else:
+            value = self._get(*args)
+        metrics.incr(f"cache.{namespace}.{'hits' if value is not None else 'misses'}")
+        return value
+
+    async def set(
+        self, namespace: str, key: str, value: str, ttl: float = CACHE_TTL_SECONDS
+    ) -> None:
+        """Store a value for ttl seconds."""
+        args = (f"{namespace}:{key}", value, time.time() + ttl)
+        if self.blocking:
+            await asyncio.to_thread(self._set, *args)
+        else:
+            self._set(*args)
+
+    @abstractmethod
+    def _get(self, key: str, now: float) -> str | None: ...
+
+    @abstractmethod
+    def _set(self, key: str, value: str, expires_at: float) -> None: ...
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+class LocalCache(SharedCache):
+    """Per-process cache; oldest entries are evicted past a size limit."""
+
+    def __init__(self, max_entries: int = LOCAL_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: dict[str, tuple[str, float]] = {}
+        self._lock = Lock()
+
+    def _get(self, key: str, now: float) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[1] <= now:
+            return None
+        return entry[0]
+
+    def _set(self, key: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, expires_at)
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+
+class SQLiteCache(SharedCache):
+    """Cache in a SQLite file shared by all workers on one host."""
+
+    blocking = True
+
+    def __init__(self, path: str = CACHE_DB_PATH) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._lock = Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "DELETE FROM cache WHERE expires_at <= ?", (time.time(),)
+            )
+
+    def _get(self, key: str, now: float) -> str | None:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value FROM cache WHERE key = ? AND expires_at > ?",
+                    (key, now),
+                ).fetchone()
+        except sqlite3.OperationalError as e:
+            # Treat a locked or unavailable database as a miss
+            logger.warning(f"Cache read skipped: {e}")
+            metrics.incr("cache.read_errors")
+            return None
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str, expires_at: float) -> None:
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at)"
+                    " VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+        except sqlite3.OperationalError as e:
+            # A busy database only costs a future cache miss
+            logger.warning(f"Cache write skipped: {e}")
+            metrics.incr("cache.write_errors")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def make_cache(kind: str = CACHE_BACKEND) -> SharedCache:
+    """Create the configured cache backend."""
+    match kind:
+        case "local":
+            return LocalCache()
+        case "sqlite":
+            return SQLiteCache()
+        case _:
+            raise ValueError(f"Unknown CACHE_BACKEND: {kind}")
+
+
+_cache: SharedCache | None = None
+
+
+def get_shared_cache() -> SharedCache:
+    """Get or create the shared cache singleton."""
+    global _cache
+    if _cache is None:
+        _cache = make_cache()
+    return _cache
@@ -0,0 +1,144 @@
+"""
+Shopping List Aggregation
+
+Merges the ingredients of several recipes (as scaled) into one shopping
+list, locally and in a single pass, with no model call:
+
+- Names are matched on ingredient_key ("Garlic cloves" and "garlic clove"
+  are the same item).
+- Quantities of the same item are added when their units are compatible:
+  the same unit is summed as is; mixed mass or volume units ("200 g" and
+  "1 lb") are converted to grams or millilitres first. Counted units
+  ("3 cloves", "1 bunch") only add up with the same unit.
+- Items are grouped by Ingredient.category, in grocery-aisle order.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+from .models import (
+    Ingredient,
+    Recipe,
+    ShoppingItem,
+    ShoppingList,
+    ShoppingSection,
+    ingredient_key,
+)
+from .units import Dimension, Unit, format_amount, to_base
+
+CATEGORY_ORDER = ["produce", "protein", "dairy", "pantry", "spice", "other"]
+
+
+class _Line:
+    """Running total for one item in one dimension (or counted unit)."""
+
+    def __init__(self, name: str, dimension: Dimension) -> None:
+        self.name = name
+        self.dimension = dimension
+        self.recipes: list[str] = []
+        self.measured = False
+        # Total in grams/millilitres, and in the unit given while all agree
+        self.base_quantity = 0.0
+        self.quantity = 0.0
+        self.unit: str | None = None
+        self.unit_name = ""
+        self.mixed = False
+
+    def add(self, ingredient: Ingredient, unit: Unit, base_quantity: float) -> None:
+        if not self.measured:
+            self.unit = ingredient.unit
+            self.unit_name = unit.name
+        elif unit.name != self.unit_name:
+            self.mixed = True
+        self.measured = True
+        self.base_quantity += base_quantity
+        self.quantity += ingredient.quantity
+
+    def item(self, category: str) -> ShoppingItem:
+        quantity: float | None = None
+        unit = self.unit
+        if self.measured and self.mixed and self.dimension != "count":
+            quantity, unit = format_amount(self.dimension, self.base_quantity)
+        elif self.measured:
+            quantity = round(self.quantity, 2)
+        return ShoppingItem(
+            name=self.name,
+            quantity=quantity,
+            unit=unit,
+            category=category,
+            recipes=self.recipes,
+        )
+
+
+def build_shopping_list(recipes: Iterable[Recipe]) -> ShoppingList:
+    """
+    Merge the ingredients of several recipes into a categorised shopping list.
+
+    Args:
+        recipes: Recipes to shop for, at the servings they are scaled to
+
+    Returns:
+        The merged list, with sections in CATEGORY_ORDER and items by name
+    """
+    titles: list[str] = []
+    lines: dict[tuple[str, str, str], _Line] = {}
+    # First specific category any recipe gives an item
+    categories: dict[str, str] = {}
+    for recipe in recipes:
+        titles.append(recipe.title)
+        for ing in recipe.ingredients:
+            key = ingredient_key(ing.name)
+            if ing.quantity is None:
+                unit, base_quantity = None, 0.0
+                slot = (key, "unmeasured", "")
+            else:
+                unit, base_quantity = to_base(ing.quantity, ing.unit)
+                counted = unit.name if unit.dimension == "count" else ""
+                slot = (key, unit.dimension, counted)
+
+            if categories.get(key, "other") == "other":
+                categories[key] = ing.category
+            line = lines.get(slot)
+            if line is None:
+                line = lines[slot] = _Line(
+                    name=ing.name,
+                    dimension=unit.dimension if unit else "count",
+                )
+            if unit is not None:
+                line.add(ing, unit, base_quantity)
+            if recipe.title not in line.recipes:
+                line.recipes.append(recipe.title)
+
+    # "Salt to taste" adds nothing once another recipe measures salt
+    measured = {key for key, kind, _ in lines if kind != "unmeasured"}
+    sections: dict[str, list[ShoppingItem]] = {}
+    for (key, kind, _), line in lines.items():
+        if kind == "unmeasured" and key in measured:
+            continue
+        sections.setdefault(categories[key], []).append(line.item(categories[key]))
+
+    return ShoppingList(
+        recipes=titles,
+        sections=[
+            ShoppingSection(
+                category=category,
+                items=sorted(sections[category], key=lambda item: item.name.lower()),
+            )
+            for category in CATEGORY_ORDER
+            if category in sections
+        ],
+    )
+
+
+def format_shopping_list(shopping_list: ShoppingList) -> str:
+    """Render a shopping list as plain text, one line per item."""
+    lines = [f"Shopping list for: {', '.join(shopping_list.recipes)}"]
+    for section in shopping_list.sections:
+        lines.append(f"\n{section.category.title()}:")
+        for item in section.items:
+            amount = ""
+            if item.quantity is not None:
+                amount = f"{item.quantity:g} {item.unit or ''}".strip() + " "
+            lines.append(f"- {amount}{item.name}")
+    return "\n".join(lines)
@@ -0,0 +1,139 @@
+"""
+Streaming Compression for SSE Responses
+
+The /copilotkit stream repeats the full RecipeContext in every STATE_SNAPSHOT
+and sends many small text deltas. This ASGI middleware gzips event-stream
+responses when the client accepts gzip, flushing the compressor after every
+chunk (Z_SYNC_FLUSH) so each event reaches the browser immediately instead of
+waiting in the compressor's buffer. Later snapshots compress very well against
+earlier ones because the deflate window is kept for the whole stream.
+
+Opt-in with SSE_COMPRESSION=true. The decision is made from the headers
+alone (an event-stream response to a client that accepts gzip), so the
+response start and every event go out as soon as the app produces them;
+nothing is held back to see how large the stream will be. Only gzip is
+offered; brotli is not a dependency and gzip already removes most of the
+repeated snapshot bytes.
+
+Raw vs. sent bytes and the time spent compressing each flush are recorded in
+/metrics (sse.*) and logged per stream.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SSE_COMPRESSION_ENABLED = os.getenv("SSE_COMPRESSION", "false").lower() == "true"
+SSE_COMPRESSION_LEVEL = int(os.getenv("SSE_COMPRESSION_LEVEL", "6"))
+
+
+def accepts_gzip(headers: Headers) -> bool:
+    """Return True if the Accept-Encoding header allows gzip."""
+    for coding in headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+class SSECompressionMiddleware:
+    """Gzip text/event-stream responses with a flush per chunk."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        enabled: bool = SSE_COMPRESSION_ENABLED,
+        level: int = SSE_COMPRESSION_LEVEL,
+    ) -> None:
+        self.app = app
+        self.enabled = enabled
+        self.level = level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        if not accepts_gzip(Headers(scope=scope)):
+            await self.app(scope, receive, send)
+            return
+
+        stream = _GzipStream(send, self.level)
+        await self.app(scope, receive, stream.send)
+
+
+class _GzipStream:
+    """Wraps send() for one response, compressing it if it is an SSE stream."""
+
+    def __init__(self, send: Send, level: int) -> None:
+        self._send = send
+        self._level = level
+        self._compressor: zlib._Compress | None = None
+        self._raw = 0
+        self._sent = 0
+        self._flushes = 0
+        self._compress_seconds = 0.0
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            if (
+                headers.get("content-type", "").startswith("text/event-stream")
+                and "content-encoding" not in headers
+            ):
+                headers["Content-Encoding"] = "gzip"
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["content-length"]
+                self._compressor = zlib.compressobj(
+                    self._level, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+                )
+            await self._send(message)
+            return
+
+        if message["type"] != "http.response.body" or self._compressor is None:
+            await self._send(message)
+            return
+
+        await self._send_compressed(
+            message.get("body", b""), message.get("more_body", False)
+        )
+
+    async def _send_compressed(self, body: bytes, more_body: bool) -> None:
+        started = time.perf_counter()
+        compressed = self._compressor.compress(body) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH
+        )
+        self._compress_seconds += time.perf_counter() - started
+        self._raw += len(body)
+        self._sent += len(compressed)
+        self._flushes += 1
+
+        await self._send(
+            {"type": "http.response.body", "body": compressed, "more_body": more_body}
+        )
+        if not more_body:
+            self._record()
+
+    def _record(self) -> None:
+        metrics.incr("sse.streams")
+        metrics.incr("sse.bytes_raw", self._raw)
+        metrics.incr("sse.bytes_sent", self._sent)
+        metrics.incr("sse.flushes", self._flushes)
+        metrics.incr("sse.compress_ms", self._compress_seconds * 1000)
+        ratio = self._sent / self._raw if self._raw else 1.0
+        logger.info(
+            f"SSE stream: {self._raw} -> {self._sent} bytes ({ratio:.0%}), "
+            f"{self._flushes} flushes, "
+            f"{self._compress_seconds * 1e6 / max(self._flushes, 1):.0f} us/flush"
+        )
@@ -0,0 +1,368 @@
+"""
+Server-side Cooking Timers
+
+Timers for each thread, run by the server so they keep counting while the
+chat is idle or the tab is closed.
+
+- State: a thread's timers live in RecipeContext.timers, so they are saved
+  with the session and reach the frontend in state snapshots. Every change
+  replaces the timer with a new version stamped with updated_at; when the
+  wheel and an incoming state disagree about a timer, the later version wins
+  (TimerWheel.sync).
+- Wheel: running timers are filed by due time in TIMER_TICK_SECONDS slots
+  of a single timing wheel, driven by one asyncio task. Starting, pausing or
+  cancelling is O(1) (stale slot entries are skipped when they come due) and
+  each tick only looks at the slots that came due, however many timers run.
+- Events: a fired timer is pushed to the thread's subscribers on
+  GET /timers/{thread_id}/events as an AG-UI CUSTOM event named
+  "timer_fired", and the thread's session is saved.
+- Restarts: a worker re-arms a thread's timers from the session store the
+  next time the thread is loaded; timers that came due while it was down
+  fire straight away.
+- Pruning: timers that fired or were cancelled more than
+  TIMER_KEEP_FINISHED_SECONDS ago are dropped whenever a thread is synced
+  (before every save, and when one of its timers fires), so a thread's list
+  doesn't grow for ever. Running timers that came due that long ago are
+  dropped too rather than fired, so a stale state can't bring back a timer
+  that was already pruned.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import time
+import uuid
+from collections.abc import AsyncIterator
+
+from ag_ui.core import BaseEvent, CustomEvent, EventType
+
+from .commands import NO_RECIPE_MESSAGE, CommandError
+from .metrics import metrics
+from .models import RecipeContext, RecipeStep, Timer, normalize_name
+from .serialization import encode_sse
+from .sessions import get_sessions
+
+logger = logging.getLogger(__name__)
+
+TIMER_TICK_SECONDS = float(os.getenv("TIMER_TICK_SECONDS", "1"))
+# Threads whose timers are remembered; idle ones beyond this are forgotten
+TIMER_MAX_THREADS = int(os.getenv("TIMER_MAX_THREADS", "10000"))
+# Seconds a fired or cancelled timer stays in the thread's state
+TIMER_KEEP_FINISHED_SECONDS = float(os.getenv("TIMER_KEEP_FINISHED_SECONDS", "3600"))
+# Seconds between SSE comments that keep idle event streams open
+TIMER_KEEPALIVE_SECONDS = 15.0
+
+TIMER_FIRED_EVENT = "timer_fired"
+
+
+# =============================================================================
+# State Operations
+# =============================================================================
+
+
+def _step_to_time(state: RecipeContext, step_number: int | None) -> RecipeStep | None:
+    if state.recipe is None:
+        if step_number is not None:
+            raise CommandError(NO_RECIPE_MESSAGE)
+        return None
+    if step_number is None:
+        if 0 <= state.current_step < len(state.recipe.steps):
+            return state.recipe.steps[state.current_step]
+        return None
+    step = state.recipe.step(step_number)
+    if step is None:
+        raise CommandError(f"Step {step_number} does not exist.")
+    return step
+
+
+def find_timer(state: RecipeContext, key: str) -> Timer:
+    """Return a thread's timer by id or label, preferring unfinished ones."""
+    matches = [
+        timer
+        for timer in state.timers
+        if timer.id == key or normalize_name(timer.label) == normalize_name(key)
+    ]
+    active = [timer for timer in matches if timer.status in ("running", "paused")]
+    if not matches:
+        raise CommandError(f"There is no timer called '{key}'.")
+    return (active or matches)[-1]
+
+
+def _replace(state: RecipeContext, timer: Timer, **update: object) -> Timer:
+    updated = timer.model_copy(update={**update, "updated_at": time.time()})
+    state.timers = [updated if t.id == timer.id else t for t in state.timers]
+    return updated
+
+
+def _finished_before(timer: Timer, cutoff: float) -> bool:
+    if timer.status == "running":
+        return timer.ends_at < cutoff
+    return timer.status != "paused" and timer.updated_at < cutoff
+
+
+def _minutes(seconds: float) -> str:
+    minutes = math.ceil(seconds / 60)
+    return f"{minutes} minute{'s' if minutes != 1 else ''}"
+
+
+def start_timer_in_state(
+    state: RecipeContext,
+    step_number: int | None = None,
+    duration_seconds: int | None = None,
+    label: str | None = None,
+) -> str:
+    """
+    Start a timer in place, or resume the paused one with the same label.
+
+    The duration and label default to those of the step (the current step
+    when step_number is not given). Returns a confirmation message.
+    """
+    step = _step_to_time(state, step_number)
+    if label is None and step is not None:
+        label = step.timer_label or f"Step {step.step_number}"
+    label = label or "Timer"
+
+    paused = [
+        timer
+        for timer in state.timers
+        if timer.status == "paused"
+        and normalize_name(timer.label) == normalize_name(label)
+    ]
+    if paused and duration_seconds is None:
+        return resume_timer_in_state(state, paused[-1].id)
+
+    if duration_seconds is None and step is not None and step.duration_minutes:
+        duration_seconds = step.duration_minutes * 60
+    if not duration_seconds or duration_seconds <= 0:
+        raise CommandError("How long should the timer run for?")
+
+    now = time.time()
+    state.timers.append(
+        Timer(
+            id=str(uuid.uuid4()),
+            label=label,
+            step_number=step.step_number if step is not None else None,
+            duration_seconds=duration_seconds,
+            ends_at=now + duration_seconds,
+            remaining_seconds=duration_seconds,
+            updated_at=now,
+        )
+    )
+    metrics.incr("timers.started")
+    logger.info(f"Started timer '{label}' for {duration_seconds}s")
+    return f"Timer '{label}' set for {_minutes(duration_seconds)}."
+
+
+def pause_timer_in_state(state: RecipeContext, key: str) -> str:
+    """Pause a running timer in place. Returns a confirmation message."""
+    timer = find_timer(state, key)
+    if timer.status != "running":
+        raise CommandError(f"Timer '{timer.label}' is not running.")
+    remaining = max(timer.ends_at - time.time(), 0.0)
+    _replace(state, timer, status="paused", ends_at=None, remaining_seconds=remaining)
+    return f"Paused '{timer.label}' with {_minutes(remaining)} left."
+
+
+def resume_timer_in_state(state: RecipeContext, key: str) -> str:
+    """Restart a paused timer in place. Returns a confirmation message."""
+    timer = find_timer(state, key)
+    if timer.status != "paused":
+        raise CommandError(f"Timer '{timer.label}' is not paused.")
+    ends_at = time.time() + timer.remaining_seconds
+    _replace(state, timer, status="running", ends_at=ends_at)
+    return f"Resumed '{timer.label}', {_minutes(timer.remaining_seconds)} to go."
+
+
+def cancel_timer_in_state(state: RecipeContext, key: str) -> str:
+    """Cancel a timer in place. Returns a confirmation message."""
+    timer = find_timer(state, key)
+    if timer.status == "cancelled":
+        raise CommandError(f"Timer '{timer.label}' is already cancelled.")
+    _replace(state, timer, status="cancelled", ends_at=None)
+    metrics.incr("timers.cancelled")
+    return f"Cancelled '{timer.label}'."
+
+
+# =============================================================================
+# Timer Wheel
+# =============================================================================
+
+
+class TimerWheel:
+    """Fires the running timers of every thread from one asyncio task."""
+
+    def __init__(
+        self,
+        tick: float = TIMER_TICK_SECONDS,
+        max_threads: int = TIMER_MAX_THREADS,
+    ) -> None:
+        self.tick = tick
+        self.max_threads = max_threads
+        # Latest version of each timer, by thread; least recently used first
+        self._threads: dict[str, dict[str, Timer]] = {}
+        # Slot number -> (thread id, timer id) due in that slot
+        self._slots: dict[int, set[tuple[str, str]]] = {}
+        self._cursor = math.floor(time.time() / tick)
+        self._subscribers: dict[str, set[asyncio.Queue[BaseEvent]]] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    def sync(self, thread_id: str, state: RecipeContext) -> None:
+        """
+        Merge a thread's state with the timers the wheel knows, in place.
+
+        Newer timers in the state are armed (or disarmed); timers the wheel
+        has a newer version of, such as ones that fired, are written back.
+        Timers finished before TIMER_KEEP_FINISHED_SECONDS ago are dropped.
+        """
+        if not thread_id:
+            return
+        cutoff = time.time() - TIMER_KEEP_FINISHED_SECONDS
+        known = self._threads.pop(thread_id, {})
+        self._threads[thread_id] = known
+        for timer_id in [
+            timer_id
+            for timer_id, timer in known.items()
+            if _finished_before(timer, cutoff)
+        ]:
+            del known[timer_id]
+        for timer in state.timers:
+            if _finished_before(timer, cutoff):
+                continue
+            current = known.get(timer.id)
+            if current is None or timer.updated_at > current.updated_at:
+                known[timer.id] = timer
+                if timer.status == "running":
+                    self._arm(thread_id, timer)
+        state.timers = list(known.values())
+        self._evict()
+
+    def _arm(self, thread_id: str, timer: Timer) -> None:
+        slot = max(math.ceil(timer.ends_at / self.tick), self._cursor)
+        self._slots.setdefault(slot, set()).add((thread_id, timer.id))
+
+    def _evict(self) -> None:
+        excess = len(self._threads) - self.max_threads
+        if excess <= 0:
+            return
+        idle = [
+            thread_id
+            for thread_id, timers in self._threads.items()
+            if all(timer.status != "running" for timer in timers.values())
+        ]
+        for thread_id in idle[:excess]:
+            del self._threads[thread_id]
+
+    async def advance(self, now: float | None = None) -> list[Timer]:
+        """Fire every timer due by now. Returns the timers fired."""
+        now = time.time() if now is None else now
+        last = math.floor(now / self.tick)
+        if last - self._cursor > len(self._slots):
+            # Long gap (tests, a stalled loop): visit only the filled slots
+            due = sorted(slot for slot in self._slots if slot <= last)
+        else:
+            due = range(self._cursor, last + 1)
+        self._cursor = max(self._cursor, last + 1)
+
+        fired: list[Timer] = []
+        threads: set[str] = set()
+        for slot in due:
+            for thread_id, timer_id in self._slots.pop(slot, ()):
+                timer = self._threads.get(thread_id, {}).get(timer_id)
+                # Paused, cancelled or rescheduled since it was filed here
+                if timer is None or timer.status != "running" or timer.ends_at > now:
+                    continue
+                timer = timer.model_copy(
+                    update={
+                        "status": "fired",
+                        "ends_at": None,
+                        "remaining_seconds": 0.0,
+                        "updated_at": now,
+                    }
+                )
+                self._threads[thread_id][timer_id] = timer
+                self._publish(thread_id, timer)
+                fired.append(timer)
+                threads.add(thread_id)
+
+        if fired:
+            metrics.incr("timers.fired", len(fired))
+            logger.info(f"Fired {len(fired)} timers in {len(threads)} threads")
+        for thread_id in threads:
+            await self._persist(thread_id)
+        return fired
+
+    async def _persist(self, thread_id: str) -> None:
+        sessions = get_sessions()
+        state = await sessions.load(thread_id)
+        if state is not None:
+            self.sync(thread_id, state)
+            sessions.save(thread_id, state)
+
+    # =========================================================================
+    # Events
+    # =========================================================================
+
+    def _publish(self, thread_id: str, timer: Timer) -> None:
+        event = CustomEvent(
+            type=EventType.CUSTOM,
+            name=TIMER_FIRED_EVENT,
+            value=timer.model_dump(mode="json"),
+        )
+        for queue in self._subscribers.get(thread_id, ()):
+            queue.put_nowait(event)
+
+    async def events(self, thread_id: str) -> AsyncIterator[str]:
+        """SSE frames for a thread's fired timers, until the client leaves."""
+        queue: asyncio.Queue[BaseEvent] = asyncio.Queue()
+        self._subscribers.setdefault(thread_id, set()).add(queue)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), TIMER_KEEPALIVE_SECONDS)
+                except TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield encode_sse(event)
+        finally:
+            subscribers = self._subscribers[thread_id]
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[thread_id]
+
+    # =========================================================================
+    # Lifecycle
+    # =========================================================================
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick)
+            await self.advance()
+
+    def start(self) -> None:
+        """Start the task that fires timers."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop firing timers; running ones are re-armed on the next load."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_timers: TimerWheel | None = None
+
+
+def get_timers() -> TimerWheel:
+    """Get or create the timer wheel singleton."""
+    global _timers
+    if _timers is None:
+        _timers = TimerWheel()
+    return _timers
@@ -0,0 +1,279 @@
+"""
+Step Timing and Meal-Plan Scheduling
+
+Local, LLM-free timing built on RecipeStep.duration_minutes and
+requires_attention.
+
+A step is passive when it runs by itself once started (simmering, baking,
+resting) and doesn't need constant attention; everything else is hands-on
+and keeps the cook busy for its whole duration. Steps without a duration
+count as DEFAULT_STEP_MINUTES.
+
+Within one recipe, the hands-on steps after a passive step go ahead while it
+runs. The passive step has to finish before the first later step that uses
+one of its ingredients (or the final step), and before the next passive step.
+The longest chain through those dependencies is the recipe's critical-path
+time, which is usually shorter than the sum of the steps and more reliable
+than the stated prep and cook times.
+
+The scheduler cooks several recipes with one cook. Each recipe's steps run
+in order; hands-on steps never overlap each other, while passive steps
+overlap with anything. Whenever the cook is free it takes the ready
+hands-on step whose recipe has the most time left (list scheduling on the
+critical path), which keeps long simmers and bakes from ending up last.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Sequence
+
+from .models import (
+    MealPlan,
+    Recipe,
+    RecipeContext,
+    RecipeStep,
+    RecipeTiming,
+    ScheduledStep,
+    TimerSuggestion,
+)
+
+DEFAULT_STEP_MINUTES = 5
+TIMING_CACHE_SIZE = 256
+
+_PASSIVE_RE = re.compile(
+    r"\b(?:roast|simmer|boil|stew|rest|chill|soak|proof|cool|steep|steam|poach|"
+    r"slow[- ]cook|pressure[- ]cook)(?:s|ed|ing)?\b"
+    r"|\b(?:bak|brais|refrigerat|freez|marinat|ris|prov|leav)(?:e|es|ed|ing)\b"
+    r"|\bset aside\b",
+    re.IGNORECASE,
+)
+
+
+def step_minutes(step: RecipeStep) -> int:
+    """Duration of a step, defaulting to DEFAULT_STEP_MINUTES."""
+    return step.duration_minutes or DEFAULT_STEP_MINUTES
+
+
+def is_passive(step: RecipeStep) -> bool:
+    """Whether a step runs unattended once started."""
+    return not step.requires_attention and bool(_PASSIVE_RE.search(step.instruction))
+
+
+# =============================================================================
+# Critical Path (one recipe)
+# =============================================================================
+
+
+def critical_path_minutes(recipe: Recipe, first: int = 0) -> int:
+    """
+    Time to cook a recipe from step index first on, overlapping passive steps.
+
+    Steps before first count as done.
+    """
+    steps = recipe.steps
+    uses = recipe.index.step_ingredients
+    finish: dict[int, int] = {}
+    # Earliest start of each step, before passive steps it waits for
+    ready: dict[int, int] = {}
+    running: list[int] = []  # passive steps not yet waited for
+    for i in range(first, len(steps)):
+        if i == first:
+            start = 0
+        elif is_passive(steps[i - 1]) and not is_passive(steps[i]):
+            # Hands-on work carries on while the previous step cooks
+            start = ready[i - 1]
+        else:
+            start = finish[i - 1]
+            if i - 1 in running:
+                running.remove(i - 1)
+
+        last = i == len(steps) - 1
+        for p in list(running):
+            if last or is_passive(steps[i]) or set(uses[p]) & set(uses[i]):
+                start = max(start, finish[p])
+                running.remove(p)
+
+        ready[i] = start
+        finish[i] = start + step_minutes(steps[i])
+        if is_passive(steps[i]):
+            running.append(i)
+    return max(finish.values(), default=0)
+
+
+def next_timer(recipe: Recipe, first: int = 0) -> TimerSuggestion | None:
+    """The first timed step from step index first on, as a timer to start."""
+    for step in recipe.steps[max(first, 0) :]:
+        if step.duration_minutes and (step.timer_label or is_passive(step)):
+            return TimerSuggestion(
+                duration_seconds=step.duration_minutes * 60,
+                label=step.timer_label or f"Step {step.step_number}",
+                step_number=step.step_number,
+            )
+    return None
+
+
+_timing_cache: dict[tuple, RecipeTiming] = {}
+
+
+def _timing_key(recipe: Recipe, current_step: int) -> tuple:
+    # Everything the analysis reads, so equal recipes share an entry
+    return (
+        current_step,
+        recipe.prep_time_minutes,
+        recipe.cook_time_minutes,
+        tuple(ing.name for ing in recipe.ingredients),
+        tuple(
+            (
+                step.step_number,
+                step.instruction,
+                step.duration_minutes,
+                step.timer_label,
+                step.requires_attention,
+            )
+            for step in recipe.steps
+        ),
+    )
+
+
+def recipe_timing(recipe: Recipe, current_step: int = 0) -> RecipeTiming:
+    """Critical-path timing of a recipe at a step, memoized per recipe version."""
+    key = _timing_key(recipe, current_step)
+    if key not in _timing_cache:
+        if len(_timing_cache) >= TIMING_CACHE_SIZE:
+            _timing_cache.pop(next(iter(_timing_cache)))
+        stated = None
+        if recipe.prep_time_minutes is not None or recipe.cook_time_minutes:
+            stated = (recipe.prep_time_minutes or 0) + (recipe.cook_time_minutes or 0)
+        _timing_cache[key] = RecipeTiming(
+            total_minutes=critical_path_minutes(recipe),
+            remaining_minutes=critical_path_minutes(recipe, max(current_step, 0)),
+            stated_minutes=stated,
+            next_timer=next_timer(recipe, current_step),
+        )
+    return _timing_cache[key]
+
+
+def refresh_timing(state: RecipeContext) -> None:
+    """Update state.timing after the recipe or the current step changed."""
+    state.timing = (
+        recipe_timing(state.recipe, state.current_step) if state.recipe else None
+    )
+
+
+def format_timing(timing: RecipeTiming) -> str:
+    """One line of timing for the chat prompt."""
+    line = (
+        f"Time left: about {timing.remaining_minutes} min "
+        f"(whole recipe about {timing.total_minutes} min"
+    )
+    if timing.stated_minutes is not None:
+        line += f", recipe states {timing.stated_minutes} min"
+    line += ")"
+    if timing.next_timer is not None:
+        minutes = timing.next_timer.duration_seconds // 60
+        line += (
+            f". Next timer: {timing.next_timer.label}, {minutes} min "
+            f"(step {timing.next_timer.step_number})"
+        )
+    return line
+
+
+# =============================================================================
+# Meal-Plan Scheduling
+# =============================================================================
+
+
+def schedule_recipes(recipes: Sequence[Recipe]) -> MealPlan:
+    """
+    Interleave the steps of several recipes into one timeline for one cook.
+
+    Args:
+        recipes: Recipes to cook together; each one's steps stay in order
+
+    Returns:
+        Every step with its start and end minute, ordered by start
+    """
+    # Time left in each recipe from each step on: the priority for the cook
+    tails = []
+    for recipe in recipes:
+        tail = [0] * (len(recipe.steps) + 1)
+        for i in range(len(recipe.steps) - 1, -1, -1):
+            tail[i] = tail[i + 1] + step_minutes(recipe.steps[i])
+        tails.append(tail)
+
+    next_step = [0] * len(recipes)
+    ready_at = [0] * len(recipes)
+    cook_free_at = 0
+    now = 0
+    scheduled: list[ScheduledStep] = []
+
+    def start(r: int, at: int) -> int:
+        recipe = recipes[r]
+        step = recipe.steps[next_step[r]]
+        end = at + step_minutes(step)
+        scheduled.append(
+            ScheduledStep(
+                recipe=recipe.title,
+                step_number=step.step_number,
+                instruction=step.instruction,
+                start_minute=at,
+                end_minute=end,
+                hands_on=not is_passive(step),
+            )
+        )
+        next_step[r] += 1
+        ready_at[r] = end
+        return end
+
+    remaining = {r for r, recipe in enumerate(recipes) if recipe.steps}
+    while remaining:
+        # Passive steps start as soon as they are ready; they need no cook
+        for r in sorted(remaining):
+            while (
+                next_step[r] < len(recipes[r].steps)
+                and ready_at[r] <= now
+                and is_passive(recipes[r].steps[next_step[r]])
+            ):
+                start(r, now)
+            if next_step[r] == len(recipes[r].steps):
+                remaining.discard(r)
+
+        ready = [r for r in remaining if ready_at[r] <= now]
+        if ready and cook_free_at <= now:
+            r = max(ready, key=lambda r: (tails[r][next_step[r]], -r))
+            cook_free_at = start(r, now)
+            if next_step[r] == len(recipes[r].steps):
+                remaining.discard(r)
+            continue
+
+        events = [ready_at[r] for r in remaining if ready_at[r] > now]
+        if cook_free_at > now:
+            events.append(cook_free_at)
+        if not events:
+            break
+        now = min(events)
+
+    scheduled.sort(key=lambda s: (s.start_minute, s.end_minute))
+    return MealPlan(
+        recipes=[recipe.title for recipe in recipes],
+        total_minutes=max((s.end_minute for s in scheduled), default=0),
+        sequential_minutes=sum(tail[0] for tail in tails),
+        steps=scheduled,
+    )
+
+
+def format_meal_plan(plan: MealPlan) -> str:
+    """Render a meal plan as a plain-text timeline."""
+    summary = (
+        f"Cooking {', '.join(plan.recipes)} together takes about "
+        f"{plan.total_minutes} min ({plan.sequential_minutes} min one after another)."
+    )
+    lines = [summary]
+    for step in plan.steps:
+        kind = "" if step.hands_on else " (hands-off)"
+        lines.append(
+            f"{step.start_minute:>3}-{step.end_minute} min  {step.recipe}, "
+            f"step {step.step_number}{kind}: {step.instruction}"
+        )
+    return "\n".join(lines)
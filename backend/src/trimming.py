@@ -0,0 +1,183 @@
+"""
+Recipe Text Trimming
+
+Cuts an extracted document down to the parts worth sending to the recipe
+parser. Blog exports and long PDFs carry per-page headers and footers, ads,
+life stories and reader comments around a recipe that is often a small
+fraction of the text.
+
+- Boilerplate: short lines repeated on several pages (site name, "Page 3 of
+  9", copyright) are dropped.
+- Ranking: the remaining text is split into blocks, and each block is scored
+  on how much it looks like a recipe (quantities, cooking verbs, headings)
+  versus page chrome (comments, sharing, ads).
+- Budget: when the text is over PARSE_TOKEN_BUDGET, the densest blocks are
+  kept, along with the short title lines just above them, and put back in
+  document order.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from collections import Counter
+
+from .history import CHARS_PER_TOKEN
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PARSE_TOKEN_BUDGET = int(os.getenv("PARSE_TOKEN_BUDGET", "3000"))
+
+# A short line seen this many times is page furniture
+BOILERPLATE_MIN_REPEATS = 3
+BOILERPLATE_MAX_CHARS = 100
+# Blocks are paragraphs, cut to at most this many lines
+BLOCK_MAX_LINES = 12
+# A block this short right above a kept block is kept as its title
+TITLE_MAX_LINES = 3
+
+_DIGITS_RE = re.compile(r"\d+")
+# "2 cups flour", "- 1/2 tsp salt", "½ lemon"
+_QUANTITY_LINE_RE = re.compile(
+    r"^\s*(?:[-•*]\s*)?(?:\d+(?:[./]\d+)?|[½¼¾⅓⅔⅛])\s*[a-z]", re.IGNORECASE
+)
+_HEADING_RE = re.compile(
+    r"^\s*(?:ingredients?|method|directions|instructions|steps|serves|servings|"
+    r"yield|makes|prep(?:aration)? time|cook(?:ing)? time|total time)\b",
+    re.IGNORECASE,
+)
+_VERB_RE = re.compile(
+    r"\b(?:add|bake|beat|blend|boil|chop|combine|cook|dice|drain|fold|fry|grate|"
+    r"heat|knead|mix|pour|preheat|reduce|roast|saut[eé]|season|serve|simmer|"
+    r"slice|stir|toss|whisk)\b",
+    re.IGNORECASE,
+)
+_CHROME_RE = re.compile(
+    r"\b(?:advertisement|sponsored|subscribe|newsletter|comments?|reply|"
+    r"rated|share|pin it|privacy|cookies|copyright|all rights reserved|"
+    r"jump to recipe|print recipe|affiliate)\b",
+    re.IGNORECASE,
+)
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Estimate the token count of a piece of text."""
+    return len(text) // CHARS_PER_TOKEN
+
+
+# =============================================================================
+# Boilerplate
+# =============================================================================
+
+
+def _line_key(line: str) -> str:
+    # Page numbers differ from page to page; the rest of a footer does not
+    return _DIGITS_RE.sub("#", " ".join(line.lower().split()))
+
+
+def strip_boilerplate(text: str) -> str:
+    """Drop short non-ingredient lines that repeat across the document."""
+    lines = text.splitlines()
+    counts = Counter(
+        _line_key(line)
+        for line in lines
+        if line.strip() and len(line) <= BOILERPLATE_MAX_CHARS
+    )
+    repeated = {
+        key for key, count in counts.items() if count >= BOILERPLATE_MIN_REPEATS
+    }
+    if not repeated:
+        return text
+    return "\n".join(
+        line
+        for line in lines
+        if _line_key(line) not in repeated or _QUANTITY_LINE_RE.match(line)
+    )
+
+
+# =============================================================================
+# Ranking
+# =============================================================================
+
+
+def split_blocks(text: str) -> list[str]:
+    """Split text into paragraphs of at most BLOCK_MAX_LINES lines."""
+    blocks: list[str] = []
+    current: list[str] = []
+    for line in text.splitlines():
+        if line.strip():
+            current.append(line)
+            if len(current) < BLOCK_MAX_LINES:
+                continue
+        if current:
+            blocks.append("\n".join(current))
+            current = []
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def score_block(block: str) -> float:
+    """Recipe-likeness of a block per estimated token (higher is more recipe)."""
+    score = 0.0
+    for line in block.splitlines():
+        if _QUANTITY_LINE_RE.match(line):
+            score += 3
+        if _HEADING_RE.match(line):
+            score += 5
+        score += len(_VERB_RE.findall(line))
+        score -= 4 * len(_CHROME_RE.findall(line))
+    return score / max(estimate_text_tokens(block), 1)
+
+
+# =============================================================================
+# Trimming
+# =============================================================================
+
+
+def trim_recipe_text(text: str, budget: int = PARSE_TOKEN_BUDGET) -> str:
+    """
+    Return the parts of a document worth sending to the recipe parser.
+
+    Repeated page boilerplate is always removed. Text still over budget is
+    cut to its most recipe-like blocks.
+    """
+    before = estimate_text_tokens(text)
+    trimmed = strip_boilerplate(text)
+    if estimate_text_tokens(trimmed) > budget:
+        # Nothing recipe-like fits: better the whole text than none of it
+        trimmed = _select_blocks(split_blocks(trimmed), budget) or trimmed
+
+    after = estimate_text_tokens(trimmed)
+    metrics.incr("parse.tokens_before", before)
+    metrics.incr("parse.tokens_after", after)
+    metrics.incr("parse.tokens_saved", before - after)
+    logger.info(f"Parse input trimmed from ~{before} to ~{after} tokens")
+    return trimmed
+
+
+def _select_blocks(blocks: list[str], budget: int) -> str:
+    scores = [score_block(block) for block in blocks]
+    keep: set[int] = set()
+    used = 0
+    for i in sorted(range(len(blocks)), key=lambda i: scores[i], reverse=True):
+        if scores[i] <= 0:
+            break
+        cost = estimate_text_tokens(blocks[i])
+        if used + cost > budget:
+            continue
+        keep.add(i)
+        used += cost
+        # The recipe title usually sits in a short block of its own above
+        title = i - 1
+        if (
+            title >= 0
+            and title not in keep
+            and blocks[title].count("\n") < TITLE_MAX_LINES
+            and used + estimate_text_tokens(blocks[title]) <= budget
+        ):
+            keep.add(title)
+            used += estimate_text_tokens(blocks[title])
+    return "\n\n".join(blocks[i] for i in sorted(keep))
@@ -0,0 +1,90 @@
+"""
+Units of Measurement
+
+Maps the free-form units the recipe parser produces ("tbsp", "Tablespoons",
+"kg") onto a dimension and a factor to its base unit (grams or millilitres),
+so amounts from different recipes can be added up. Anything else ("cloves",
+"bunch", no unit at all) is a count of that unit.
+"""
+
+from __future__ import annotations
+
+from typing import Literal, NamedTuple
+
+Dimension = Literal["mass", "volume", "count"]
+
+_MASS = {
+    "g": 1.0,
+    "gram": 1.0,
+    "kg": 1000.0,
+    "kilogram": 1000.0,
+    "oz": 28.35,
+    "ounce": 28.35,
+    "lb": 453.6,
+    "pound": 453.6,
+}
+_VOLUME = {
+    "ml": 1.0,
+    "millilitre": 1.0,
+    "milliliter": 1.0,
+    "cl": 10.0,
+    "dl": 100.0,
+    "l": 1000.0,
+    "litre": 1000.0,
+    "liter": 1000.0,
+    "tsp": 4.93,
+    "teaspoon": 4.93,
+    "tbsp": 14.79,
+    "tablespoon": 14.79,
+    "cup": 240.0,
+    "fl oz": 29.57,
+    "fluid ounce": 29.57,
+    "pint": 473.2,
+    "quart": 946.4,
+}
+_ALIASES = {"lbs": "lb", "tbs": "tbsp", "tbl": "tbsp"}
+
+
+class Unit(NamedTuple):
+    """A unit's dimension, its size in the base unit and its canonical name."""
+
+    dimension: Dimension
+    factor: float
+    name: str
+
+
+def parse_unit(unit: str | None) -> Unit:
+    """Resolve a recipe unit; unknown units are counted as themselves."""
+    name = " ".join((unit or "").lower().replace(".", "").split())
+    name = _ALIASES.get(name, name)
+    for candidate in (name, name.removesuffix("s")):
+        if candidate in _MASS:
+            return Unit("mass", _MASS[candidate], candidate)
+        if candidate in _VOLUME:
+            return Unit("volume", _VOLUME[candidate], candidate)
+    if name.endswith("es") and name[:-2].endswith(("ch", "sh")):
+        name = name[:-2]
+    elif name.endswith("s") and not name.endswith("ss"):
+        name = name[:-1]
+    return Unit("count", 1.0, name)
+
+
+def to_base(quantity: float, unit: str | None) -> tuple[Unit, float]:
+    """Return the unit and the quantity in its base unit (g, ml or a count)."""
+    parsed = parse_unit(unit)
+    return parsed, quantity * parsed.factor
+
+
+def _round(quantity: float) -> float:
+    return round(quantity) if quantity >= 10 else round(quantity, 1)
+
+
+def format_amount(dimension: Dimension, base_quantity: float) -> tuple[float, str]:
+    """Express a base quantity of mass or volume in g/kg or ml/l."""
+    if dimension == "mass":
+        if base_quantity >= 1000:
+            return round(base_quantity / 1000, 2), "kg"
+        return _round(base_quantity), "g"
+    if base_quantity >= 1000:
+        return round(base_quantity / 1000, 2), "l"
+    return _round(base_quantity), "ml"
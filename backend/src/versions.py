@@ -0,0 +1,208 @@
+"""
+Recipe Versions
+
+Undo/redo history for a thread's recipe, kept in RecipeContext.history so it
+is saved with the session like the rest of the state.
+
+- Versions: the recipe as parsed is stored once (without its source text).
+  Each version records only what differs from it: the ingredients and steps
+  replaced so far, by position, and the servings it is scaled to. A new
+  version copies its parent's small change maps and shares everything else,
+  so keeping many versions is cheap.
+- Scaling: a version's recipe is always the original scaled to its servings,
+  with replaced ingredients stored at the original servings and scaled the
+  same way, so repeated scaling never compounds rounding.
+- Undo/redo: moving between versions only changes history.position. Each
+  version builds its recipe once and keeps it, so going back and forth is
+  O(1). Recording a change after an undo drops the versions that were undone.
+
+The original's servings, ingredient count and step count never change in
+this codebase (substitutions and step rewrites are one-for-one), which is
+what makes positions a stable key.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+
+from .models import Ingredient, Recipe, RecipeContext, RecipeHistory, RecipeVersion
+from .nutrition import refresh_nutrition
+from .timing import refresh_timing
+
+logger = logging.getLogger(__name__)
+
+# Versions kept per thread; the oldest are dropped beyond this
+RECIPE_MAX_VERSIONS = int(os.getenv("RECIPE_MAX_VERSIONS", "50"))
+
+ORIGINAL_LABEL = "Original recipe"
+
+
+def _rescaled(ing: Ingredient, factor: float, digits: int | None = None) -> Ingredient:
+    if ing.quantity is None or factor == 1:
+        return ing
+    quantity = ing.quantity * factor
+    if digits is not None:
+        quantity = round(quantity, digits)
+    return ing.model_copy(update={"quantity": quantity})
+
+
+def start_history(state: RecipeContext) -> RecipeHistory | None:
+    """Start a thread's history at its current recipe, dropping any other."""
+    if state.recipe is None:
+        state.history = None
+        return None
+    recipe = state.recipe
+    original = recipe.model_copy(update={"source_text": None})
+    version = RecipeVersion(label=ORIGINAL_LABEL, servings=recipe.servings)
+    version._recipe = recipe
+    state.history = RecipeHistory(original=original, versions=[version])
+    return state.history
+
+
+def ensure_history(state: RecipeContext) -> RecipeHistory | None:
+    """The thread's history, started now if the state has none yet."""
+    if state.history is None:
+        return start_history(state)
+    return state.history
+
+
+def version_recipe(history: RecipeHistory, version: RecipeVersion) -> Recipe:
+    """Build a version's recipe from the original, or return the one built."""
+    if version._recipe is not None:
+        return version._recipe
+    original = history.original
+    recipe = original.scale(version.servings)
+    if version.ingredients or version.steps or version.dietary_tags is not None:
+        factor = version.servings / original.servings if original.servings else 1
+        ingredients = list(recipe.ingredients)
+        for position, ing in version.ingredients.items():
+            ingredients[position] = _rescaled(ing, factor, digits=2)
+        steps = list(recipe.steps)
+        for position, step in version.steps.items():
+            steps[position] = step
+        recipe = recipe.model_copy(
+            update={
+                "ingredients": ingredients,
+                "steps": steps,
+                "dietary_tags": version.dietary_tags
+                if version.dietary_tags is not None
+                else original.dietary_tags,
+            }
+        )
+    version._recipe = recipe
+    return recipe
+
+
+def _push(history: RecipeHistory, version: RecipeVersion) -> None:
+    # A change after an undo replaces the versions that were undone
+    del history.versions[history.position + 1 :]
+    history.versions.append(version)
+    excess = len(history.versions) - RECIPE_MAX_VERSIONS
+    if excess > 0:
+        del history.versions[:excess]
+    history.position = len(history.versions) - 1
+
+
+def record_version(state: RecipeContext, label: str) -> None:
+    """
+    Add the state's recipe to the history after an edit, as a new version.
+
+    Ingredients and steps that differ from the current version are stored;
+    replaced ingredients are scaled back to the original servings first, or
+    keep the stored quantity when a swap left the quantity as it was.
+    """
+    if state.history is None:
+        # Without a history the edit can't be told apart from the original
+        start_history(state)
+        return
+    history = state.history
+    current = history.versions[history.position]
+    before = version_recipe(history, current)
+    recipe = state.recipe
+    if (len(recipe.ingredients), len(recipe.steps)) != (
+        len(before.ingredients),
+        len(before.steps),
+    ):
+        logger.info("Recipe changed shape; starting a new history")
+        start_history(state)
+        return
+
+    factor = history.original.servings / recipe.servings if recipe.servings else 1
+    ingredients = dict(current.ingredients)
+    for position, (old, new) in enumerate(
+        zip(before.ingredients, recipe.ingredients, strict=True)
+    ):
+        if new is old or new == old:
+            continue
+        if (new.quantity, new.unit) == (old.quantity, old.unit):
+            # Unscaling the rounded quantity would compound the rounding
+            stored = ingredients.get(position, history.original.ingredients[position])
+            ingredients[position] = new.model_copy(update={"quantity": stored.quantity})
+        else:
+            ingredients[position] = _rescaled(new, factor)
+    steps = dict(current.steps)
+    for position, (old, new) in enumerate(zip(before.steps, recipe.steps, strict=True)):
+        if new is not old and new != old:
+            steps[position] = new
+    tags = recipe.dietary_tags
+    if tags == history.original.dietary_tags:
+        tags = None
+    if (ingredients, steps, tags, recipe.servings) == (
+        current.ingredients,
+        current.steps,
+        current.dietary_tags,
+        current.servings,
+    ):
+        return
+    version = RecipeVersion(
+        label=label,
+        servings=recipe.servings,
+        ingredients=ingredients,
+        steps=steps,
+        dietary_tags=tags,
+    )
+    version._recipe = recipe
+    _push(history, version)
+
+
+def _apply_version(state: RecipeContext, history: RecipeHistory) -> None:
+    version = history.versions[history.position]
+    recipe = version_recipe(history, version)
+    source_text = state.recipe.source_text if state.recipe else None
+    if source_text is not None and recipe.source_text is None:
+        recipe = recipe.model_copy(update={"source_text": source_text})
+        version._recipe = recipe
+    state.recipe = recipe
+    original_servings = history.original.servings
+    state.scaled_servings = (
+        version.servings if version.servings != original_servings else None
+    )
+    refresh_timing(state)
+    refresh_nutrition(state)
+
+
+def scale_version(state: RecipeContext, target_servings: int) -> None:
+    """Add a version of the current one at other servings, scaled from the original."""
+    history = ensure_history(state)
+    current = history.versions[history.position]
+    if current.servings == target_servings:
+        return
+    version = current.model_copy(
+        update={
+            "label": f"Scaled to {target_servings} servings",
+            "servings": target_servings,
+        }
+    )
+    # The copy shares the change maps, which are never edited in place
+    version._recipe = None
+    _push(history, version)
+    _apply_version(state, history)
+
+
+def checkout_version(state: RecipeContext, position: int) -> RecipeVersion:
+    """Make the version at a history position the current recipe."""
+    history = state.history
+    history.position = position
+    _apply_version(state, history)
+    return history.versions[position]
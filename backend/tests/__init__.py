@@ -1 +1,7 @@
 """Backend tests package."""
+
+import os
+
+# Set before conftest imports src: keep test sessions in memory rather than
+# writing sessions.db
+os.environ.setdefault("SESSION_STORE", "memory")
@@ -8,9 +8,15 @@ from httpx import ASGITransport, AsyncClient
 
 from src.main import app
 from src.models import Recipe, Ingredient, RecipeStep, RecipeContext
-from src import agents
+from src import agents, shared_cache
+from src.shared_cache import LocalCache
 
 
+@pytest.fixture(autouse=True)
+def fresh_shared_cache(monkeypatch) -> None:
+    """Give each test an empty shared cache so LLM results don't leak between tests."""
+    monkeypatch.setattr(shared_cache, "_cache", LocalCache())
+
 
 @pytest.fixture
 async def client() -> AsyncClient:
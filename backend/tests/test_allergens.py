@@ -0,0 +1,159 @@
+"""Tests for allergen-free swaps from the local substitution graph."""
+
+from types import SimpleNamespace
+
+import pytest
+from pydantic_ai import ToolReturn
+from pydantic_ai.ag_ui import StateDeps
+
+from src import agents, allergens
+from src.allergens import (
+    Candidate,
+    find_safe_substitute,
+    graph_node,
+    plan_allergen_swaps,
+    resolve_allergens,
+)
+from src.commands import CommandError
+from src.models import Ingredient, Recipe
+
+
+def recipe_of(*ingredients: Ingredient) -> Recipe:
+    return Recipe(title="Test", servings=2, ingredients=list(ingredients), steps=[])
+
+
+@pytest.fixture
+def rewrites(monkeypatch) -> list[list[tuple[str, str]]]:
+    """Record step rewrites and fail on any model matching call."""
+    calls: list[list[tuple[str, str]]] = []
+
+    async def rewrite(recipe, substitutions):
+        calls.append(substitutions)
+        return recipe.steps
+
+    async def find(recipe, original, substitute):
+        raise AssertionError("allergen swaps should not be matched by the model")
+
+    monkeypatch.setattr(agents, "rewrite_steps_for_substitutions", rewrite)
+    monkeypatch.setattr(agents, "find_and_substitute", find)
+    return calls
+
+
+class TestResolveAllergens:
+    """Tests for resolve_allergens."""
+
+    def test_names_and_diets(self) -> None:
+        assert resolve_allergens(["Tree nuts", "gluten-free"]) == {"nut", "gluten"}
+        assert resolve_allergens(["shellfish"]) == {"fish"}
+        assert "dairy" in resolve_allergens(["vegan"])
+
+    def test_unknown(self) -> None:
+        with pytest.raises(CommandError, match="I can avoid"):
+            resolve_allergens(["kryptonite"])
+
+
+class TestSubstituteSearch:
+    """Tests for the search over the substitution graph."""
+
+    def test_graph_node(self) -> None:
+        assert graph_node("unsalted butter") == "butter"
+        assert graph_node("smooth peanut butter") == "peanut butter"
+        assert graph_node("dragon fruit") is None
+
+    def test_same_category_ranks_first(self) -> None:
+        avoid = resolve_allergens(["dairy"])
+
+        dairy = find_safe_substitute(Ingredient(name="butter", category="dairy"), avoid)
+        pantry = find_safe_substitute(
+            Ingredient(name="butter", category="pantry"), avoid
+        )
+
+        assert dairy[0].name == "vegan butter"
+        assert (pantry[0].name, pantry[1]) == ("olive oil", 0.75)
+
+    def test_skips_substitutes_with_other_allergens(self) -> None:
+        # Oat milk has gluten and soy milk soy, so the search goes a step
+        # further to rice milk
+        found = find_safe_substitute(
+            Ingredient(name="almond milk"), resolve_allergens(["nuts", "gluten", "soy"])
+        )
+        assert found[0].name == "rice milk"
+
+    def test_plan(self) -> None:
+        recipe = recipe_of(
+            Ingredient(name="walnuts", quantity=50, unit="g"),
+            Ingredient(name="butter", quantity=100, unit="g", category="pantry"),
+            Ingredient(name="praline", quantity=1),
+            Ingredient(name="sugar", quantity=100, unit="g"),
+        )
+
+        swaps, unresolved = plan_allergen_swaps(
+            recipe, resolve_allergens(["nuts", "dairy"])
+        )
+
+        assert [(s.matched_ingredient, s.substitute_name) for s in swaps] == [
+            ("walnuts", "sunflower seeds"),
+            ("butter", "olive oil"),
+        ]
+        assert swaps[1].substitute_quantity == 75
+        assert unresolved == ["praline"]
+
+
+class TestAvoidAllergens:
+    """Tests for applying allergen swaps to the loaded recipe."""
+
+    async def test_one_rewrite_for_all_swaps(self, rewrites, sample_state) -> None:
+        message = await agents.avoid_allergens_in_state(
+            sample_state, ["gluten", "dairy"]
+        )
+
+        names = [ing.name for ing in sample_state.recipe.ingredients]
+        assert names[0] == "gluten-free spaghetti"
+        assert names[-1] == "dairy-free parmesan"
+        assert rewrites == [
+            [
+                ("spaghetti", "gluten-free spaghetti"),
+                ("parmesan", "dairy-free parmesan"),
+            ]
+        ]
+        assert "Swapped parmesan for dairy-free parmesan." in message
+        assert "gluten-free" in sample_state.recipe.dietary_tags
+        assert "dairy-free" in sample_state.recipe.dietary_tags
+
+    async def test_nothing_to_swap(self, rewrites, sample_state) -> None:
+        message = await agents.avoid_allergens_in_state(sample_state, ["nuts"])
+
+        assert message == "Nothing in this recipe contains nuts."
+        assert rewrites == []
+
+    async def test_unrecognised_ingredients_flagged(
+        self, rewrites, sample_state
+    ) -> None:
+        sample_state.recipe.ingredients.append(Ingredient(name="caesar dressing"))
+
+        message = await agents.avoid_allergens_in_state(sample_state, ["nuts"])
+
+        assert message == "I couldn't check caesar dressing; read the label to be sure."
+
+    def test_unrecognised_substitutes_skipped(self, monkeypatch) -> None:
+        monkeypatch.setitem(
+            allergens._GRAPH,
+            "walnut",
+            (
+                Candidate("mystery crunch", "pantry"),
+                Candidate("pumpkin seeds", "pantry"),
+            ),
+        )
+        found = find_safe_substitute(
+            Ingredient(name="walnuts"), resolve_allergens(["nuts"])
+        )
+        assert found[0].name == "pumpkin seeds"
+
+    async def test_tool(self, rewrites, sample_state) -> None:
+        ctx = SimpleNamespace(deps=StateDeps(sample_state))
+
+        result = await agents.avoid_allergens(ctx, ["dairy"])
+
+        assert isinstance(result, ToolReturn)
+        assert result.return_value.startswith("Swapped parmesan")
+        assert "I can avoid" in await agents.avoid_allergens(ctx, ["kryptonite"])
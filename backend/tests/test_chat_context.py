@@ -0,0 +1,114 @@
+"""Tests for the recipe and progress context given to the chat agent."""
+
+import pytest
+
+from src import agents
+from src.agents import render_progress_context, render_recipe_context
+from src.models import Recipe, RecipeContext
+
+
+class TestIngredientsForStep:
+    """Tests for Recipe.ingredients_for_step."""
+
+    def test_matches_ingredients_named_in_step(self, sample_recipe: Recipe) -> None:
+        step = sample_recipe.steps[1]  # "Sauté garlic in olive oil"
+        names = [ing.name for ing in sample_recipe.ingredients_for_step(step)]
+        assert names == ["olive oil", "garlic"]
+
+    def test_matches_plurals(self, sample_recipe: Recipe) -> None:
+        step = sample_recipe.steps[2]  # "Add tomatoes and simmer"
+        step.instruction = "Add the tomato and simmer"
+        names = [ing.name for ing in sample_recipe.ingredients_for_step(step)]
+        assert names == ["tomatoes"]
+
+
+class TestRenderRecipeContext:
+    """Tests for render_recipe_context."""
+
+    def test_includes_ingredients_and_steps(self, sample_recipe: Recipe) -> None:
+        text = render_recipe_context(sample_recipe)
+        assert "CURRENT RECIPE: Pasta al Pomodoro" in text
+        assert "- 3 cloves garlic, minced" in text
+        assert "3. Add tomatoes and simmer (15 min)" in text
+
+    def test_is_deterministic(self, sample_recipe: Recipe) -> None:
+        copy = Recipe.model_validate_json(sample_recipe.model_dump_json())
+        assert render_recipe_context(copy) == render_recipe_context(sample_recipe)
+
+    def test_summary_only(self, sample_recipe: Recipe) -> None:
+        text = render_recipe_context(sample_recipe, full=False)
+        assert "Ingredients: 6" in text
+        assert "garlic" not in text
+
+
+@pytest.fixture
+def context_cache(monkeypatch) -> None:
+    """Turn Gemini context caching on for the chat prompt."""
+    monkeypatch.setattr(agents.prompt_cache, "enabled", True)
+
+
+class TestRenderProgressContext:
+    """Tests for render_progress_context."""
+
+    def test_renders_current_and_next_step(self, sample_state: RecipeContext) -> None:
+        sample_state.current_step = 1
+        text = render_progress_context(sample_state)
+
+        assert "step 2 of 4" in text
+        assert "Now (step 2): Sauté garlic in olive oil [2 min]" in text
+        assert "Uses: olive oil (3 tbsp), garlic (3 cloves)" in text
+        assert "Next (step 3): Add tomatoes and simmer" in text
+
+    def test_refers_to_cached_recipe(
+        self, sample_state: RecipeContext, context_cache
+    ) -> None:
+        sample_state.current_step = 1
+        text = render_progress_context(sample_state)
+
+        assert "Now: step 2" in text
+        assert "Next: step 3" in text
+        # Step text and ingredients are already in the cached recipe
+        assert "Sauté" not in text
+        assert "Uses:" not in text
+
+    def test_final_step(self, sample_state: RecipeContext) -> None:
+        sample_state.current_step = 3
+        text = render_progress_context(sample_state)
+        assert "This is the final step." in text
+        assert "Next" not in text
+
+    def test_out_of_range_step(self, sample_state: RecipeContext) -> None:
+        sample_state.current_step = 10
+        assert "no such step" in render_progress_context(sample_state)
+
+    def test_no_recipe(self) -> None:
+        assert render_progress_context(RecipeContext()) == ""
+
+    def test_memoized_per_state_version(
+        self, sample_state: RecipeContext, monkeypatch
+    ) -> None:
+        calls = []
+        render = agents._render_progress
+        monkeypatch.setattr(
+            agents,
+            "_render_progress",
+            lambda *args, **kwargs: calls.append(args) or render(*args, **kwargs),
+        )
+        agents._progress_cache.clear()
+
+        first = render_progress_context(sample_state)
+        assert render_progress_context(sample_state.model_copy(deep=True)) == first
+        assert len(calls) == 1
+
+        sample_state.current_step = 1
+        render_progress_context(sample_state)
+        assert len(calls) == 2
+
+        # The source document isn't rendered, so it doesn't change the version
+        sample_state.recipe.source_text = "x" * 100_000
+        render_progress_context(sample_state)
+        assert len(calls) == 2
+
+        sample_state.recipe.ingredients[0].quantity = 800
+        render_progress_context(sample_state)
+        assert len(calls) == 3
@@ -0,0 +1,138 @@
+"""Tests for deterministic cooking commands and the /commands endpoint."""
+
+import pytest
+from httpx import AsyncClient
+
+from src.commands import CommandError, apply_command, state_delta
+from src.models import CookingCommand, RecipeContext
+from src.timing import refresh_timing
+
+
+class TestApplyCommand:
+    """Tests for apply_command."""
+
+    def test_next_step(self, sample_state: RecipeContext) -> None:
+        message = apply_command(sample_state, CookingCommand(action="next_step"))
+        assert sample_state.current_step == 1
+        assert message == "Now on step 2 of 4."
+
+    def test_next_step_past_end_rejected(self, sample_state: RecipeContext) -> None:
+        sample_state.current_step = 3
+        with pytest.raises(CommandError):
+            apply_command(sample_state, CookingCommand(action="next_step"))
+        assert sample_state.current_step == 3
+
+    def test_previous_step_at_start_rejected(self, sample_state: RecipeContext) -> None:
+        with pytest.raises(CommandError, match="already on the first step"):
+            apply_command(sample_state, CookingCommand(action="previous_step"))
+        assert sample_state.current_step == 0
+
+    def test_restart(self, sample_state: RecipeContext) -> None:
+        sample_state.current_step = 2
+        apply_command(sample_state, CookingCommand(action="restart"))
+        assert sample_state.current_step == 0
+
+    def test_scale(self, sample_state: RecipeContext) -> None:
+        apply_command(sample_state, CookingCommand(action="scale", servings=6))
+        assert sample_state.recipe.servings == 6
+        assert sample_state.scaled_servings == 6
+        assert sample_state.recipe.ingredients[0].quantity == 600
+
+    def test_scale_to_zero_rejected(self, sample_state: RecipeContext) -> None:
+        with pytest.raises(CommandError):
+            apply_command(sample_state, CookingCommand(action="scale", servings=0))
+
+    def test_no_recipe_rejected(self) -> None:
+        with pytest.raises(CommandError):
+            apply_command(RecipeContext(), CookingCommand(action="next_step"))
+
+
+class TestStateDelta:
+    """Tests for state_delta JSON Patch generation."""
+
+    def test_no_changes(self) -> None:
+        assert state_delta({"a": 1}, {"a": 1}) == []
+
+    def test_nested_replace(self) -> None:
+        before = {"recipe": {"servings": 4, "ingredients": [{"quantity": 1}]}}
+        after = {"recipe": {"servings": 8, "ingredients": [{"quantity": 2}]}}
+        assert state_delta(before, after) == [
+            {"op": "replace", "path": "/recipe/servings", "value": 8},
+            {"op": "replace", "path": "/recipe/ingredients/0/quantity", "value": 2},
+        ]
+
+    def test_list_length_change_replaces_list(self) -> None:
+        assert state_delta({"tags": ["a"]}, {"tags": ["a", "b"]}) == [
+            {"op": "replace", "path": "/tags", "value": ["a", "b"]}
+        ]
+
+    def test_add_and_remove_keys(self) -> None:
+        assert state_delta({"a/b": 1}, {"c": 2}) == [
+            {"op": "remove", "path": "/a~1b"},
+            {"op": "add", "path": "/c", "value": 2},
+        ]
+
+
+class TestCommandsEndpoint:
+    """Tests for POST /commands."""
+
+    async def test_next_step_returns_delta(
+        self, client: AsyncClient, sample_state: RecipeContext
+    ) -> None:
+        refresh_timing(sample_state)
+        response = await client.post(
+            "/commands",
+            json={
+                "state": sample_state.model_dump(mode="json"),
+                "command": {"action": "next_step"},
+            },
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["message"] == "Now on step 2 of 4."
+        assert data["delta"][0] == {
+            "op": "replace",
+            "path": "/current_step",
+            "value": 1,
+        }
+        # The time left and next timer move with the step
+        assert {op["path"] for op in data["delta"][1:]} == {
+            "/timing/remaining_minutes",
+            "/timing/next_timer/duration_seconds",
+            "/timing/next_timer/label",
+            "/timing/next_timer/step_number",
+        }
+
+    async def test_scale_returns_quantity_changes(
+        self, client: AsyncClient, sample_state: RecipeContext
+    ) -> None:
+        response = await client.post(
+            "/commands",
+            json={
+                "state": sample_state.model_dump(mode="json"),
+                "command": {"action": "scale", "servings": 8},
+            },
+        )
+
+        assert response.status_code == 200
+        delta = {op["path"]: op["value"] for op in response.json()["delta"]}
+        assert delta["/recipe/servings"] == 8
+        assert delta["/recipe/original_servings"] == 4
+        assert delta["/recipe/ingredients/0/quantity"] == 800
+        assert delta["/scaled_servings"] == 8
+
+    async def test_invalid_command_returns_400(
+        self, client: AsyncClient, sample_state: RecipeContext
+    ) -> None:
+        sample_state.current_step = 3
+        response = await client.post(
+            "/commands",
+            json={
+                "state": sample_state.model_dump(mode="json"),
+                "command": {"action": "next_step"},
+            },
+        )
+
+        assert response.status_code == 400
+        assert "does not exist" in response.json()["detail"]
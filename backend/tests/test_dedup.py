@@ -0,0 +1,131 @@
+"""Tests for near-duplicate upload detection."""
+
+from io import BytesIO
+from unittest.mock import AsyncMock, patch
+
+from httpx import AsyncClient
+
+from src.dedup import NearDuplicateIndex, minhash, normalize_text, similarity
+from src.models import Recipe
+
+RECIPE_TEXT = """
+Pasta al Pomodoro
+Serves 4
+400 g spaghetti
+3 tbsp olive oil
+3 cloves garlic, minced
+400 g canned tomatoes
+1 bunch fresh basil
+50 g parmesan, grated
+Boil a large pot of salted water and cook the spaghetti until al dente.
+Meanwhile warm the olive oil in a wide pan and gently fry the garlic.
+Add the tomatoes, season well and simmer for fifteen minutes until thick.
+Toss the drained pasta with the sauce, tear in the basil and finish with
+plenty of grated parmesan. Serve straight away.
+"""
+
+# The same recipe as a different PDF export: new header, footer and spacing
+REEXPORTED_TEXT = (
+    "www.example-recipes.com\n"
+    + RECIPE_TEXT.replace("\n", "  \n").replace("simmer for", "simmer  for")
+    + "\nPage 1 of 1\n2\n"
+)
+
+OTHER_TEXT = """
+Chana Masala
+Serves 4
+2 cans chickpeas, drained
+1 onion, finely chopped
+2 tsp garam masala
+Fry the onion in oil until deep golden, then add the spices and cook briefly.
+Stir in the chickpeas with a splash of water and simmer until saucy.
+"""
+
+
+class TestMinHash:
+    """Tests for the MinHash helpers."""
+
+    def test_normalize_drops_page_furniture(self) -> None:
+        words = normalize_text("Page 2 of 3\nhttps://example.com/x\n12\nAdd Salt!")
+        assert words == ["add", "salt"]
+
+    def test_reexport_is_similar(self) -> None:
+        assert similarity(minhash(RECIPE_TEXT), minhash(REEXPORTED_TEXT)) >= 0.85
+
+    def test_different_recipe_is_not(self) -> None:
+        assert similarity(minhash(RECIPE_TEXT), minhash(OTHER_TEXT)) < 0.2
+
+    def test_empty_text(self) -> None:
+        assert minhash("\n  \nPage 1\n") is None
+
+
+class TestNearDuplicateIndex:
+    """Tests for NearDuplicateIndex."""
+
+    def test_finds_near_duplicate(self, sample_recipe: Recipe) -> None:
+        index = NearDuplicateIndex(":memory:")
+        index.add(minhash(RECIPE_TEXT), sample_recipe)
+
+        assert index.find(REEXPORTED_TEXT)[0].title == sample_recipe.title
+        assert index.find(OTHER_TEXT)[0] is None
+
+    def test_threshold_is_tunable(self, sample_recipe: Recipe) -> None:
+        edited = RECIPE_TEXT.replace("fifteen minutes", "twenty minutes")
+        index = NearDuplicateIndex(":memory:", threshold=1.0)
+        index.add(minhash(RECIPE_TEXT), sample_recipe)
+
+        assert index.find(RECIPE_TEXT)[0] is not None
+        assert index.find(edited)[0] is None
+
+    def test_persists_across_restart(self, tmp_path, sample_recipe: Recipe) -> None:
+        path = str(tmp_path / "sessions.db")
+        NearDuplicateIndex(path).add(minhash(RECIPE_TEXT), sample_recipe)
+
+        reloaded = NearDuplicateIndex(path)
+        assert len(reloaded) == 1
+        assert reloaded.find(REEXPORTED_TEXT)[0] == sample_recipe
+
+
+class TestUploadDeduplication:
+    """POST /upload reuses recipes from near-identical documents."""
+
+    async def test_reexport_skips_parse(
+        self, client: AsyncClient, sample_recipe: Recipe, monkeypatch
+    ) -> None:
+        monkeypatch.setattr("src.main.get_dedup_index", lambda: index, raising=True)
+        index = NearDuplicateIndex(":memory:")
+
+        with patch(
+            "src.main.parse_recipe_from_text", new_callable=AsyncMock
+        ) as mock_parse:
+            mock_parse.return_value = sample_recipe
+            for text in (RECIPE_TEXT, REEXPORTED_TEXT):
+                files = {"file": ("pasta.txt", BytesIO(text.encode()), "text/plain")}
+                response = await client.post("/upload", files=files)
+                assert response.status_code == 200
+
+        assert mock_parse.await_count == 1
+        data = response.json()
+        assert data["state"]["recipe"]["title"] == "Pasta al Pomodoro"
+        assert data["state"]["recipe"]["source_text"] == REEXPORTED_TEXT
+
+    async def test_signature_computed_once_per_upload(
+        self, client: AsyncClient, sample_recipe: Recipe, monkeypatch
+    ) -> None:
+        index = NearDuplicateIndex(":memory:")
+        monkeypatch.setattr("src.main.get_dedup_index", lambda: index)
+        calls = []
+        monkeypatch.setattr(
+            "src.dedup.minhash", lambda text: calls.append(text) or minhash(text)
+        )
+
+        with patch(
+            "src.main.parse_recipe_from_text", new_callable=AsyncMock
+        ) as mock_parse:
+            mock_parse.return_value = sample_recipe
+            files = {"file": ("pasta.txt", BytesIO(RECIPE_TEXT.encode()), "text/plain")}
+            response = await client.post("/upload", files=files)
+
+        assert response.status_code == 200
+        assert len(calls) == 1
+        assert len(index) == 1
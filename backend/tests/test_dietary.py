@@ -0,0 +1,170 @@
+"""Tests for rule-based dietary tags."""
+
+import pytest
+
+from src import agents
+from src.dietary import (
+    UNKNOWN,
+    infer_tags,
+    ingredient_properties,
+    refresh_dietary_tags,
+    retag,
+    tag_violations,
+    unrecognised_ingredients,
+)
+from src.models import Ingredient, Recipe, SubstitutionResult
+
+
+def recipe_of(*names: str, tags: list[str] | None = None) -> Recipe:
+    return Recipe(
+        title="Test",
+        servings=2,
+        dietary_tags=tags or [],
+        ingredients=[Ingredient(name=name) for name in names],
+        steps=[],
+    )
+
+
+class TestIngredientProperties:
+    """Tests for ingredient_properties."""
+
+    @pytest.mark.parametrize(
+        ("name", "properties"),
+        [
+            ("unsalted butter", {"dairy"}),
+            ("chicken stock", {"meat"}),
+            ("large eggs", {"egg"}),
+            ("Parmigiano-Reggiano", {"dairy"}),
+            ("egg noodles", {"egg", "gluten"}),
+            ("honey", {"animal"}),
+            ("tahini", {"sesame"}),
+            ("soy sauce", {"gluten", "soy"}),
+            # Phrases override their words
+            ("peanut butter", {"nut"}),
+            ("coconut milk", set()),
+            ("rice noodles", set()),
+            ("butter beans", set()),
+            # Different words that merely contain a food word
+            ("butternut squash", set()),
+            ("eggplant", set()),
+            ("nutmeg", set()),
+            # Modifiers
+            ("vegan butter", set()),
+            ("gluten-free spaghetti", set()),
+            # Forms of a known food
+            ("fresh basil leaves", set()),
+            ("salmon fillets", {"fish"}),
+        ],
+    )
+    def test_properties(self, name: str, properties: set[str]) -> None:
+        assert ingredient_properties(name) == properties
+
+    @pytest.mark.parametrize(
+        "name",
+        [
+            "dark chocolate",
+            "caesar dressing",
+            "stock cube",
+            "thai red curry paste",
+            "chocolate chips",
+        ],
+    )
+    def test_unrecognised(self, name: str) -> None:
+        assert UNKNOWN in ingredient_properties(name)
+
+    def test_known_properties_kept_when_unrecognised(self) -> None:
+        # Milk is still dairy even though the chocolate itself is unknown
+        assert ingredient_properties("milk chocolate") == {"dairy", UNKNOWN}
+        assert ingredient_properties("puff pastry") == {"gluten", "dairy"}
+
+
+class TestTags:
+    """Tests for infer_tags and retag."""
+
+    def test_sample_recipe(self, sample_recipe) -> None:
+        # Spaghetti has gluten and parmesan is dairy
+        assert infer_tags(sample_recipe) == ["vegetarian", "nut-free"]
+
+    def test_vegan_recipe(self) -> None:
+        recipe = recipe_of("chickpeas", "tahini", "lemon juice", "olive oil")
+        assert infer_tags(recipe) == [
+            "vegan",
+            "vegetarian",
+            "gluten-free",
+            "dairy-free",
+            "nut-free",
+        ]
+
+    def test_retag_replaces_guesses_and_keeps_other_tags(self) -> None:
+        recipe = recipe_of("honey", "oats", tags=["Vegan", "high-fiber"])
+        assert retag(recipe).dietary_tags == [
+            "high-fiber",
+            "vegetarian",
+            "dairy-free",
+            "nut-free",
+        ]
+
+    def test_unchanged_recipe_returned_as_is(self, sample_recipe) -> None:
+        tagged = retag(sample_recipe)
+        assert retag(tagged) is tagged
+
+    def test_unrecognised_ingredients_add_no_tags(self) -> None:
+        recipe = recipe_of("dark chocolate", "sugar", "caesar dressing")
+
+        assert infer_tags(recipe) == []
+        assert unrecognised_ingredients(recipe) == ["dark chocolate", "caesar dressing"]
+
+    def test_unrecognised_ingredients_keep_parser_tags(self) -> None:
+        recipe = recipe_of("dark chocolate", "sugar", tags=["vegan", "gluten-free"])
+        assert infer_tags(recipe) == ["vegan", "gluten-free"]
+
+        # A known offending ingredient still removes a claimed tag
+        recipe = recipe_of("dark chocolate", "butter", tags=["vegan", "gluten-free"])
+        assert infer_tags(recipe) == ["gluten-free"]
+
+    def test_puff_pastry_is_not_dairy_free(self) -> None:
+        recipe = recipe_of("dark chocolate", "puff pastry")
+        assert infer_tags(recipe) == []
+
+    def test_violations(self, sample_recipe) -> None:
+        assert tag_violations(sample_recipe, "Gluten Free") == ["spaghetti"]
+
+
+class TestSubstitutionFlags:
+    """Tests for tags kept current through substitutions."""
+
+    def test_refresh_reports_broken_tags(self, sample_state) -> None:
+        sample_state.recipe = recipe_of("tofu", "rice", "soy sauce", tags=["vegan"])
+        assert refresh_dietary_tags(sample_state) == []
+
+        sample_state.recipe = sample_state.recipe.substitute_ingredient(
+            "tofu", "chicken thighs"
+        )
+
+        assert refresh_dietary_tags(sample_state) == ["vegan", "vegetarian"]
+        assert "vegan" not in sample_state.recipe.dietary_tags
+
+    async def test_swap_message_flags_broken_tag(
+        self, monkeypatch, sample_state
+    ) -> None:
+        async def find(recipe, original, substitute):
+            return SubstitutionResult(
+                matched_ingredient="olive oil",
+                substitute_name="butter",
+                confidence=0.9,
+            )
+
+        async def rewrite(recipe, substitutions):
+            return recipe.steps
+
+        monkeypatch.setattr(agents, "find_and_substitute", find)
+        monkeypatch.setattr(agents, "rewrite_steps_for_substitutions", rewrite)
+        sample_state.recipe = retag(
+            sample_state.recipe.substitute_ingredient("parmesan", "nutritional yeast")
+        )
+        assert "dairy-free" in sample_state.recipe.dietary_tags
+
+        message = await agents.substitute_in_state(sample_state, "oil", "butter")
+
+        assert "no longer vegan (butter), dairy-free (butter)." in message
+        assert "dairy-free" not in sample_state.recipe.dietary_tags
@@ -0,0 +1,133 @@
+"""Tests for LLM call deadlines and hedged requests."""
+
+import asyncio
+
+import pytest
+
+from src import agents, hedging
+from src.hedging import LatencyTracker, hedged, latency
+from src.metrics import metrics
+
+
+@pytest.fixture(autouse=True)
+def reset() -> None:
+    latency.reset()
+    metrics.reset()
+
+
+def prime(key: str, seconds: float, count: int = 20) -> None:
+    for _ in range(count):
+        latency.record(key, seconds)
+
+
+class SlowAgent:
+    """Agent stub whose run never finishes before the test deadline."""
+
+    async def run(self, _prompt, model=None):
+        await asyncio.sleep(10)
+
+
+class TestLatencyTracker:
+    """Tests for LatencyTracker."""
+
+    def test_p90_needs_enough_samples(self) -> None:
+        tracker = LatencyTracker()
+        tracker.record("parse.fast", 1.0)
+        assert tracker.p90("parse.fast", min_samples=2) is None
+
+    def test_p90(self) -> None:
+        tracker = LatencyTracker()
+        for i in range(1, 11):
+            tracker.record("parse.fast", float(i))
+        assert tracker.p90("parse.fast", min_samples=10) == 10.0
+
+    def test_window_drops_old_samples(self) -> None:
+        tracker = LatencyTracker(window=5)
+        for i in range(10):
+            tracker.record("parse.fast", float(i))
+        assert tracker.p90("parse.fast", min_samples=5) == 9.0
+
+
+class TestHedged:
+    """Tests for hedged."""
+
+    async def test_no_hedge_without_history(self) -> None:
+        calls = []
+
+        async def call():
+            calls.append(1)
+            return "ok"
+
+        assert await hedged("parse.fast", call, hedge=True) == "ok"
+        assert len(calls) == 1
+
+    async def test_hedge_fires_after_p90_and_wins(self) -> None:
+        prime("parse.fast", 0.01)
+        delays = [5, 0]
+
+        async def call():
+            await asyncio.sleep(delays.pop(0))
+            return "ok"
+
+        assert await asyncio.wait_for(hedged("parse.fast", call, hedge=True), 1)
+        assert metrics.get("llm.parse.fast.hedges") == 1
+        assert metrics.get("llm.parse.fast.hedge_wins") == 1
+
+    async def test_failed_attempt_falls_through_to_hedge(self) -> None:
+        prime("parse.fast", 0.01)
+        outcomes = [RuntimeError("boom"), "ok"]
+
+        async def call():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                await asyncio.sleep(0.05)
+                raise outcome
+            return outcome
+
+        assert await hedged("parse.fast", call, hedge=True) == "ok"
+
+    async def test_all_attempts_fail(self) -> None:
+        async def call():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await hedged("parse.fast", call, hedge=True)
+
+
+class TestDeadlines:
+    """Deadline expiry falls back to the existing non-LLM paths."""
+
+    @pytest.fixture
+    def short_deadline(self, monkeypatch) -> None:
+        monkeypatch.setattr(agents, "deadline_for", lambda task: 0.05)
+
+    def test_deadline_env_override(self, monkeypatch) -> None:
+        monkeypatch.setenv("LLM_DEADLINE_PARSE", "2.5")
+        assert hedging.deadline_for("parse") == 2.5
+        monkeypatch.setenv("LLM_DEADLINE_PARSE", "0")
+        assert hedging.deadline_for("parse") is None
+
+    async def test_substitution_falls_back_to_exact_match(
+        self, short_deadline, monkeypatch, sample_recipe
+    ) -> None:
+        monkeypatch.setattr(agents, "get_substitution_agent", SlowAgent)
+
+        result = await agents.find_and_substitute(sample_recipe, "tomatoes", "passata")
+
+        assert result.matched_ingredient == "tomatoes"
+        assert metrics.get("llm.substitute.deadline_expired") == 1
+
+    async def test_rewrite_keeps_original_steps(
+        self, short_deadline, monkeypatch, sample_recipe
+    ) -> None:
+        monkeypatch.setattr(agents, "get_step_rewrite_agent", SlowAgent)
+
+        steps = await agents.rewrite_steps_for_substitution(
+            sample_recipe, "tomatoes", "passata"
+        )
+
+        assert steps == sample_recipe.steps
+
+    async def test_parse_returns_none(self, short_deadline, monkeypatch) -> None:
+        monkeypatch.setattr(agents, "get_recipe_parser", SlowAgent)
+        assert await agents.parse_recipe_from_text("some recipe") is None
@@ -0,0 +1,106 @@
+"""Tests for chat history compaction."""
+
+from pydantic_ai.messages import (
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+from src.history import compact_history, estimate_tokens
+from src.metrics import metrics
+
+
+def make_turn(index: int, snapshot_size: int = 2000) -> list:
+    """A 'next step' turn: user prompt, tool call, snapshot result, reply."""
+    call_id = f"call-{index}"
+    return [
+        ModelRequest(parts=[UserPromptPart(content=f"next step {index}")]),
+        ModelResponse(
+            parts=[
+                ToolCallPart(
+                    tool_name="update_cooking_progress",
+                    args={"current_step": index},
+                    tool_call_id=call_id,
+                )
+            ]
+        ),
+        ModelRequest(
+            parts=[
+                ToolReturnPart(
+                    tool_name="update_cooking_progress",
+                    content="x" * snapshot_size,
+                    tool_call_id=call_id,
+                )
+            ]
+        ),
+        ModelResponse(parts=[TextPart(content=f"Now on step {index}.")]),
+    ]
+
+
+def make_history(turns: int, snapshot_size: int = 2000) -> list:
+    return [message for i in range(turns) for message in make_turn(i, snapshot_size)]
+
+
+class TestCompactHistory:
+    """Tests for compact_history."""
+
+    def test_short_history_is_unchanged(self) -> None:
+        messages = make_history(2)
+        assert compact_history(messages, keep_recent_turns=4) is messages
+
+    def test_recent_turns_kept_verbatim(self) -> None:
+        messages = make_history(10)
+        result = compact_history(messages, keep_recent_turns=3, token_budget=100_000)
+        assert result[-12:] == messages[-12:]
+
+    def test_older_tool_parts_collapsed_into_summary(self) -> None:
+        messages = make_history(10)
+        result = compact_history(messages, keep_recent_turns=3, token_budget=100_000)
+
+        older = result[1:-12]
+        for message in older:
+            for part in message.parts:
+                assert not isinstance(part, (ToolCallPart, ToolReturnPart))
+
+        summary = result[0].parts[0]
+        assert isinstance(summary, SystemPromptPart)
+        assert "update_cooking_progress" in summary.content
+        # User prompts and replies from older turns survive
+        assert any(
+            isinstance(part, UserPromptPart) and part.content == "next step 0"
+            for message in older
+            for part in message.parts
+        )
+
+    def test_token_budget_enforced(self) -> None:
+        messages = make_history(10, snapshot_size=4000)
+        result = compact_history(messages, keep_recent_turns=10, token_budget=2500)
+
+        assert estimate_tokens(result) <= 2500
+        assert result[-4:] == messages[-4:]
+        assert "older turns omitted" in result[0].parts[0].content
+
+    def test_current_turn_always_kept(self) -> None:
+        messages = make_history(3, snapshot_size=40_000)
+        result = compact_history(messages, keep_recent_turns=1, token_budget=10)
+        assert result[-4:] == messages[-4:]
+
+    def test_input_not_mutated(self) -> None:
+        messages = make_history(6)
+        before = [list(message.parts) for message in messages]
+        compact_history(messages, keep_recent_turns=2, token_budget=100_000)
+        assert [list(message.parts) for message in messages] == before
+
+    def test_records_tokens_saved(self) -> None:
+        metrics.reset()
+        messages = make_history(10)
+        result = compact_history(messages, keep_recent_turns=2, token_budget=100_000)
+
+        saved = estimate_tokens(messages) - estimate_tokens(result)
+        assert saved > 0
+        assert metrics.get("history.tokens_saved") == saved
+        assert metrics.get("history.compactions") == 1
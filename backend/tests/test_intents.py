@@ -0,0 +1,175 @@
+"""Tests for the local intent router in front of recipe_agent."""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from src.intents import classify_intent, route_intent
+from src.models import RecipeContext
+
+from .test_flow import parse_sse_events
+
+
+class TestClassifyIntent:
+    """Tests for classify_intent."""
+
+    @pytest.mark.parametrize(
+        ("message", "step"),
+        [
+            ("next", 2),
+            ("Next step.", 2),
+            ("done!", 2),
+            ("please go back", 0),
+            ("previous step", 0),
+            ("Start over", 0),
+            ("go to step 4", 3),
+            ("step three", 2),
+        ],
+    )
+    def test_step_navigation(
+        self, sample_state: RecipeContext, message: str, step: int
+    ) -> None:
+        sample_state.current_step = 1
+        intent = classify_intent(message, sample_state)
+        assert intent.tool == "update_cooking_progress"
+        assert intent.args == {"current_step": step}
+        assert intent.confidence == 1.0
+
+    @pytest.mark.parametrize(
+        ("message", "servings"),
+        [
+            ("double it", 8),
+            ("Halve the recipe", 2),
+            ("triple", 12),
+            ("make it for 6", 6),
+            ("scale the recipe to 10 servings", 10),
+            ("for six people", 6),
+        ],
+    )
+    def test_scaling(
+        self, sample_state: RecipeContext, message: str, servings: int
+    ) -> None:
+        intent = classify_intent(message, sample_state)
+        assert intent.tool == "scale_recipe"
+        assert intent.args == {"target_servings": servings}
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "swap parmesan for pecorino",
+            "replace the parmesan with pecorino",
+            "use pecorino instead of parmesan",
+        ],
+    )
+    def test_substitution(self, sample_state: RecipeContext, message: str) -> None:
+        intent = classify_intent(message, sample_state)
+        assert intent.tool == "substitute_ingredient"
+        assert intent.args == {
+            "original_ingredient": "parmesan",
+            "substitute_name": "pecorino",
+        }
+        assert intent.confidence >= 0.8
+
+    def test_unknown_ingredient_is_low_confidence(
+        self, sample_state: RecipeContext
+    ) -> None:
+        intent = classify_intent("swap butter for oil", sample_state)
+        assert intent.confidence < 0.8
+        assert route_intent("swap butter for oil", sample_state) is None
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "Hello",
+            "what's next?",
+            "double it and suggest a wine",
+            "how long does the sauce simmer?",
+            "swap butter for oil and cream for milk",
+            "replace butter with oil, and also double it",
+            "change the butter to oil please and go to step 2",
+            "swap parmesan for pecorino and garlic for shallots",
+            "replace parmesan with pecorino, and also double it",
+            "change the parmesan to pecorino please and go to step 2",
+            "swap parmesan for pecorino then skip to step 3",
+        ],
+    )
+    def test_free_form_falls_through(
+        self, sample_state: RecipeContext, message: str
+    ) -> None:
+        assert route_intent(message, sample_state) is None
+
+    def test_no_recipe_falls_through(self) -> None:
+        assert route_intent("next", RecipeContext()) is None
+
+
+def run_input(state: RecipeContext, message: str) -> dict:
+    return {
+        "threadId": "thread-1",
+        "runId": "run-1",
+        "tools": [],
+        "context": [],
+        "forwardedProps": {},
+        "state": state.model_dump(mode="json"),
+        "messages": [{"id": "msg-1", "role": "user", "content": message}],
+    }
+
+
+class TestFastPath:
+    """Tests for routed runs on the /copilotkit endpoint."""
+
+    async def test_scale_streams_snapshot_without_model(
+        self, client: AsyncClient, sample_state: RecipeContext
+    ) -> None:
+        with patch("src.chat_app.FastAGUIAdapter.run_stream") as run_stream:
+            response = await client.post(
+                "/copilotkit/", json=run_input(sample_state, "double it")
+            )
+        run_stream.assert_not_called()
+
+        events = parse_sse_events(response.text)
+        types = [event["type"] for event in events]
+        assert types == [
+            "RUN_STARTED",
+            "STATE_SNAPSHOT",
+            "TEXT_MESSAGE_START",
+            "TEXT_MESSAGE_CONTENT",
+            "TEXT_MESSAGE_END",
+            "RUN_FINISHED",
+        ]
+        assert events[1]["snapshot"]["recipe"]["servings"] == 8
+        assert "Scaled from 4 to 8 servings" in events[3]["delta"]
+
+    async def test_invalid_step_streams_message_only(
+        self, client: AsyncClient, sample_state: RecipeContext
+    ) -> None:
+        sample_state.current_step = 3
+        response = await client.post(
+            "/copilotkit/", json=run_input(sample_state, "next")
+        )
+
+        events = parse_sse_events(response.text)
+        assert "STATE_SNAPSHOT" not in [event["type"] for event in events]
+        content = next(e for e in events if e["type"] == "TEXT_MESSAGE_CONTENT")
+        assert "does not exist" in content["delta"]
+
+    async def test_substitution_runs_tool_logic(
+        self, client: AsyncClient, sample_state: RecipeContext
+    ) -> None:
+        with patch(
+            "src.intents.substitute_in_state", new_callable=AsyncMock
+        ) as substitute:
+            substitute.return_value = "Swapped parmesan for pecorino."
+            response = await client.post(
+                "/copilotkit/",
+                json=run_input(sample_state, "swap parmesan for pecorino"),
+            )
+
+        substitute.assert_awaited_once()
+        assert substitute.await_args.kwargs == {
+            "original_ingredient": "parmesan",
+            "substitute_name": "pecorino",
+        }
+        events = parse_sse_events(response.text)
+        content = next(e for e in events if e["type"] == "TEXT_MESSAGE_CONTENT")
+        assert content["delta"] == "Swapped parmesan for pecorino."
@@ -0,0 +1,169 @@
+"""Tests for the recipe library."""
+
+from httpx import AsyncClient
+
+from src.library import RecipeLibrary, fts_query
+from src.models import Ingredient, Recipe
+from src.sessions import MemorySessionStore, SessionPersistence, get_sessions
+
+
+def make_recipe(title: str, *ingredients: str, **kwargs) -> Recipe:
+    return Recipe(
+        title=title,
+        servings=2,
+        ingredients=[Ingredient(name=name, quantity=1) for name in ingredients],
+        steps=[],
+        **kwargs,
+    )
+
+
+def titles(page) -> list[str]:
+    return [item.title for item in page.items]
+
+
+class TestFtsQuery:
+    """Tests for fts_query."""
+
+    def test_drops_filler_words(self) -> None:
+        assert fts_query("recipes with chickpeas") == '"chickpeas"'
+
+    def test_quotes_fts_syntax(self) -> None:
+        assert fts_query('tofu OR "x" NEAR(') == '"tofu" AND "or" AND "x" AND "near"'
+
+    def test_nothing_searchable(self) -> None:
+        assert fts_query("recipes with") is None
+
+
+class TestRecipeLibrary:
+    """Tests for RecipeLibrary."""
+
+    def make_library(self) -> RecipeLibrary:
+        library = RecipeLibrary(":memory:")
+        library.upsert_many(
+            {
+                "t1": make_recipe(
+                    "Chana Masala", "chickpea", "onion", cuisine="Indian"
+                ),
+                "t2": make_recipe(
+                    "Hummus", "chickpeas", "tahini", dietary_tags=["vegan"]
+                ),
+                "t3": make_recipe("Carbonara", "spaghetti", "eggs", cuisine="Italian"),
+            }
+        )
+        return library
+
+    def test_search_by_ingredient_matches_plurals(self) -> None:
+        page = self.make_library().search("recipes with chickpeas")
+        assert sorted(titles(page)) == ["Chana Masala", "Hummus"]
+
+    def test_search_by_cuisine_and_tag(self) -> None:
+        library = self.make_library()
+        assert titles(library.search("italian")) == ["Carbonara"]
+        assert titles(library.search("vegan")) == ["Hummus"]
+
+    def test_search_ranks_title_first(self) -> None:
+        library = self.make_library()
+        library.upsert_many({"t4": make_recipe("Tahini Dressing", "lemon")})
+        assert titles(library.search("tahini"))[0] == "Tahini Dressing"
+
+    def test_ranking_limited_to_newest_matches(self, monkeypatch) -> None:
+        monkeypatch.setattr("src.library.SEARCH_RANK_WINDOW", 2)
+        library = RecipeLibrary(":memory:")
+        library.upsert_many({"t0": make_recipe("Salt Cod", "cod")})
+        for i in range(1, 4):
+            library.upsert_many({f"t{i}": make_recipe(f"Stew {i}", "salt")})
+
+        # The older title match is outside the window; the rest rank newest first
+        page = library.search("salt")
+        assert titles(page) == ["Stew 3", "Stew 2"]
+        assert page.truncated
+        assert not library.search("cod").truncated
+
+    def test_window_follows_updates(self, monkeypatch) -> None:
+        monkeypatch.setattr("src.library.SEARCH_RANK_WINDOW", 2)
+        library = RecipeLibrary(":memory:")
+        for i in range(3):
+            library.upsert_many({f"t{i}": make_recipe(f"Stew {i}", "salt")})
+
+        library.upsert_many({"t0": make_recipe("Salt Cod", "salt", "cod")})
+
+        assert titles(library.search("salt")) == ["Salt Cod", "Stew 2"]
+        assert titles(library.list()) == ["Salt Cod", "Stew 2", "Stew 1"]
+        assert titles(library.search("cod")) == ["Salt Cod"]
+
+    def test_update_replaces_index_entry(self) -> None:
+        library = self.make_library()
+        library.upsert_many({"t3": make_recipe("Carbonara", "spaghetti", "bacon")})
+
+        assert titles(library.search("eggs")) == []
+        assert titles(library.search("bacon")) == ["Carbonara"]
+        assert len(library.list().items) == 3
+
+    def test_list_paginates_newest_first(self) -> None:
+        library = RecipeLibrary(":memory:")
+        for i in range(5):
+            library.upsert_many({f"t{i}": make_recipe(f"Recipe {i}", "salt")})
+
+        first = library.list(limit=2)
+        second = library.list(limit=2, cursor=first.next_cursor)
+        third = library.list(limit=2, cursor=second.next_cursor)
+
+        assert titles(first) == ["Recipe 4", "Recipe 3"]
+        assert titles(second) == ["Recipe 2", "Recipe 1"]
+        assert titles(third) == ["Recipe 0"]
+        assert third.next_cursor is None
+
+    def test_search_paginates(self) -> None:
+        library = RecipeLibrary(":memory:")
+        for i in range(3):
+            library.upsert_many({f"t{i}": make_recipe(f"Soup {i}", "salt")})
+
+        first = library.search("salt", limit=2)
+        second = library.search("salt", limit=2, offset=int(first.next_cursor))
+
+        assert len(first.items) == 2
+        assert len(second.items) == 1
+        assert second.next_cursor is None
+
+
+class TestLibraryIndexing:
+    """Recipes are indexed when sessions are flushed."""
+
+    async def test_flush_indexes_recipes(self, sample_state) -> None:
+        library = RecipeLibrary(":memory:")
+        sessions = SessionPersistence(MemorySessionStore(), library)
+
+        sessions.save("t1", sample_state)
+        assert library.list().items == []
+
+        await sessions.flush()
+        assert titles(library.search("parmesan")) == ["Pasta al Pomodoro"]
+
+
+class TestLibraryEndpoints:
+    """Tests for GET /recipes and GET /recipes/search."""
+
+    async def test_list_and_search(self, client: AsyncClient, sample_state) -> None:
+        sessions = get_sessions()
+        sessions.save("library-thread", sample_state)
+        await sessions.flush()
+
+        response = await client.get("/recipes", params={"limit": 5})
+        assert response.status_code == 200
+        assert "library-thread" in [
+            item["thread_id"] for item in response.json()["items"]
+        ]
+
+        response = await client.get("/recipes/search", params={"q": "with basil"})
+        assert response.status_code == 200
+        assert "library-thread" in [
+            item["thread_id"] for item in response.json()["items"]
+        ]
+
+    async def test_bad_cursor(self, client: AsyncClient) -> None:
+        response = await client.get("/recipes", params={"cursor": "nope"})
+        assert response.status_code == 400
+        response = await client.get(
+            "/recipes/search", params={"q": "basil", "cursor": "nope"}
+        )
+        assert response.status_code == 400
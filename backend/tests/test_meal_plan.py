@@ -0,0 +1,141 @@
+"""Tests for the meal-plan scheduler."""
+
+import time
+from itertools import pairwise
+from types import SimpleNamespace
+
+from httpx import AsyncClient
+from pydantic_ai.ag_ui import StateDeps
+
+from src import agents
+from src.models import Recipe, RecipeContext, RecipeStep
+from src.sessions import get_sessions
+from src.timing import is_passive, schedule_recipes
+
+
+def recipe(title: str, *steps: tuple[str, int, bool]) -> Recipe:
+    return Recipe(
+        title=title,
+        servings=2,
+        ingredients=[],
+        steps=[
+            RecipeStep(
+                step_number=i,
+                instruction=instruction,
+                duration_minutes=minutes,
+                requires_attention=attention,
+            )
+            for i, (instruction, minutes, attention) in enumerate(steps, start=1)
+        ],
+    )
+
+
+STEW = recipe(
+    "Stew",
+    ("Brown the beef", 10, True),
+    ("Simmer for an hour", 60, False),
+    ("Season and serve", 2, False),
+)
+SALAD = recipe(
+    "Salad",
+    ("Chop the vegetables", 15, False),
+    ("Dress and toss", 3, False),
+)
+
+
+def no_overlapping_hands_on(plan) -> bool:
+    busy = sorted((s.start_minute, s.end_minute) for s in plan.steps if s.hands_on)
+    return all(a[1] <= b[0] for a, b in pairwise(busy))
+
+
+class TestIsPassive:
+    """Tests for is_passive."""
+
+    def test_unattended_cooking_is_passive(self) -> None:
+        assert is_passive(RecipeStep(step_number=1, instruction="Bake for 30 min"))
+        assert is_passive(RecipeStep(step_number=1, instruction="Let the dough rise"))
+
+    def test_prep_and_attention_are_hands_on(self) -> None:
+        assert not is_passive(RecipeStep(step_number=1, instruction="Chop onions"))
+        assert not is_passive(
+            RecipeStep(
+                step_number=1, instruction="Simmer, stirring", requires_attention=True
+            )
+        )
+        assert not is_passive(
+            RecipeStep(step_number=1, instruction="Pour into the restaurant dish")
+        )
+
+
+class TestScheduleRecipes:
+    """Tests for schedule_recipes."""
+
+    def test_prep_overlaps_simmer(self) -> None:
+        plan = schedule_recipes([SALAD, STEW])
+
+        assert plan.sequential_minutes == 90
+        assert plan.total_minutes == 72
+        first = plan.steps[0]
+        assert (first.recipe, first.step_number) == ("Stew", 1)
+        assert no_overlapping_hands_on(plan)
+
+    def test_steps_stay_in_order(self) -> None:
+        plan = schedule_recipes([STEW, SALAD])
+        for title in ("Stew", "Salad"):
+            steps = [s for s in plan.steps if s.recipe == title]
+            assert [s.step_number for s in steps] == sorted(
+                s.step_number for s in steps
+            )
+            assert all(a.end_minute <= b.start_minute for a, b in pairwise(steps))
+
+    def test_single_recipe_runs_straight_through(self, sample_recipe) -> None:
+        plan = schedule_recipes([sample_recipe])
+        assert plan.total_minutes == plan.sequential_minutes == 32
+
+    def test_dozens_of_steps_are_fast(self) -> None:
+        recipes = [STEW, SALAD] * 10
+        started = time.perf_counter()
+        plan = schedule_recipes(recipes)
+        assert time.perf_counter() - started < 0.05
+        assert no_overlapping_hands_on(plan)
+        assert plan.total_minutes < plan.sequential_minutes
+
+
+class TestMealPlanEndpoint:
+    """Tests for POST /meal-plan."""
+
+    async def test_plans_sent_and_saved_recipes(
+        self, client: AsyncClient, sample_state: RecipeContext
+    ) -> None:
+        get_sessions().save("plan-1", sample_state)
+        response = await client.post(
+            "/meal-plan",
+            json={
+                "recipes": [STEW.model_dump(mode="json")],
+                "thread_ids": ["plan-1"],
+            },
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["recipes"] == ["Stew", "Pasta al Pomodoro"]
+        assert data["total_minutes"] < data["sequential_minutes"]
+        get_sessions()._pending.clear()
+
+
+class TestPlanCookingTool:
+    """Tests for the plan_cooking chat tool."""
+
+    async def test_plans_with_saved_recipe(
+        self, monkeypatch, sample_state: RecipeContext
+    ) -> None:
+        async def find_recipe(title):
+            return STEW if title == "stew" else None
+
+        monkeypatch.setattr(get_sessions(), "find_recipe", find_recipe)
+        ctx = SimpleNamespace(deps=StateDeps(sample_state))
+
+        text = await agents.plan_cooking(ctx, ["stew"])
+
+        assert text.startswith("Cooking Pasta al Pomodoro, Stew together")
+        assert "Stew, step 2 (hands-off): Simmer for an hour" in text
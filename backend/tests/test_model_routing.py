@@ -0,0 +1,110 @@
+"""Tests for per-task model tiers and escalation."""
+
+import types
+
+import pytest
+from pydantic_ai.exceptions import UnexpectedModelBehavior
+
+from src import agents
+from src.metrics import metrics
+from src.models import SubstitutionResult
+
+
+class StubAgent:
+    """Agent stub returning queued outputs and recording the model per run."""
+
+    def __init__(self, *outputs):
+        self.outputs = list(outputs)
+        self.models = []
+
+    async def run(self, _prompt, model=None):
+        self.models.append(model)
+        output = self.outputs.pop(0)
+        if isinstance(output, Exception):
+            raise output
+        return types.SimpleNamespace(output=output)
+
+
+@pytest.fixture
+def tiers(monkeypatch):
+    """Configure distinct fast/strong models for every task."""
+    monkeypatch.setattr(
+        agents,
+        "TASK_MODELS",
+        {
+            task: {"fast": "fast-model", "strong": "strong-model"}
+            for task in agents.TASK_MODELS
+        },
+    )
+    monkeypatch.setattr(agents, "get_model", lambda task, tier="fast": tier)
+    metrics.reset()
+
+
+def match(confidence: float) -> SubstitutionResult:
+    return SubstitutionResult(
+        matched_ingredient="parmesan", substitute_name="pecorino", confidence=confidence
+    )
+
+
+class TestRunWithEscalation:
+    """Tests for run_with_escalation."""
+
+    async def test_accepted_output_stays_on_fast_tier(self, tiers) -> None:
+        agent = StubAgent(match(0.9))
+        result = await agents.run_with_escalation(
+            "substitute", agent, "prompt", accept=lambda r: r.confidence >= 0.5
+        )
+
+        assert result.confidence == 0.9
+        assert agent.models == [None]
+        assert metrics.get("model_tier.substitute.fast") == 1
+
+    async def test_low_confidence_escalates(self, tiers) -> None:
+        agent = StubAgent(match(0.2), match(0.95))
+        result = await agents.run_with_escalation(
+            "substitute", agent, "prompt", accept=lambda r: r.confidence >= 0.5
+        )
+
+        assert result.confidence == 0.95
+        assert agent.models == [None, "strong"]
+        assert metrics.get("model_tier.substitute.escalations") == 1
+        assert agents.tier_fractions()["model_tier.substitute.strong_fraction"] == 1
+
+    async def test_invalid_output_escalates(self, tiers) -> None:
+        agent = StubAgent(UnexpectedModelBehavior("bad output"), match(0.9))
+        result = await agents.run_with_escalation("substitute", agent, "prompt")
+
+        assert result.confidence == 0.9
+        assert agent.models == [None, "strong"]
+
+    async def test_other_errors_are_not_escalated(self, tiers) -> None:
+        agent = StubAgent(RuntimeError("network"))
+        with pytest.raises(RuntimeError):
+            await agents.run_with_escalation("substitute", agent, "prompt")
+        assert agent.models == [None]
+
+    async def test_single_tier_never_escalates(self, monkeypatch) -> None:
+        monkeypatch.setattr(
+            agents,
+            "TASK_MODELS",
+            {task: {"fast": "m", "strong": "m"} for task in agents.TASK_MODELS},
+        )
+        agent = StubAgent(match(0.1))
+        result = await agents.run_with_escalation(
+            "substitute", agent, "prompt", accept=lambda r: r.confidence >= 0.5
+        )
+        assert result.confidence == 0.1
+        assert agent.models == [None]
+
+    async def test_rewrite_escalates_when_steps_change(
+        self, tiers, monkeypatch, sample_recipe
+    ) -> None:
+        agent = StubAgent(sample_recipe.steps[:2], sample_recipe.steps)
+        monkeypatch.setattr(agents, "get_step_rewrite_agent", lambda: agent)
+
+        steps = await agents.rewrite_steps_for_substitution(
+            sample_recipe, "tomatoes", "passata"
+        )
+
+        assert steps == sample_recipe.steps
+        assert agent.models == [None, "strong"]
@@ -0,0 +1,160 @@
+"""Tests for local nutrition estimates."""
+
+from types import SimpleNamespace
+
+import pytest
+from pydantic_ai.ag_ui import StateDeps
+
+from src import agents
+from src.commands import scale_state
+from src.models import Ingredient, Recipe
+from src.nutrition import (
+    find_food,
+    format_nutrition,
+    nutrients_per_unit,
+    recipe_nutrition,
+)
+
+
+def one_ingredient(name: str, quantity: float | None, unit: str | None) -> Recipe:
+    return Recipe(
+        title="Test",
+        servings=1,
+        ingredients=[Ingredient(name=name, quantity=quantity, unit=unit)],
+        steps=[],
+    )
+
+
+class TestFindFood:
+    """Tests for find_food."""
+
+    @pytest.mark.parametrize(
+        ("name", "food"),
+        [
+            ("Roma Tomatoes", "tomato"),
+            ("cherry tomatoes", "cherry tomato"),
+            ("boneless chicken thighs", "chicken thigh"),
+            ("extra virgin olive oil", "olive oil"),
+            ("freshly grated Parmesan", "parmesan"),
+            ("red pepper", "bell pepper"),
+            ("eggs", "egg"),
+            ("fresh basil leaves", "basil"),
+            ("unsweetened almond milk", "almond milk"),
+            ("butter beans", "butter bean"),
+            ("chicken stock cube", "stock cube"),
+        ],
+    )
+    def test_resolves_names(self, name: str, food: str) -> None:
+        assert find_food(name).name == food
+
+    @pytest.mark.parametrize(
+        "name",
+        [
+            "dragon fruit",
+            # Only a modifier is a known food
+            "peanut butter cookies",
+            "cream of mushroom soup",
+            "pork belly",
+            # The head is a food, but not after another one
+            "rice noodles",
+            "cashew milk",
+        ],
+    )
+    def test_unknown_food(self, name: str) -> None:
+        assert find_food(name) is None
+
+
+class TestRecipeNutrition:
+    """Tests for recipe_nutrition."""
+
+    def test_mass_units(self) -> None:
+        facts = recipe_nutrition(one_ingredient("butter", 1, "kg"))
+        assert facts.total.calories == 7170
+        assert facts.total.fat_g == 810
+
+    def test_volume_uses_density(self) -> None:
+        facts = recipe_nutrition(one_ingredient("olive oil", 1, "tbsp"))
+        assert facts.total.calories == round(14.79 * 0.92 * 8.84)
+
+    def test_pieces(self) -> None:
+        assert recipe_nutrition(one_ingredient("eggs", 2, None)).total.calories == 143
+        garlic = recipe_nutrition(one_ingredient("garlic", 3, "cloves"))
+        assert garlic.total.calories == round(15 * 1.49)
+
+    def test_unmatched_and_unmeasured(self) -> None:
+        assert recipe_nutrition(one_ingredient("dragon fruit", 1, None)).unmatched == [
+            "dragon fruit"
+        ]
+        # A count of something with no piece weight can't be weighed
+        assert recipe_nutrition(one_ingredient("flour", 2, "scoop")).unmatched == [
+            "flour"
+        ]
+        salt = recipe_nutrition(one_ingredient("salt", None, None))
+        assert salt.unmatched == []
+        assert salt.total.calories == 0
+
+    def test_per_serving(self, sample_recipe) -> None:
+        facts = recipe_nutrition(sample_recipe)
+
+        assert facts.servings == 4
+        assert facts.unmatched == []
+        assert 2000 < facts.total.calories < 2500
+        assert abs(facts.per_serving.calories - facts.total.calories / 4) <= 1
+        assert "Per serving (of 4)" in format_nutrition(facts)
+
+
+class TestIncrementalUpdates:
+    """Tests for nutrition kept current as the recipe changes."""
+
+    def test_scaling_keeps_per_serving(self, sample_state) -> None:
+        scale_state(sample_state, 4)
+        before = recipe_nutrition(sample_state.recipe)
+
+        scale_state(sample_state, 8)
+
+        assert sample_state.nutrition.servings == 8
+        assert (
+            abs(sample_state.nutrition.total.calories - 2 * before.total.calories) <= 1
+        )
+        assert (
+            abs(
+                sample_state.nutrition.per_serving.calories
+                - before.per_serving.calories
+            )
+            <= 1
+        )
+
+    def test_lookups_cached_per_ingredient(self, sample_recipe) -> None:
+        recipe_nutrition(sample_recipe)
+        hits = nutrients_per_unit.cache_info().hits
+
+        recipe_nutrition(sample_recipe.scale(8))
+
+        assert nutrients_per_unit.cache_info().hits == hits + len(
+            sample_recipe.ingredients
+        )
+
+    async def test_substitution_updates_nutrition(
+        self, monkeypatch, sample_state
+    ) -> None:
+        async def rewrite(recipe, substitutions):
+            return recipe.steps
+
+        async def find(recipe, original, substitute):
+            return agents.SubstitutionResult(
+                matched_ingredient="parmesan",
+                substitute_name="cheddar",
+                confidence=0.9,
+            )
+
+        monkeypatch.setattr(agents, "find_and_substitute", find)
+        monkeypatch.setattr(agents, "rewrite_steps_for_substitutions", rewrite)
+        before = recipe_nutrition(sample_state.recipe)
+
+        await agents.substitute_in_state(sample_state, "parmesan", "cheddar")
+
+        assert sample_state.nutrition.total.calories < before.total.calories
+
+    def test_tool(self, sample_state) -> None:
+        ctx = SimpleNamespace(deps=StateDeps(sample_state))
+        assert agents.get_nutrition(ctx).startswith("Per serving (of 4):")
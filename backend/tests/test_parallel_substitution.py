@@ -0,0 +1,125 @@
+"""Tests for applying several ingredient substitutions in one call."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from ag_ui.core import EventType
+from pydantic_ai.ag_ui import StateDeps
+
+from src import agents
+from src.commands import CommandError
+from src.models import IngredientSwap, SubstitutionResult
+
+
+def swaps(*pairs: tuple[str, str]) -> list[IngredientSwap]:
+    return [
+        IngredientSwap(original_ingredient=original, substitute_name=substitute)
+        for original, substitute in pairs
+    ]
+
+
+@pytest.fixture
+def matcher(monkeypatch):
+    """Stub find_and_substitute: exact-name matches, tracking concurrency."""
+    calls = {"active": 0, "max_active": 0}
+
+    async def find(recipe, original, substitute):
+        calls["active"] += 1
+        calls["max_active"] = max(calls["max_active"], calls["active"])
+        await asyncio.sleep(0.01)
+        calls["active"] -= 1
+        names = [ing.name for ing in recipe.ingredients]
+        return SubstitutionResult(
+            matched_ingredient=original if original in names else None,
+            substitute_name=substitute,
+            confidence=1.0,
+        )
+
+    monkeypatch.setattr(agents, "find_and_substitute", find)
+    return calls
+
+
+@pytest.fixture
+def rewrites(monkeypatch):
+    """Stub the step rewrite, recording each batch of substitutions."""
+    batches = []
+
+    async def rewrite(recipe, substitutions):
+        batches.append(substitutions)
+        return recipe.steps
+
+    monkeypatch.setattr(agents, "rewrite_steps_for_substitutions", rewrite)
+    return batches
+
+
+class TestSubstituteManyInState:
+    """Tests for substitute_many_in_state."""
+
+    async def test_matching_runs_concurrently(
+        self, matcher, rewrites, sample_state
+    ) -> None:
+        await agents.substitute_many_in_state(
+            sample_state, swaps(("garlic", "shallot"), ("basil", "parsley"))
+        )
+        assert matcher["max_active"] == 2
+
+    async def test_applied_in_order_with_one_rewrite(
+        self, matcher, rewrites, sample_state
+    ) -> None:
+        message = await agents.substitute_many_in_state(
+            sample_state, swaps(("garlic", "shallot"), ("basil", "parsley"))
+        )
+
+        names = [ing.name for ing in sample_state.recipe.ingredients]
+        assert "shallot" in names and "parsley" in names
+        assert rewrites == [[("garlic", "shallot"), ("basil", "parsley")]]
+        assert message.index("garlic") < message.index("basil")
+
+    async def test_unmatched_swaps_reported(
+        self, matcher, rewrites, sample_state
+    ) -> None:
+        message = await agents.substitute_many_in_state(
+            sample_state, swaps(("garlic", "shallot"), ("butter", "oil"))
+        )
+
+        assert "Swapped garlic for shallot." in message
+        assert "Could not find 'butter'" in message
+        assert rewrites == [[("garlic", "shallot")]]
+
+    async def test_same_ingredient_replaced_once(
+        self, matcher, rewrites, sample_state
+    ) -> None:
+        message = await agents.substitute_many_in_state(
+            sample_state, swaps(("garlic", "shallot"), ("garlic", "onion"))
+        )
+
+        names = [ing.name for ing in sample_state.recipe.ingredients]
+        assert "shallot" in names and "onion" not in names
+        assert "already replaced" in message
+
+    async def test_nothing_matched_raises(
+        self, matcher, rewrites, sample_state
+    ) -> None:
+        with pytest.raises(CommandError, match="Available ingredients include"):
+            await agents.substitute_many_in_state(
+                sample_state, swaps(("butter", "oil"))
+            )
+        assert rewrites == []
+
+
+class TestSubstituteIngredientsTool:
+    """Tests for the substitute_ingredients chat tool."""
+
+    async def test_partial_failure_reaches_model(
+        self, matcher, rewrites, sample_state
+    ) -> None:
+        ctx = SimpleNamespace(deps=StateDeps(sample_state))
+        result = await agents.substitute_ingredients(
+            ctx, swaps(("garlic", "shallot"), ("butter", "oil"))
+        )
+
+        assert "Swapped garlic for shallot." in result.return_value
+        assert "Could not find 'butter'" in result.return_value
+        assert result.metadata.type == EventType.STATE_SNAPSHOT
+        assert result.metadata.snapshot is sample_state
@@ -0,0 +1,162 @@
+"""Tests for Gemini context caching of static prompt prefixes."""
+
+import types
+from unittest.mock import AsyncMock
+
+import pytest
+from google.genai.errors import ClientError
+from pydantic_ai.messages import ModelRequest, SystemPromptPart, UserPromptPart
+from pydantic_ai.models import ModelRequestParameters
+from pydantic_ai.providers.google import GoogleProvider
+from pydantic_ai.tools import ToolDefinition
+
+from src.agents import CHAT_PROMPT, render_recipe_context
+from src.prompt_cache import PROGRESS_HEADER, CachingGoogleModel, PromptCache
+
+
+@pytest.fixture
+def cache() -> PromptCache:
+    return PromptCache(enabled=True, ttl_seconds=3600, min_tokens=50)
+
+
+@pytest.fixture
+def model(cache: PromptCache) -> CachingGoogleModel:
+    model = CachingGoogleModel(
+        "gemini-2.0-flash", provider=GoogleProvider(api_key="test"), cache=cache
+    )
+    create = AsyncMock(return_value=types.SimpleNamespace(name="cachedContents/abc"))
+    model.client = types.SimpleNamespace(
+        aio=types.SimpleNamespace(caches=types.SimpleNamespace(create=create))
+    )
+    return model
+
+
+def make_request(sample_recipe, current_step: int = 0) -> list:
+    instructions = "\n\n".join(
+        [
+            CHAT_PROMPT,
+            render_recipe_context(sample_recipe),
+            f"{PROGRESS_HEADER}\nCurrent step: {current_step}",
+        ]
+    )
+    return [
+        ModelRequest(
+            parts=[UserPromptPart(content="What now?")], instructions=instructions
+        )
+    ]
+
+
+PARAMS = ModelRequestParameters(
+    function_tools=[
+        ToolDefinition(
+            name="scale_recipe",
+            parameters_json_schema={
+                "type": "object",
+                "properties": {"target_servings": {"type": "integer"}},
+            },
+        )
+    ]
+)
+
+
+class TestCachingGoogleModel:
+    """Tests for CachingGoogleModel request building."""
+
+    async def test_static_prefix_moved_to_cache(self, model, sample_recipe) -> None:
+        contents, config = await model._build_content_and_config(
+            make_request(sample_recipe), {}, PARAMS
+        )
+
+        assert config["cached_content"] == "cachedContents/abc"
+        assert "system_instruction" not in config
+        assert "tools" not in config
+        assert "tool_config" not in config
+
+        created = model.client.aio.caches.create.call_args.kwargs["config"]
+        cached_text = created["system_instruction"]["parts"][0]["text"]
+        assert CHAT_PROMPT in cached_text
+        assert sample_recipe.ingredients[0].name in cached_text
+        assert PROGRESS_HEADER not in cached_text
+        assert created["tools"]
+
+        # Progress is sent inline ahead of the conversation
+        assert contents[0]["parts"][0]["text"].startswith(PROGRESS_HEADER)
+
+    async def test_cache_reused_across_steps(self, model, sample_recipe) -> None:
+        await model._build_content_and_config(
+            make_request(sample_recipe, 0), {}, PARAMS
+        )
+        _, config = await model._build_content_and_config(
+            make_request(sample_recipe, 2), {}, PARAMS
+        )
+
+        assert config["cached_content"] == "cachedContents/abc"
+        assert model.client.aio.caches.create.await_count == 1
+
+    async def test_new_cache_when_recipe_changes(self, model, sample_recipe) -> None:
+        await model._build_content_and_config(make_request(sample_recipe), {}, PARAMS)
+        await model._build_content_and_config(
+            make_request(sample_recipe.scale(8)), {}, PARAMS
+        )
+        assert model.client.aio.caches.create.await_count == 2
+
+    async def test_history_summary_not_cached(self, model, sample_recipe) -> None:
+        messages = [
+            ModelRequest(parts=[SystemPromptPart(content="Earlier: scaled to 8")]),
+            *make_request(sample_recipe),
+        ]
+        contents, _ = await model._build_content_and_config(messages, {}, PARAMS)
+
+        created = model.client.aio.caches.create.call_args.kwargs["config"]
+        assert "Earlier" not in created["system_instruction"]["parts"][0]["text"]
+        assert "Earlier: scaled to 8" in contents[0]["parts"][0]["text"]
+
+    async def test_small_prefix_sent_inline(self, model, cache) -> None:
+        cache.min_tokens = 100_000
+        messages = [
+            ModelRequest(parts=[UserPromptPart(content="hi")], instructions="Be nice")
+        ]
+        _, config = await model._build_content_and_config(messages, {}, PARAMS)
+
+        assert "cached_content" not in config or config["cached_content"] is None
+        assert config["system_instruction"] is not None
+        model.client.aio.caches.create.assert_not_awaited()
+
+    async def test_creation_failure_falls_back(self, model, sample_recipe) -> None:
+        model.client.aio.caches.create.side_effect = ClientError(
+            400, {"error": {"message": "unsupported", "status": "INVALID_ARGUMENT"}}
+        )
+
+        for _ in range(2):
+            _, config = await model._build_content_and_config(
+                make_request(sample_recipe), {}, PARAMS
+            )
+            assert config["system_instruction"] is not None
+            assert config["tools"]
+
+        # Failed prefixes are not retried on every call
+        assert model.client.aio.caches.create.await_count == 1
+
+    async def test_locks_released_after_lookup(self, model, cache, sample_recipe):
+        for step in range(3):
+            await model._build_content_and_config(
+                make_request(sample_recipe, step), {}, PARAMS
+            )
+        assert cache._locks == {}
+
+    async def test_failed_prefixes_bounded(self, model, cache, monkeypatch) -> None:
+        monkeypatch.setattr("src.prompt_cache.MAX_FAILED_PREFIXES", 2)
+        model.client.aio.caches.create.side_effect = ClientError(
+            400, {"error": {"message": "unsupported", "status": "INVALID_ARGUMENT"}}
+        )
+        for i in range(5):
+            await cache.get_or_create(model, {"system_instruction": f"{i}" * 500})
+        assert len(cache._failed) == 2
+
+    async def test_disabled_cache_is_passthrough(self, model, cache, sample_recipe):
+        cache.enabled = False
+        _, config = await model._build_content_and_config(
+            make_request(sample_recipe), {}, PARAMS
+        )
+        assert config["system_instruction"] is not None
+        model.client.aio.caches.create.assert_not_awaited()
@@ -0,0 +1,190 @@
+"""Tests for the lookup index on Recipe."""
+
+import types
+
+from src import agents
+from src.models import Ingredient, Recipe, RecipeContext, RecipeStep
+
+
+class TestRecipeIndex:
+    """Tests for Recipe.index and the lookups built on it."""
+
+    def test_find_ingredient_ignores_case_and_spacing(
+        self, sample_recipe: Recipe
+    ) -> None:
+        assert sample_recipe.find_ingredient("  Olive  OIL ").name == "olive oil"
+        assert sample_recipe.find_ingredient("butter") is None
+
+    def test_step_by_number(self, sample_recipe: Recipe) -> None:
+        assert sample_recipe.step(3).instruction == "Add tomatoes and simmer"
+        assert sample_recipe.step(9) is None
+
+    def test_steps_using(self, sample_recipe: Recipe) -> None:
+        numbers = [step.step_number for step in sample_recipe.steps_using("basil")]
+        assert numbers == [4]
+        assert sample_recipe.steps_using("spaghetti") == []
+
+    def test_stopwords_and_colours(self) -> None:
+        recipe = Recipe(
+            title="Onions",
+            servings=2,
+            ingredients=[
+                Ingredient(name="onions"),
+                Ingredient(name="salt and pepper"),
+                Ingredient(name="oil for frying"),
+                Ingredient(name="green onions"),
+            ],
+            steps=[
+                RecipeStep(
+                    step_number=1, instruction="Fry the onions for 5 minutes and serve"
+                ),
+                RecipeStep(step_number=2, instruction="Top with the green onions"),
+            ],
+        )
+
+        names = [ing.name for ing in recipe.ingredients_for_step(recipe.steps[0])]
+        assert names == ["onions"]
+        names = [ing.name for ing in recipe.ingredients_for_step(recipe.steps[1])]
+        assert names == ["green onions"]
+
+    def test_colour_alone_still_matches(self) -> None:
+        recipe = Recipe(
+            title="Scallions",
+            servings=2,
+            ingredients=[Ingredient(name="green onions")],
+            steps=[RecipeStep(step_number=1, instruction="Slice the onions")],
+        )
+        assert recipe.steps_using("green onions") == recipe.steps
+
+    def test_index_is_reused(self, sample_recipe: Recipe) -> None:
+        assert sample_recipe.index is sample_recipe.index
+
+    def test_replacing_a_list_rebuilds(self, sample_recipe: Recipe) -> None:
+        before = sample_recipe.index
+        sample_recipe.steps = [RecipeStep(step_number=1, instruction="Eat the basil")]
+
+        assert sample_recipe.index is not before
+        assert sample_recipe.step(4) is None
+        assert [s.step_number for s in sample_recipe.steps_using("basil")] == [1]
+
+    def test_index_does_not_affect_equality(self, sample_recipe: Recipe) -> None:
+        copy = Recipe.model_validate_json(sample_recipe.model_dump_json())
+        assert sample_recipe.index is not None
+        assert copy == sample_recipe
+        assert "_index" not in sample_recipe.model_dump()
+
+
+class TestSubstituteIngredient:
+    """Tests for Recipe.substitute_ingredient."""
+
+    def test_replaces_every_exact_match(self) -> None:
+        recipe = Recipe(
+            title="Two oils",
+            servings=2,
+            ingredients=[
+                Ingredient(name="Olive oil", quantity=1, unit="tbsp"),
+                Ingredient(name="salt"),
+                Ingredient(name="olive oil", quantity=2, unit="tbsp"),
+            ],
+            steps=[],
+        )
+        swapped = recipe.substitute_ingredient("OLIVE OIL", "butter", 30, "g")
+
+        assert [ing.name for ing in swapped.ingredients] == ["butter", "salt", "butter"]
+        assert swapped.ingredients[2].unit == "g"
+        assert swapped.ingredients[1] is recipe.ingredients[1]
+        assert recipe.ingredients[0].name == "Olive oil"
+
+    def test_new_recipe_gets_its_own_index(self, sample_recipe: Recipe) -> None:
+        assert sample_recipe.index.by_name["garlic"] == [2]
+        swapped = sample_recipe.substitute_ingredient("garlic", "shallot")
+
+        assert swapped.find_ingredient("garlic") is None
+        assert swapped.find_ingredient("shallot").quantity == 3
+        assert sample_recipe.find_ingredient("garlic") is not None
+
+
+class TestIndexInSubstitution:
+    """The substitution path uses the index to skip needless work."""
+
+    async def test_rewrite_even_when_no_step_names_ingredient(
+        self, monkeypatch, sample_state: RecipeContext
+    ) -> None:
+        # Step 2 says "Cook pasta": the word index can't see the spaghetti there
+        rewrites = []
+
+        async def match(recipe, original, substitute):
+            return agents.SubstitutionResult(
+                matched_ingredient="spaghetti", substitute_name=substitute
+            )
+
+        async def rewrite(recipe, substitutions):
+            rewrites.append(substitutions)
+            return recipe.steps
+
+        monkeypatch.setattr(agents, "find_and_substitute", match)
+        monkeypatch.setattr(agents, "rewrite_steps_for_substitutions", rewrite)
+
+        message = await agents.substitute_in_state(sample_state, "pasta", "penne")
+
+        assert message == "Swapped spaghetti for penne."
+        assert rewrites == [[("spaghetti", "penne")]]
+
+    async def test_no_rewrite_without_steps(
+        self, monkeypatch, sample_state: RecipeContext
+    ) -> None:
+        async def match(recipe, original, substitute):
+            return agents.SubstitutionResult(
+                matched_ingredient="spaghetti", substitute_name=substitute
+            )
+
+        class FailingRewrite:
+            async def run(self, _prompt):
+                raise AssertionError("steps should not be rewritten")
+
+        monkeypatch.setattr(agents, "find_and_substitute", match)
+        monkeypatch.setattr(agents, "get_step_rewrite_agent", lambda: FailingRewrite())
+        sample_state.recipe.steps = []
+
+        message = await agents.substitute_in_state(sample_state, "pasta", "penne")
+
+        assert message == "Swapped spaghetti for penne."
+        assert sample_state.recipe.find_ingredient("penne") is not None
+
+    async def test_unknown_matched_name_is_reported(
+        self, monkeypatch, sample_state: RecipeContext
+    ) -> None:
+        async def match(recipe, original, substitute):
+            # The model names an ingredient the recipe doesn't have
+            matched = "pancetta" if original == "bacon" else original
+            return agents.SubstitutionResult(
+                matched_ingredient=matched, substitute_name=substitute
+            )
+
+        async def rewrite(recipe, substitutions):
+            return recipe.steps
+
+        monkeypatch.setattr(agents, "find_and_substitute", match)
+        monkeypatch.setattr(agents, "rewrite_steps_for_substitutions", rewrite)
+
+        message = await agents.substitute_many_in_state(
+            sample_state,
+            [
+                agents.IngredientSwap(original_ingredient="bacon", substitute_name="x"),
+                agents.IngredientSwap(
+                    original_ingredient="garlic", substitute_name="y"
+                ),
+            ],
+        )
+        assert "Could not find 'bacon'" in message
+        assert "Swapped pancetta" not in message
+
+    async def test_fallback_uses_exact_name(self, monkeypatch, sample_recipe) -> None:
+        monkeypatch.setattr(
+            agents,
+            "get_substitution_agent",
+            lambda: types.SimpleNamespace(run=None),
+        )
+        result = await agents.find_and_substitute(sample_recipe, "Garlic", "shallot")
+        assert result.matched_ingredient == "garlic"
+        assert result.confidence == 1.0
@@ -0,0 +1,126 @@
+"""Tests for splitting multi-recipe documents."""
+
+import asyncio
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+from httpx import AsyncClient
+
+from src.models import Recipe
+from src.segmentation import split_recipes
+
+from .test_dedup import RECIPE_TEXT
+
+COOKBOOK_TEXT = """
+Weeknight Favourites
+A collection of quick dinners for busy evenings.
+
+Tomato Soup
+Serves 4
+Ingredients
+1 kg tomatoes
+1 onion
+Method
+1. Soften the onion.
+2. Add the tomatoes and simmer for 20 minutes.
+Page 1 of 3
+
+Garlic Bread
+Makes 1 loaf
+Prep 5 min
+Ingredients:
+1 baguette
+3 cloves garlic
+Directions
+Spread the garlic butter over the bread and bake.
+
+Lemon Posset
+Ingredients
+600 ml double cream
+Method
+Boil the cream with the sugar, add lemon juice and chill.
+"""
+
+
+class TestSplitRecipes:
+    """Tests for split_recipes."""
+
+    def test_splits_at_each_recipe_header(self) -> None:
+        segments = split_recipes(COOKBOOK_TEXT)
+
+        assert [segment.splitlines()[0] for segment in segments] == [
+            "Tomato Soup",
+            "Garlic Bread",
+            "Lemon Posset",
+        ]
+        assert "Makes 1 loaf" in segments[1]
+        assert "Spread the garlic butter" in segments[1]
+        assert "collection of quick dinners" not in segments[0]
+
+    def test_sub_lists_stay_in_one_recipe(self) -> None:
+        text = (
+            "Pie\nIngredients for the pastry\nflour\n"
+            "Ingredients for the filling\napples\nMethod\nBake it."
+        )
+        assert split_recipes(text) == [text]
+
+    def test_single_recipe_unchanged(self) -> None:
+        assert split_recipes(RECIPE_TEXT) == [RECIPE_TEXT]
+
+
+class TestMultiRecipeUpload:
+    """Tests for uploading a document with several recipes."""
+
+    @pytest.fixture(autouse=True)
+    def no_dedup(self, monkeypatch) -> None:
+        monkeypatch.setattr("src.main.get_dedup_index", lambda: None)
+
+    async def test_each_recipe_gets_a_thread(
+        self, client: AsyncClient, sample_recipe: Recipe
+    ) -> None:
+        running = {"now": 0, "max": 0}
+
+        async def parse(text: str) -> Recipe:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+            return sample_recipe.model_copy(update={"title": text.splitlines()[0]})
+
+        files = {"file": ("book.txt", BytesIO(COOKBOOK_TEXT.encode()), "text/plain")}
+        with (
+            patch("src.main.parse_recipe_from_text", parse),
+            patch("src.main.PARSE_CONCURRENCY", 2),
+        ):
+            response = await client.post("/upload", files=files)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert running["max"] == 2
+        assert data["state"]["recipe"]["title"] == "Tomato Soup"
+        assert data["state"]["document_text"].startswith("Tomato Soup")
+        assert [r["title"] for r in data["recipes"]] == [
+            "Tomato Soup",
+            "Garlic Bread",
+            "Lemon Posset",
+        ]
+        assert data["recipes"][0]["threadId"] == data["threadId"]
+
+        session = await client.get(f"/sessions/{data['recipes'][2]['threadId']}")
+        assert session.json()["recipe"]["title"] == "Lemon Posset"
+
+    async def test_failed_segments_are_skipped(
+        self, client: AsyncClient, sample_recipe: Recipe
+    ) -> None:
+        async def parse(text: str) -> Recipe | None:
+            if text.startswith("Garlic Bread"):
+                return None
+            return sample_recipe.model_copy(update={"title": text.splitlines()[0]})
+
+        files = {"file": ("book.txt", BytesIO(COOKBOOK_TEXT.encode()), "text/plain")}
+        with patch("src.main.parse_recipe_from_text", parse):
+            response = await client.post("/upload", files=files)
+
+        titles = [r["title"] for r in response.json()["recipes"]]
+        assert titles == ["Tomato Soup", "Lemon Posset"]
@@ -0,0 +1,46 @@
+"""Tests for the fast JSON serialization paths."""
+
+import json
+
+from ag_ui.core import EventType, StateSnapshotEvent, TextMessageContentEvent
+from ag_ui.encoder import EventEncoder
+
+from src.serialization import FastJSONResponse, encode_sse
+
+
+class TestEncodeSse:
+    """encode_sse matches ag_ui's EventEncoder output."""
+
+    def test_snapshot_matches_default_encoder(self, sample_state) -> None:
+        sample_state.recipe.description = None
+        event = StateSnapshotEvent(
+            type=EventType.STATE_SNAPSHOT, snapshot=sample_state, timestamp=123
+        )
+
+        fast = encode_sse(event)
+        default = EventEncoder().encode(event)
+
+        assert fast.startswith("data: ") and fast.endswith("\n\n")
+        assert json.loads(fast[6:]) == json.loads(default[6:])
+
+    def test_dict_snapshot_and_other_events(self) -> None:
+        events = [
+            StateSnapshotEvent(type=EventType.STATE_SNAPSHOT, snapshot={"a": 1}),
+            TextMessageContentEvent(
+                type=EventType.TEXT_MESSAGE_CONTENT, message_id="m", delta="hi"
+            ),
+        ]
+        for event in events:
+            assert encode_sse(event) == EventEncoder().encode(event)
+
+
+class TestFastJSONResponse:
+    """Tests for FastJSONResponse."""
+
+    def test_renders_models_inside_dicts(self, sample_state) -> None:
+        response = FastJSONResponse({"threadId": "t", "state": sample_state})
+        body = json.loads(response.body)
+
+        assert body["threadId"] == "t"
+        assert body["state"] == sample_state.model_dump(mode="json")
+        assert response.media_type == "application/json"
@@ -0,0 +1,170 @@
+"""Tests for session persistence."""
+
+import asyncio
+import threading
+
+import pytest
+from httpx import AsyncClient
+
+from src.sessions import (
+    MemorySessionStore,
+    SessionPersistence,
+    SQLiteSessionStore,
+    decode_state,
+    encode_state,
+    get_sessions,
+)
+
+
+class FailingStore(MemorySessionStore):
+    """Store whose writes fail until told otherwise."""
+
+    fail = True
+
+    def save_many(self, sessions):
+        if self.fail:
+            raise OSError("disk full")
+        super().save_many(sessions)
+
+
+class SlowStore(MemorySessionStore):
+    """Store whose writes block until released."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def save_many(self, sessions):
+        self.writing.set()
+        self.release.wait(5)
+        super().save_many(sessions)
+
+
+class TestSerialization:
+    """Tests for encode_state/decode_state."""
+
+    def test_round_trip(self, sample_state) -> None:
+        snapshot = sample_state.model_dump_json()
+        data = encode_state(snapshot)
+        assert len(data) < len(snapshot)
+        assert decode_state(data) == sample_state
+
+
+class TestSQLiteSessionStore:
+    """Tests for SQLiteSessionStore."""
+
+    def test_survives_reopen(self, tmp_path) -> None:
+        path = str(tmp_path / "sessions.db")
+        store = SQLiteSessionStore(path)
+        store.save_many({"t1": b"one", "t2": b"two"})
+        store.save_many({"t1": b"uno"})
+        store.close()
+
+        reopened = SQLiteSessionStore(path)
+        assert reopened.load("t1") == b"uno"
+        assert reopened.load("t2") == b"two"
+        assert reopened.load("missing") is None
+
+
+class TestSessionPersistence:
+    """Tests for the write-behind buffer."""
+
+    async def test_save_is_buffered_until_flush(self, sample_state) -> None:
+        store = MemorySessionStore()
+        sessions = SessionPersistence(store)
+
+        sessions.save("t1", sample_state)
+        assert store.load("t1") is None
+        assert await sessions.load("t1") == sample_state
+
+        await sessions.flush()
+        assert decode_state(store.load("t1")) == sample_state
+
+    async def test_latest_snapshot_wins(self, sample_state) -> None:
+        store = MemorySessionStore()
+        sessions = SessionPersistence(store)
+
+        sessions.save("t1", sample_state)
+        sample_state.current_step = 3
+        sessions.save("t1", sample_state)
+        await sessions.flush()
+
+        assert decode_state(store.load("t1")).current_step == 3
+
+    async def test_snapshot_is_taken_at_save(self, sample_state) -> None:
+        sessions = SessionPersistence(MemorySessionStore())
+        sessions.save("t1", sample_state)
+        sample_state.current_step = 5
+        assert (await sessions.load("t1")).current_step == 0
+
+    async def test_failed_flush_is_retried(self, sample_state) -> None:
+        store = FailingStore()
+        sessions = SessionPersistence(store)
+
+        sessions.save("t1", sample_state)
+        await sessions.flush()
+        assert store.load("t1") is None
+
+        store.fail = False
+        await sessions.flush()
+        assert decode_state(store.load("t1")) == sample_state
+
+    async def test_load_during_flush_sees_inflight_batch(self, sample_state) -> None:
+        store = SlowStore()
+        sessions = SessionPersistence(store)
+        sessions.save("t1", sample_state)
+
+        flush = asyncio.create_task(sessions.flush())
+        await asyncio.to_thread(store.writing.wait, 5)
+        assert store.load("t1") is None
+        assert await sessions.load("t1") == sample_state
+
+        store.release.set()
+        await flush
+        assert await sessions.load("t1") == sample_state
+
+    async def test_stop_flushes_pending(self, tmp_path, sample_state) -> None:
+        path = str(tmp_path / "sessions.db")
+        sessions = SessionPersistence(SQLiteSessionStore(path), flush_interval=60)
+        sessions.start()
+        sessions.save("t1", sample_state)
+        await sessions.stop()
+
+        assert await SessionPersistence(SQLiteSessionStore(path)).load("t1") == (
+            sample_state
+        )
+
+    async def test_corrupt_session_is_ignored(self) -> None:
+        store = MemorySessionStore()
+        store.save_many({"t1": b"not zlib"})
+        assert await SessionPersistence(store).load("t1") is None
+
+
+class TestSessionEndpoint:
+    """Tests for GET /sessions/{thread_id}."""
+
+    async def test_unknown_thread_404(self, client: AsyncClient) -> None:
+        response = await client.get("/sessions/nope")
+        assert response.status_code == 404
+
+    async def test_command_state_is_restorable(
+        self, client: AsyncClient, sample_state
+    ) -> None:
+        response = await client.post(
+            "/commands",
+            json={
+                "state": sample_state.model_dump(mode="json"),
+                "command": {"action": "next_step"},
+                "thread_id": "thread-1",
+            },
+        )
+        assert response.status_code == 200
+
+        response = await client.get("/sessions/thread-1")
+        assert response.status_code == 200
+        assert response.json()["current_step"] == 1
+
+    @pytest.fixture(autouse=True)
+    def clear(self) -> None:
+        get_sessions()._pending.clear()
@@ -0,0 +1,122 @@
+"""Tests for shared cache backends and the caches built on them."""
+
+import sqlite3
+import types
+
+import pytest
+
+from src import agents
+from src.dedup import NearDuplicateIndex, minhash
+from src.models import SubstitutionResult
+from src.shared_cache import LocalCache, SQLiteCache, cache_key
+
+from .test_dedup import RECIPE_TEXT, REEXPORTED_TEXT
+
+
+class CountingAgent:
+    """Agent stub that counts runs."""
+
+    def __init__(self, output) -> None:
+        self.output = output
+        self.runs = 0
+
+    async def run(self, _prompt, model=None):
+        self.runs += 1
+        return types.SimpleNamespace(output=self.output)
+
+
+class TestBackends:
+    """Tests for LocalCache and SQLiteCache."""
+
+    async def test_workers_share_sqlite_entries(self, tmp_path) -> None:
+        path = str(tmp_path / "cache.db")
+        worker_a, worker_b = SQLiteCache(path), SQLiteCache(path)
+
+        await worker_a.set("parse", "k", "value")
+        assert await worker_b.get("parse", "k") == "value"
+
+    @pytest.mark.parametrize("backend", ["local", "sqlite"])
+    async def test_expired_entries_miss(self, backend, tmp_path) -> None:
+        cache = (
+            LocalCache()
+            if backend == "local"
+            else SQLiteCache(str(tmp_path / "cache.db"))
+        )
+        await cache.set("parse", "k", "value", ttl=-1)
+        assert await cache.get("parse", "k") is None
+
+    async def test_local_evicts_oldest(self) -> None:
+        cache = LocalCache(max_entries=2)
+        for key in "abc":
+            await cache.set("ns", key, key)
+        assert await cache.get("ns", "a") is None
+        assert await cache.get("ns", "c") == "c"
+
+    async def test_locked_database_is_a_miss(self, tmp_path) -> None:
+        cache = SQLiteCache(str(tmp_path / "cache.db"))
+        await cache.set("parse", "k", "value")
+
+        class LockedConnection:
+            def execute(self, *args):
+                raise sqlite3.OperationalError("database is locked")
+
+        cache._conn = LockedConnection()
+        assert await cache.get("parse", "k") is None
+
+    def test_cache_key_separates_parts(self) -> None:
+        assert cache_key("ab", "c") != cache_key("a", "bc")
+
+
+class TestResultCaches:
+    """The parse cache and substitution memo skip repeat model calls."""
+
+    async def test_parse_cached(self, monkeypatch, sample_recipe) -> None:
+        parser = CountingAgent(sample_recipe)
+        monkeypatch.setattr(agents, "get_recipe_parser", lambda: parser)
+
+        first = await agents.parse_recipe_from_text("recipe text")
+        second = await agents.parse_recipe_from_text("recipe text")
+
+        assert parser.runs == 1
+        assert second == first
+        assert second.source_text == "recipe text"
+
+    async def test_substitution_memoized(self, monkeypatch, sample_recipe) -> None:
+        matcher = CountingAgent(
+            SubstitutionResult(
+                matched_ingredient="basil", substitute_name="parsley", confidence=0.9
+            )
+        )
+        monkeypatch.setattr(agents, "get_substitution_agent", lambda: matcher)
+
+        for _ in range(2):
+            result = await agents.find_and_substitute(sample_recipe, "basil", "parsley")
+
+        assert matcher.runs == 1
+        assert result.matched_ingredient == "basil"
+
+    async def test_failed_match_not_cached(self, monkeypatch, sample_recipe) -> None:
+        class FailingAgent:
+            runs = 0
+
+            async def run(self, _prompt, model=None):
+                self.runs += 1
+                raise RuntimeError("boom")
+
+        matcher = FailingAgent()
+        monkeypatch.setattr(agents, "get_substitution_agent", lambda: matcher)
+
+        for _ in range(2):
+            await agents.find_and_substitute(sample_recipe, "basil", "parsley")
+        assert matcher.runs == 2
+
+
+class TestNearDuplicateIndexAcrossWorkers:
+    """Documents indexed by one worker are found by another."""
+
+    def test_other_worker_sees_new_documents(self, tmp_path, sample_recipe) -> None:
+        path = str(tmp_path / "sessions.db")
+        worker_a, worker_b = NearDuplicateIndex(path), NearDuplicateIndex(path)
+
+        worker_a.add(minhash(RECIPE_TEXT), sample_recipe)
+        assert worker_b.find(REEXPORTED_TEXT)[0] == sample_recipe
@@ -0,0 +1,168 @@
+"""Tests for the shopping list engine."""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+from pydantic_ai.ag_ui import StateDeps
+
+from src import agents
+from src.models import Ingredient, Recipe, RecipeContext
+from src.sessions import get_sessions
+from src.shopping import build_shopping_list
+from src.units import parse_unit
+
+
+def recipe(title: str, *ingredients: Ingredient) -> Recipe:
+    return Recipe(title=title, servings=2, ingredients=list(ingredients), steps=[])
+
+
+def items(shopping_list) -> dict[str, tuple]:
+    return {
+        item.name: (item.quantity, item.unit, section.category)
+        for section in shopping_list.sections
+        for item in section.items
+    }
+
+
+class TestUnits:
+    """Tests for parse_unit."""
+
+    @pytest.mark.parametrize(
+        ("unit", "dimension", "name"),
+        [
+            ("Tablespoons", "volume", "tablespoon"),
+            ("lbs", "mass", "lb"),
+            ("cloves", "count", "clove"),
+            ("bunches", "count", "bunch"),
+            (None, "count", ""),
+        ],
+    )
+    def test_resolves_units(self, unit, dimension, name) -> None:
+        parsed = parse_unit(unit)
+        assert (parsed.dimension, parsed.name) == (dimension, name)
+
+
+class TestBuildShoppingList:
+    """Tests for build_shopping_list."""
+
+    def test_same_unit_summed(self) -> None:
+        result = build_shopping_list(
+            [
+                recipe(
+                    "A", Ingredient(name="Garlic cloves", quantity=2, unit="cloves")
+                ),
+                recipe("B", Ingredient(name="garlic clove", quantity=3, unit="clove")),
+            ]
+        )
+        assert items(result) == {"Garlic cloves": (5, "cloves", "other")}
+        assert result.sections[0].items[0].recipes == ["A", "B"]
+
+    def test_mixed_units_converted(self) -> None:
+        result = build_shopping_list(
+            [
+                recipe("A", Ingredient(name="butter", quantity=200, unit="g")),
+                recipe("B", Ingredient(name="Butter", quantity=1, unit="kg")),
+                recipe("C", Ingredient(name="milk", quantity=1, unit="cup")),
+                recipe("D", Ingredient(name="milk", quantity=800, unit="ml")),
+            ]
+        )
+        assert items(result)["butter"][:2] == (1.2, "kg")
+        assert items(result)["milk"][:2] == (1.04, "l")
+
+    def test_incompatible_units_kept_apart(self) -> None:
+        result = build_shopping_list(
+            [
+                recipe("A", Ingredient(name="basil", quantity=1, unit="bunch")),
+                recipe("B", Ingredient(name="basil", quantity=10, unit="g")),
+            ]
+        )
+        quantities = sorted(
+            (item.quantity, item.unit) for item in result.sections[0].items
+        )
+        assert quantities == [(1, "bunch"), (10, "g")]
+
+    def test_unmeasured_dropped_when_measured_elsewhere(self) -> None:
+        result = build_shopping_list(
+            [
+                recipe("A", Ingredient(name="salt", category="spice")),
+                recipe("B", Ingredient(name="Salt", quantity=1, unit="tsp")),
+                recipe("C", Ingredient(name="pepper", category="spice")),
+            ]
+        )
+        assert items(result) == {
+            "Salt": (1, "tsp", "spice"),
+            "pepper": (None, None, "spice"),
+        }
+
+    def test_sections_in_aisle_order(self, sample_recipe: Recipe) -> None:
+        result = build_shopping_list([sample_recipe])
+        assert [s.category for s in result.sections] == ["produce", "dairy", "pantry"]
+
+    def test_scaled_recipes(self, sample_recipe: Recipe) -> None:
+        result = build_shopping_list([sample_recipe, sample_recipe.scale(8)])
+        assert items(result)["spaghetti"][:2] == (1200, "g")
+
+    def test_week_of_recipes_is_fast(self, sample_recipe: Recipe) -> None:
+        week = [sample_recipe.scale(n) for n in range(1, 29)]
+        started = time.perf_counter()
+        build_shopping_list(week)
+        assert time.perf_counter() - started < 0.05
+
+
+class TestShoppingListEndpoint:
+    """Tests for POST /shopping-list."""
+
+    async def test_merges_sent_and_saved_recipes(
+        self, client: AsyncClient, sample_state: RecipeContext
+    ) -> None:
+        get_sessions().save("shop-1", sample_state)
+        response = await client.post(
+            "/shopping-list",
+            json={
+                "recipes": [sample_state.recipe.model_dump(mode="json")],
+                "thread_ids": ["shop-1"],
+            },
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["recipes"] == ["Pasta al Pomodoro"] * 2
+        pantry = next(s for s in data["sections"] if s["category"] == "pantry")
+        assert {"name": "spaghetti", "quantity": 800}.items() <= pantry["items"][
+            1
+        ].items()
+
+    async def test_unknown_thread_404(self, client: AsyncClient) -> None:
+        response = await client.post("/shopping-list", json={"thread_ids": ["nope"]})
+        assert response.status_code == 404
+
+    async def test_nothing_to_shop_for_400(self, client: AsyncClient) -> None:
+        response = await client.post("/shopping-list", json={})
+        assert response.status_code == 400
+
+    @pytest.fixture(autouse=True)
+    def clear(self) -> None:
+        get_sessions()._pending.clear()
+
+
+class TestShoppingListTool:
+    """Tests for the make_shopping_list chat tool."""
+
+    async def test_includes_saved_recipes(
+        self, monkeypatch, sample_state: RecipeContext
+    ) -> None:
+        saved = recipe("Lasagne", Ingredient(name="olive oil", quantity=1, unit="tbsp"))
+
+        async def find_recipe(title):
+            return saved if title == "lasagne" else None
+
+        monkeypatch.setattr(get_sessions(), "find_recipe", find_recipe)
+        ctx = SimpleNamespace(deps=StateDeps(sample_state))
+
+        text = await agents.make_shopping_list(ctx, ["lasagne", "paella"])
+
+        assert "Shopping list for: Pasta al Pomodoro, Lasagne" in text
+        assert "- 4 tbsp olive oil" in text
+        assert "No saved recipe found for: paella" in text
@@ -0,0 +1,137 @@
+"""Tests for gzip compression of SSE streams."""
+
+import zlib
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, StreamingResponse
+
+from src.metrics import metrics
+from src.sse_compression import SSECompressionMiddleware, accepts_gzip
+
+EVENTS = [
+    b'data: {"type":"RUN_STARTED"}\n\n',
+    b'data: {"type":"STATE_SNAPSHOT","snapshot":{"recipe":"' + b"x" * 4000 + b'"}}\n\n',
+    b'data: {"type":"TEXT_MESSAGE_CONTENT","delta":"Hi"}\n\n',
+]
+
+
+async def sse_app(scope, receive, send) -> None:
+    async def events():
+        for event in EVENTS:
+            yield event
+
+    await StreamingResponse(events(), media_type="text/event-stream")(
+        scope, receive, send
+    )
+
+
+async def run(app, headers: dict[str, str], on_send=None) -> list[dict]:
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/",
+        "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+    }
+    messages = []
+    received = False
+
+    async def receive():
+        # Empty body first, then disconnect so StreamingResponse's listener exits
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+        if on_send is not None:
+            on_send(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+def body_chunks(messages: list[dict]) -> list[bytes]:
+    return [
+        m["body"] for m in messages if m["type"] == "http.response.body" and m["body"]
+    ]
+
+
+GZIP_REQUEST = {"accept-encoding": "gzip, deflate"}
+
+
+class TestAcceptsGzip:
+    """Tests for accepts_gzip."""
+
+    def test_negotiation(self) -> None:
+        assert accepts_gzip(Headers({"accept-encoding": "br, gzip"}))
+        assert accepts_gzip(Headers({"accept-encoding": "*"}))
+        assert not accepts_gzip(Headers({"accept-encoding": "gzip;q=0"}))
+        assert not accepts_gzip(Headers({"accept-encoding": "br"}))
+        assert not accepts_gzip(Headers({}))
+
+
+class TestSSECompressionMiddleware:
+    """Tests for SSECompressionMiddleware."""
+
+    async def test_each_event_decodes_on_arrival(self) -> None:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        started = False
+        delivered: list[bytes] = []
+
+        async def app(scope, receive, send) -> None:
+            async def events():
+                for produced, event in enumerate(EVENTS):
+                    # The start and everything produced so far have already
+                    # reached the client
+                    assert started
+                    assert delivered == EVENTS[:produced]
+                    yield event
+
+            await StreamingResponse(events(), media_type="text/event-stream")(
+                scope, receive, send
+            )
+
+        def on_send(message) -> None:
+            nonlocal started
+            if message["type"] == "http.response.start":
+                start = Headers(raw=message["headers"])
+                assert start["content-encoding"] == "gzip"
+                assert "accept-encoding" in start["vary"].lower()
+                started = True
+            elif data := decompressor.decompress(message["body"]):
+                delivered.append(data)
+
+        await run(SSECompressionMiddleware(app, enabled=True), GZIP_REQUEST, on_send)
+
+        # Z_SYNC_FLUSH: every event, the first small one included, is fully
+        # decodable as soon as it is sent
+        assert delivered == EVENTS
+        assert decompressor.eof
+
+    async def test_records_bytes_on_the_wire(self) -> None:
+        metrics.reset()
+        app = SSECompressionMiddleware(sse_app, enabled=True)
+        await run(app, GZIP_REQUEST)
+
+        assert metrics.get("sse.streams") == 1
+        assert metrics.get("sse.bytes_raw") == sum(map(len, EVENTS))
+        assert 0 < metrics.get("sse.bytes_sent") < metrics.get("sse.bytes_raw")
+
+    async def test_disabled_or_not_accepted(self) -> None:
+        for app, headers in [
+            (SSECompressionMiddleware(sse_app, enabled=False), GZIP_REQUEST),
+            (
+                SSECompressionMiddleware(sse_app, enabled=True),
+                {},
+            ),
+        ]:
+            assert body_chunks(await run(app, headers)) == EVENTS
+
+    async def test_non_sse_responses_untouched(self) -> None:
+        app = SSECompressionMiddleware(JSONResponse({"ok": True}), enabled=True)
+        messages = await run(app, GZIP_REQUEST)
+
+        assert "content-encoding" not in Headers(raw=messages[0]["headers"])
+        assert body_chunks(messages) == [b'{"ok":true}']
@@ -0,0 +1,250 @@
+"""Tests for server-side timers."""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+from pydantic_ai import ToolReturn
+from pydantic_ai.ag_ui import StateDeps
+
+from src import agents, timers
+from src.commands import CommandError
+from src.models import RecipeContext
+from src.sessions import MemorySessionStore, SessionPersistence, get_sessions
+from src.timers import (
+    TimerWheel,
+    cancel_timer_in_state,
+    find_timer,
+    pause_timer_in_state,
+    resume_timer_in_state,
+    start_timer_in_state,
+)
+
+
+@pytest.fixture
+def sessions(monkeypatch) -> SessionPersistence:
+    """A private in-memory session store for the wheel to save fired timers to."""
+    sessions = SessionPersistence(MemorySessionStore())
+    monkeypatch.setattr(timers, "get_sessions", lambda: sessions)
+    return sessions
+
+
+class TestTimerOperations:
+    """Tests for the timer state operations."""
+
+    def test_start_times_current_step(self, sample_state: RecipeContext) -> None:
+        message = start_timer_in_state(sample_state)
+
+        timer = sample_state.timers[0]
+        assert message == "Timer 'Step 1' set for 10 minutes."
+        assert (timer.label, timer.step_number) == ("Step 1", 1)
+        assert timer.duration_seconds == 600
+        assert timer.status == "running"
+
+    def test_start_uses_timer_label(self, sample_state: RecipeContext) -> None:
+        sample_state.recipe.steps[2].timer_label = "Sauce"
+        start_timer_in_state(sample_state, step_number=3)
+        assert find_timer(sample_state, "sauce").duration_seconds == 900
+
+    def test_step_without_duration_needs_one(self, sample_state) -> None:
+        with pytest.raises(CommandError):
+            start_timer_in_state(sample_state, step_number=4)
+        start_timer_in_state(sample_state, step_number=4, duration_seconds=60)
+        assert sample_state.timers[0].label == "Step 4"
+
+    def test_pause_and_resume_keep_time_left(self, sample_state) -> None:
+        start_timer_in_state(sample_state, duration_seconds=300, label="Eggs")
+        pause_timer_in_state(sample_state, "eggs")
+
+        paused = find_timer(sample_state, "Eggs")
+        assert paused.status == "paused"
+        assert paused.ends_at is None
+        assert 299 <= paused.remaining_seconds <= 300
+
+        # Starting the same label again resumes rather than adding a timer
+        start_timer_in_state(sample_state, label="Eggs")
+        assert len(sample_state.timers) == 1
+        assert sample_state.timers[0].status == "running"
+        with pytest.raises(CommandError):
+            resume_timer_in_state(sample_state, "Eggs")
+
+    def test_cancel_and_unknown(self, sample_state) -> None:
+        start_timer_in_state(sample_state)
+        cancel_timer_in_state(sample_state, sample_state.timers[0].id)
+        assert sample_state.timers[0].status == "cancelled"
+        with pytest.raises(CommandError):
+            pause_timer_in_state(sample_state, "bread")
+
+
+class TestTimerWheel:
+    """Tests for TimerWheel."""
+
+    async def test_fires_due_timers_only(self, sessions, sample_state) -> None:
+        wheel = TimerWheel()
+        start_timer_in_state(sample_state, duration_seconds=60, label="Short")
+        start_timer_in_state(sample_state, duration_seconds=600, label="Long")
+        wheel.sync("t1", sample_state)
+
+        fired = await wheel.advance(time.time() + 61)
+
+        assert [timer.label for timer in fired] == ["Short"]
+        assert await wheel.advance(time.time() + 61) == []
+        assert [t.label for t in await wheel.advance(time.time() + 601)] == ["Long"]
+
+    async def test_paused_and_cancelled_timers_do_not_fire(
+        self, sessions, sample_state
+    ) -> None:
+        wheel = TimerWheel()
+        start_timer_in_state(sample_state, duration_seconds=60, label="A")
+        start_timer_in_state(sample_state, duration_seconds=60, label="B")
+        wheel.sync("t1", sample_state)
+
+        pause_timer_in_state(sample_state, "A")
+        cancel_timer_in_state(sample_state, "B")
+        wheel.sync("t1", sample_state)
+
+        assert await wheel.advance(time.time() + 120) == []
+
+    async def test_fired_event_pushed_to_subscribers(
+        self, sessions, sample_state
+    ) -> None:
+        wheel = TimerWheel()
+        start_timer_in_state(sample_state, duration_seconds=60, label="Pasta")
+        wheel.sync("t1", sample_state)
+        events = wheel.events("t1")
+        frame = asyncio.create_task(anext(events))
+        await asyncio.sleep(0)
+
+        await wheel.advance(time.time() + 61)
+
+        event = json.loads((await frame).removeprefix("data: "))
+        assert event["type"] == "CUSTOM"
+        assert event["name"] == "timer_fired"
+        assert event["value"]["label"] == "Pasta"
+        await events.aclose()
+        assert wheel._subscribers == {}
+
+    async def test_fired_timer_saved_and_kept_over_stale_state(
+        self, sessions, sample_state
+    ) -> None:
+        wheel = TimerWheel()
+        start_timer_in_state(sample_state, duration_seconds=60)
+        sessions.save("t1", sample_state)
+        wheel.sync("t1", sample_state)
+        stale = sample_state.model_copy(deep=True)
+
+        await wheel.advance(time.time() + 61)
+
+        assert (await sessions.load("t1")).timers[0].status == "fired"
+        # A client that missed the event sends the timer back as running
+        wheel.sync("t1", stale)
+        assert stale.timers[0].status == "fired"
+        assert await wheel.advance(time.time() + 120) == []
+
+    async def test_restart_rearms_overdue_timers(self, sessions, sample_state) -> None:
+        start_timer_in_state(sample_state, duration_seconds=60)
+        sample_state.timers[0].ends_at = time.time() - 30
+
+        wheel = TimerWheel()
+        wheel.sync("t1", sample_state)
+
+        assert len(await wheel.advance()) == 1
+
+    async def test_many_timers(self, sessions) -> None:
+        wheel = TimerWheel()
+        now = time.time()
+        for i in range(2000):
+            state = RecipeContext()
+            start_timer_in_state(state, duration_seconds=10 * (1 + i % 2))
+            wheel.sync(f"t{i}", state)
+
+        # Slots are TIMER_TICK_SECONDS wide, so allow a tick either way
+        assert len(await wheel.advance(now + 15)) == 1000
+        assert len(await wheel.advance(now + 25)) == 1000
+
+    async def test_finished_timers_pruned(
+        self, monkeypatch, sessions, sample_state
+    ) -> None:
+        wheel = TimerWheel()
+        start_timer_in_state(sample_state, duration_seconds=60, label="Old")
+        start_timer_in_state(sample_state, duration_seconds=60, label="Gone")
+        start_timer_in_state(sample_state, duration_seconds=7200, label="Roast")
+        cancel_timer_in_state(sample_state, "Gone")
+        sessions.save("t1", sample_state)
+        wheel.sync("t1", sample_state)
+        stale = sample_state.model_copy(deep=True)
+        await wheel.advance(time.time() + 61)
+        assert len((await sessions.load("t1")).timers) == 3
+
+        # Firing the roast two hours on prunes the timers finished before then
+        later = time.time() + 7201
+        monkeypatch.setattr(timers.time, "time", lambda: later)
+        await wheel.advance(later)
+
+        saved = await sessions.load("t1")
+        assert [(t.label, t.status) for t in saved.timers] == [("Roast", "fired")]
+        # A stale state can't bring back the pruned timer to fire again
+        wheel.sync("t1", stale)
+        assert [t.label for t in stale.timers] == ["Roast"]
+        assert await wheel.advance(later + 60) == []
+
+    def test_idle_threads_evicted(self, sample_state) -> None:
+        wheel = TimerWheel(max_threads=2)
+        start_timer_in_state(sample_state, duration_seconds=60)
+        wheel.sync("running", sample_state)
+        wheel.sync("idle-1", RecipeContext())
+        wheel.sync("idle-2", RecipeContext())
+
+        assert list(wheel._threads) == ["running", "idle-2"]
+
+
+class TestTimerEndpoints:
+    """Tests for the /timers endpoints."""
+
+    async def test_start_pause_cancel(self, client: AsyncClient, sample_state) -> None:
+        get_sessions().save("timer-1", sample_state)
+
+        response = await client.post("/timers/timer-1", json={})
+        assert response.status_code == 200
+        [timer] = response.json()
+        assert (timer["label"], timer["status"]) == ("Step 1", "running")
+
+        response = await client.post(f"/timers/timer-1/{timer['id']}/pause")
+        assert response.json()[0]["status"] == "paused"
+        response = await client.delete(f"/timers/timer-1/{timer['id']}")
+        assert response.json()[0]["status"] == "cancelled"
+
+        # The session carries the timers too
+        response = await client.get("/sessions/timer-1")
+        assert response.json()["timers"][0]["status"] == "cancelled"
+
+    async def test_errors(self, client: AsyncClient, sample_state) -> None:
+        get_sessions().save("timer-2", sample_state)
+
+        response = await client.post("/timers/timer-2", json={"step_number": 9})
+        assert response.status_code == 400
+        response = await client.post("/timers/missing", json={})
+        assert response.status_code == 404
+
+    @pytest.fixture(autouse=True)
+    def clear(self) -> None:
+        yield
+        get_sessions()._pending.clear()
+
+
+class TestTimerTools:
+    """Tests for the timer chat tools."""
+
+    def test_start_and_pause(self, sample_state: RecipeContext) -> None:
+        ctx = SimpleNamespace(deps=StateDeps(sample_state))
+
+        result = agents.start_timer(ctx, minutes=3, label="Toast")
+        assert isinstance(result, ToolReturn)
+        assert result.return_value == "Timer 'Toast' set for 3 minutes."
+
+        agents.pause_timer(ctx, "toast")
+        assert sample_state.timers[0].status == "paused"
+        assert agents.cancel_timer(ctx, "bagel") == "There is no timer called 'bagel'."
@@ -0,0 +1,94 @@
+"""Tests for critical-path recipe timing."""
+
+from src import agents
+from src.commands import scale_state, set_current_step
+from src.models import Ingredient, Recipe, RecipeStep
+from src.timing import critical_path_minutes, next_timer, recipe_timing
+
+from .test_meal_plan import recipe
+
+
+class TestCriticalPath:
+    """Tests for critical_path_minutes."""
+
+    def test_hands_on_work_overlaps_passive_step(self) -> None:
+        stew = recipe(
+            "Stew",
+            ("Simmer the stock", 30, False),
+            ("Chop the vegetables", 10, False),
+            ("Serve", 2, False),
+        )
+        # The chopping happens while the stock simmers
+        assert critical_path_minutes(stew) == 32
+
+    def test_step_using_passive_ingredient_waits(self) -> None:
+        bread = Recipe(
+            title="Bread",
+            servings=1,
+            ingredients=[
+                Ingredient(name="dough", quantity=1, unit=None),
+                Ingredient(name="butter", quantity=20, unit="g"),
+            ],
+            steps=[
+                RecipeStep(
+                    step_number=1, instruction="Let the dough rise", duration_minutes=60
+                ),
+                RecipeStep(
+                    step_number=2, instruction="Soften the butter", duration_minutes=5
+                ),
+                RecipeStep(
+                    step_number=3, instruction="Shape the dough", duration_minutes=10
+                ),
+                RecipeStep(
+                    step_number=4, instruction="Brush with butter", duration_minutes=1
+                ),
+            ],
+        )
+        assert critical_path_minutes(bread) == 71
+
+    def test_hands_on_only_recipe_is_sequential(self) -> None:
+        salad = recipe("Salad", ("Chop", 15, False), ("Dress", 3, False))
+        assert critical_path_minutes(salad) == 18
+
+    def test_sample_recipe(self, sample_recipe) -> None:
+        # Sauté during the pasta boil; combine once the sauce has simmered
+        assert critical_path_minutes(sample_recipe) == 30
+        assert critical_path_minutes(sample_recipe, 2) == 20
+        assert critical_path_minutes(sample_recipe, 4) == 0
+
+
+class TestRecipeTiming:
+    """Tests for recipe_timing and its refresh on state changes."""
+
+    def test_timing_fields(self, sample_recipe) -> None:
+        timing = recipe_timing(sample_recipe, 1)
+
+        assert timing.total_minutes == 30
+        assert timing.stated_minutes == 30
+        assert timing.next_timer.step_number == 3
+        assert timing.next_timer.duration_seconds == 15 * 60
+
+    def test_next_timer_prefers_label(self, sample_recipe) -> None:
+        sample_recipe.steps[1].timer_label = "Garlic"
+        assert next_timer(sample_recipe).step_number == 1
+        assert next_timer(sample_recipe, 1).label == "Garlic"
+
+    def test_memoized_per_recipe_version(self, sample_recipe) -> None:
+        first = recipe_timing(sample_recipe, 0)
+        assert recipe_timing(sample_recipe.model_copy(), 0) is first
+        changed = sample_recipe.model_copy(deep=True)
+        changed.steps[0].duration_minutes = 20
+        assert recipe_timing(changed, 0).total_minutes == 40
+
+    def test_step_change_refreshes_state(self, sample_state) -> None:
+        set_current_step(sample_state, 2)
+        assert sample_state.timing.remaining_minutes == 20
+
+        scale_state(sample_state, 2)
+        assert sample_state.timing.remaining_minutes == 20
+
+    def test_progress_context_shows_time_left(self, sample_state) -> None:
+        sample_state.current_step = 2
+        text = agents.render_progress_context(sample_state)
+        assert "Time left: about 20 min" in text
+        assert "Next timer: Step 3, 15 min" in text
@@ -0,0 +1,91 @@
+"""Tests for trimming documents before recipe parsing."""
+
+import types
+
+from src import agents
+from src.metrics import metrics
+from src.trimming import (
+    estimate_text_tokens,
+    score_block,
+    strip_boilerplate,
+    trim_recipe_text,
+)
+
+from .test_dedup import RECIPE_TEXT
+
+STORY = (
+    "My grandmother grew up in a small village by the sea, and every summer "
+    "we would visit her and spend long afternoons on the terrace talking "
+    "about everything and nothing while the cicadas sang in the olive trees.\n"
+)
+COMMENTS = (
+    "42 comments\nSarah says: lovely! Reply\nTom says: made this twice. Reply\n"
+    "Subscribe to our newsletter for more. Share on Pinterest.\n"
+)
+
+
+def blog_export(pages: int = 3) -> str:
+    """A recipe wrapped in story pages, footers and reader comments."""
+    parts = []
+    for page in range(1, pages + 1):
+        parts.append(f"www.myfoodblog.com\n\n{STORY * 8}\nPage {page} of {pages + 1}\n")
+    parts.append(f"www.myfoodblog.com\n{RECIPE_TEXT}\n")
+    parts.append(f"{COMMENTS * 3}\nPage {pages + 1} of {pages + 1}\n")
+    return "\n".join(parts)
+
+
+class TestBoilerplate:
+    """Tests for strip_boilerplate."""
+
+    def test_repeated_footers_removed(self) -> None:
+        text = strip_boilerplate(blog_export())
+        assert "myfoodblog" not in text
+        assert "Page 2 of 4" not in text
+        assert "Pasta al Pomodoro" in text
+
+    def test_repeated_ingredient_lines_kept(self) -> None:
+        text = "1 tsp salt\nmix\n1 tsp salt\nmix\n1 tsp salt\nmix\n"
+        assert strip_boilerplate(text).count("1 tsp salt") == 3
+        assert "mix" not in strip_boilerplate(text)
+
+
+class TestTrimRecipeText:
+    """Tests for trim_recipe_text."""
+
+    def test_recipe_scores_above_story_and_comments(self) -> None:
+        assert score_block(RECIPE_TEXT) > score_block(STORY) > score_block(COMMENTS)
+
+    def test_long_document_cut_to_recipe(self) -> None:
+        text = blog_export()
+        trimmed = trim_recipe_text(text, budget=400)
+
+        assert estimate_text_tokens(trimmed) <= 400
+        assert estimate_text_tokens(trimmed) < estimate_text_tokens(text) / 4
+        assert "400 g spaghetti" in trimmed
+        assert "Serve straight away." in trimmed
+        assert "grandmother" not in trimmed
+        assert "Reply" not in trimmed
+
+    def test_short_document_untouched(self) -> None:
+        assert trim_recipe_text(RECIPE_TEXT) == RECIPE_TEXT
+
+    def test_token_counts_recorded(self) -> None:
+        before = metrics.get("parse.tokens_saved")
+        trim_recipe_text(blog_export(), budget=400)
+        assert metrics.get("parse.tokens_saved") > before
+
+    async def test_parser_gets_trimmed_text(self, monkeypatch, sample_recipe) -> None:
+        prompts = []
+
+        class Parser:
+            async def run(self, prompt, model=None):
+                prompts.append(prompt)
+                return types.SimpleNamespace(output=sample_recipe)
+
+        monkeypatch.setattr(agents, "get_recipe_parser", lambda: Parser())
+        monkeypatch.setattr(agents, "trim_recipe_text", lambda text: "trimmed")
+
+        recipe = await agents.parse_recipe_from_text(blog_export())
+
+        assert prompts == ["trimmed"]
+        assert recipe.source_text == blog_export()
@@ -0,0 +1,198 @@
+"""Tests for the recipe undo/redo history."""
+
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+from pydantic_ai import ToolReturn
+from pydantic_ai.ag_ui import StateDeps
+
+from src import agents, versions
+from src.commands import CommandError, redo_state, scale_state, undo_state
+from src.intents import classify_intent
+from src.models import (
+    Ingredient,
+    Recipe,
+    RecipeContext,
+    RecipeStep,
+    SubstitutionResult,
+)
+from src.versions import record_version, start_history
+
+
+@pytest.fixture
+def state(sample_state: RecipeContext) -> RecipeContext:
+    """The sample state as uploaded, with its history started."""
+    start_history(sample_state)
+    return sample_state
+
+
+@pytest.fixture
+def swap(monkeypatch):
+    """Substitute without model calls; the rewrite marks the steps it changed."""
+
+    async def find(recipe, original, substitute):
+        return SubstitutionResult(
+            matched_ingredient=original, substitute_name=substitute, confidence=0.9
+        )
+
+    async def rewrite(recipe, substitutions):
+        return [
+            RecipeStep(step_number=step.step_number, instruction=f"{step.instruction}!")
+            for step in recipe.steps
+        ]
+
+    monkeypatch.setattr(agents, "find_and_substitute", find)
+    monkeypatch.setattr(agents, "rewrite_steps_for_substitutions", rewrite)
+    return agents.substitute_in_state
+
+
+def quantities(state: RecipeContext) -> list[float | None]:
+    return [ing.quantity for ing in state.recipe.ingredients]
+
+
+class TestScaling:
+    """Tests for scaling from the original version."""
+
+    def test_repeated_scaling_is_exact(self, state, sample_recipe) -> None:
+        for servings in (3, 7, 9, 5):
+            scale_state(state, servings)
+
+        assert quantities(state) == [
+            ing.quantity for ing in sample_recipe.scale(5).ingredients
+        ]
+        scale_state(state, 4)
+        assert state.recipe.ingredients == sample_recipe.ingredients
+
+    async def test_swap_while_scaled(self, state, swap) -> None:
+        scale_state(state, 8)
+        await swap(state, "parmesan", "cheddar")
+
+        scale_state(state, 2)
+
+        assert state.recipe.ingredients[-1].name == "cheddar"
+        assert state.recipe.ingredients[-1].quantity == 25
+        # Stored once, at the original servings
+        assert state.history.versions[-1].ingredients[5].quantity == 50
+
+    async def test_swap_at_awkward_factor(self, swap) -> None:
+        # 1 cup at 7/3 is stored rounded (2.33); unscaling that would give
+        # 0.9986 cups and 1.66 at 5 servings
+        state = RecipeContext(
+            recipe=Recipe(
+                title="Pancakes",
+                servings=3,
+                ingredients=[
+                    Ingredient(name="flour", quantity=200, unit="g"),
+                    Ingredient(name="milk", quantity=1, unit="cup"),
+                ],
+                steps=[RecipeStep(step_number=1, instruction="Whisk the milk")],
+            )
+        )
+        start_history(state)
+        scale_state(state, 7)
+        await swap(state, "milk", "oat milk")
+
+        scale_state(state, 5)
+
+        assert state.recipe.ingredients[1].name == "oat milk"
+        assert state.recipe.ingredients[1].quantity == 1.67
+        assert state.history.versions[-1].ingredients[1].quantity == 1
+
+
+class TestUndoRedo:
+    """Tests for moving through the history."""
+
+    async def test_undo_restores_steps_exactly(self, state, swap) -> None:
+        before = state.recipe.model_copy(deep=True)
+        await swap(state, "parmesan", "cheddar")
+        assert state.recipe.steps[0].instruction.endswith("!")
+
+        assert undo_state(state) == "Undid: Swapped parmesan for cheddar."
+        assert state.recipe.ingredients == before.ingredients
+        assert state.recipe.steps == before.steps
+        assert "dairy-free" not in state.recipe.dietary_tags
+
+        assert redo_state(state) == "Redid: Swapped parmesan for cheddar."
+        assert state.recipe.ingredients[-1].name == "cheddar"
+
+    def test_undo_scaling(self, state) -> None:
+        scale_state(state, 8)
+        undo_state(state)
+
+        assert state.recipe.servings == 4
+        assert state.scaled_servings is None
+        assert state.nutrition.servings == 4
+
+    async def test_change_after_undo_drops_redo(self, state, swap) -> None:
+        scale_state(state, 8)
+        undo_state(state)
+        await swap(state, "basil", "parsley")
+
+        with pytest.raises(CommandError, match="nothing to redo"):
+            redo_state(state)
+        undo_state(state)
+        with pytest.raises(CommandError, match="nothing to undo"):
+            undo_state(state)
+
+    async def test_history_survives_serialization(self, state, swap) -> None:
+        scale_state(state, 6)
+        await swap(state, "garlic", "shallot")
+        expected = state.recipe.ingredients
+        restored = RecipeContext.model_validate_json(state.model_dump_json())
+
+        undo_state(restored)
+        redo_state(restored)
+
+        assert restored.recipe.ingredients == expected
+        assert restored.recipe.steps == state.recipe.steps
+
+    def test_oldest_versions_dropped(self, monkeypatch, state) -> None:
+        monkeypatch.setattr(versions, "RECIPE_MAX_VERSIONS", 3)
+        for servings in (5, 6, 7, 8):
+            scale_state(state, servings)
+
+        assert [version.servings for version in state.history.versions] == [6, 7, 8]
+        undo_state(state)
+        undo_state(state)
+        with pytest.raises(CommandError):
+            undo_state(state)
+
+    def test_unchanged_recipe_not_recorded(self, state) -> None:
+        record_version(state, "Nothing")
+        assert len(state.history.versions) == 1
+
+
+class TestUndoEntryPoints:
+    """Tests for undo/redo through /commands, the intent router and tools."""
+
+    async def test_command(self, client: AsyncClient, state) -> None:
+        scale_state(state, 8)
+        response = await client.post(
+            "/commands",
+            json={
+                "state": state.model_dump(mode="json"),
+                "command": {"action": "undo"},
+            },
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["message"] == "Undid: Scaled to 8 servings."
+        assert {"op": "replace", "path": "/history/position", "value": 0} in data[
+            "delta"
+        ]
+
+    def test_intent(self, state) -> None:
+        assert classify_intent("Undo that", state).tool == "undo_change"
+        assert classify_intent("redo", state).tool == "redo_change"
+
+    def test_tools(self, state) -> None:
+        ctx = SimpleNamespace(deps=StateDeps(state))
+        assert agents.undo_change(ctx) == "There is nothing to undo."
+
+        scale_state(state, 2)
+        result = agents.undo_change(ctx)
+
+        assert isinstance(result, ToolReturn)
+        assert state.recipe.servings == 4
@@ -49,6 +49,61 @@ export interface Recipe {
   source_text: string | null;
 }
 
+export interface TimerSuggestion {
+  type: "timer_suggestion";
+  duration_seconds: number;
+  label: string;
+  step_number: number | null;
+}
+
+export interface RecipeTiming {
+  total_minutes: number;
+  remaining_minutes: number;
+  stated_minutes: number | null;
+  next_timer: TimerSuggestion | null;
+}
+
+export interface Nutrients {
+  calories: number;
+  protein_g: number;
+  fat_g: number;
+  carbs_g: number;
+  fiber_g: number;
+}
+
+export interface NutritionFacts {
+  servings: number;
+  total: Nutrients;
+  per_serving: Nutrients;
+  unmatched: string[];
+}
+
+export interface Timer {
+  id: string;
+  label: string;
+  step_number: number | null;
+  duration_seconds: number;
+  status: "running" | "paused" | "fired" | "cancelled";
+  ends_at: number | null;
+  remaining_seconds: number;
+  updated_at: number;
+}
+
+// Changes from the original recipe; keys are list positions
+export interface RecipeVersion {
+  label: string;
+  servings: number;
+  ingredients: Record<string, Ingredient>;
+  steps: Record<string, RecipeStep>;
+  dietary_tags: string[] | null;
+}
+
+export interface RecipeHistory {
+  original: Recipe;
+  versions: RecipeVersion[];
+  position: number;
+}
+
 export interface RecipeContext {
   document_text: string | null;
   recipe: Recipe | null;
@@ -56,4 +111,8 @@ export interface RecipeContext {
   scaled_servings: number | null;
   checked_ingredients: string[];
   cooking_started: boolean;
+  timing?: RecipeTiming | null;
+  nutrition?: NutritionFacts | null;
+  timers?: Timer[];
+  history?: RecipeHistory | null;
 }